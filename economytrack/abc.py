@@ -1,4 +1,6 @@
+import typing as t
 from abc import ABC, ABCMeta, abstractmethod
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 import discord
@@ -7,6 +9,8 @@ from discord.ext.commands.cog import CogMeta
 from redbot.core.bot import Red
 from redbot.core.config import Config
 
+from economytrack.storage import SeriesStore
+
 
 class CompositeMetaClass(CogMeta, ABCMeta):
     """Type detection"""
@@ -18,7 +22,10 @@ class MixinMeta(ABC):
     bot: Red
     config: Config
     executor: ThreadPoolExecutor
+    store: SeriesStore
+    looptime: int
+    plot_cache: OrderedDict
 
     @abstractmethod
-    async def get_plot(self, df: pd.DataFrame, y_label: str) -> discord.File:
+    async def get_plot(self, df: pd.DataFrame, y_label: str, key: t.Optional[tuple] = None) -> discord.File:
         raise NotImplementedError
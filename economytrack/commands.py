@@ -1,7 +1,6 @@
 import datetime
 
 import discord
-import pandas as pd
 import pytz
 from discord.ext.commands.cooldowns import BucketType
 from rapidfuzz import fuzz
@@ -10,6 +9,8 @@ from redbot.core.commands import parse_timedelta
 from redbot.core.utils.chat_formatting import box, humanize_number, humanize_timedelta
 
 from economytrack.abc import MixinMeta
+from economytrack.graph import RENDERERS, build_df
+from economytrack.storage import BANK, GLOBAL, MEMBERS
 
 
 class EconomyTrackCommands(MixinMeta):
@@ -61,6 +62,24 @@ class EconomyTrackCommands(MixinMeta):
         await self.config.max_points.set(max_points)
         await ctx.tick()
 
+    @economytrack.command()
+    @commands.is_owner()
+    async def renderer(self, ctx: commands.Context, renderer: str):
+        """
+        Set the backend used to render graphs
+
+        **Arguments**
+        `<renderer>` Either `plotly` or `pil`
+
+        `plotly` produces the nicest graphs but starts a headless renderer for each one.
+        `pil` draws the graph directly and is much faster.
+        """
+        renderer = renderer.lower()
+        if renderer not in RENDERERS:
+            return await ctx.send(f"Invalid renderer, valid options are {', '.join(f'`{i}`' for i in RENDERERS)}")
+        await self.config.renderer.set(renderer)
+        await ctx.send(f"Graphs will now be rendered with **{renderer}**")
+
     @economytrack.command()
     async def timezone(self, ctx: commands.Context, timezone: str):
         """
@@ -92,12 +111,8 @@ class EconomyTrackCommands(MixinMeta):
         conf = await self.config.guild(ctx.guild).all()
         timezone = conf["timezone"]
         enabled = conf["enabled"]
-        if is_global:
-            data = await self.config.data()
-            points = len(data)
-        else:
-            data = await self.config.guild(ctx.guild).data()
-            points = len(data)
+        points = await self.store.count(GLOBAL if is_global else ctx.guild.id, BANK)
+        member_points = await self.store.count(ctx.guild.id, MEMBERS)
         avg_iter = self.looptime if self.looptime else "(N/A)"
         ptime = humanize_timedelta(seconds=int(points * 60))
         mptime = humanize_timedelta(seconds=int(max_points * 60))
@@ -106,15 +121,16 @@ class EconomyTrackCommands(MixinMeta):
             f"`Timezone:   `{timezone}\n"
             f"`Max Points: `{humanize_number(max_points)} ({mptime})\n"
             f"`Collected:  `{humanize_number(points)} ({ptime if ptime else 'None'})\n"
-            f"`LoopTime:   `{avg_iter}ms"
+            f"`LoopTime:   `{avg_iter}ms\n"
+            f"`Renderer:   `{await self.config.renderer()}"
         )
         embed = discord.Embed(title="EconomyTrack Settings", description=desc, color=ctx.author.color)
-        memtime = humanize_timedelta(seconds=len(conf["member_data"]) * 60)
+        memtime = humanize_timedelta(seconds=member_points * 60)
         embed.add_field(
             name="Member Tracking",
             value=(
                 f"`Enabled:   `{conf['member_tracking']}\n"
-                f"`Collected: `{humanize_number(len(conf['member_data']))} ({memtime if memtime else 'None'})"
+                f"`Collected: `{humanize_number(member_points)} ({memtime if memtime else 'None'})"
             ),
             inline=False,
         )
@@ -139,34 +155,23 @@ class EconomyTrackCommands(MixinMeta):
         is_global = await bank.is_global()
 
         if banktype:
-            if is_global:
-                data = await self.config.data()
-            else:
-                data = await self.config.guild(ctx.guild).data()
+            guild_id, kind = (GLOBAL if is_global else ctx.guild.id), BANK
         else:
-            data = await self.config.guild(ctx.guild).member_data()
+            guild_id, kind = ctx.guild.id, MEMBERS
 
-        if len(data) < 10:
+        if await self.store.count(guild_id, kind) < 10:
             embed = discord.Embed(
                 description="There is not enough data collected. Try again later.",
                 color=discord.Color.red(),
             )
             return await ctx.send(embed=embed)
 
-        newrows = [i for i in data if i[1] and i[1] <= max_value]
-        deleted = len(data) - len(newrows)
+        async with ctx.typing():
+            deleted = await self.store.remove_above(guild_id, kind, max_value)
         if not deleted:
             return await ctx.send("No data to delete")
-
-        async with ctx.typing():
-            if banktype:
-                if is_global:
-                    await self.config.data.set(newrows)
-                else:
-                    await self.config.guild(ctx.guild).data.set(newrows)
-            else:
-                await self.config.guild(ctx.guild).member_data.set(newrows)
-            await ctx.send("Deleted all data points above " + str(max_value))
+        self.plot_cache.clear()
+        await ctx.send("Deleted all data points above " + str(max_value))
 
     @commands.command(aliases=["bgraph"])
     @commands.cooldown(5, 60.0, BucketType.user)
@@ -192,29 +197,11 @@ class EconomyTrackCommands(MixinMeta):
         is_global = await bank.is_global()
         currency_name = await bank.get_currency_name(ctx.guild)
         bank_name = await bank.get_bank_name(ctx.guild)
-        if is_global:
-            data = await self.config.data()
-        else:
-            data = await self.config.guild(ctx.guild).data()
-        if len(data) < 10:
-            embed = discord.Embed(
-                description="There is not enough data collected to generate a graph right now. Try again later.",
-                color=discord.Color.red(),
-            )
-            return await ctx.send(embed=embed)
         timezone = await self.config.guild(ctx.guild).timezone()
         now = datetime.datetime.now().astimezone(tz=pytz.timezone(timezone))
-        start = now - delta
-        columns = ["ts", "total"]
-        rows = [i for i in data]
-        for i in rows:
-            i[0] = datetime.datetime.fromtimestamp(i[0]).astimezone(tz=pytz.timezone(timezone))
-        df = pd.DataFrame(rows, columns=columns)
-        df = df.set_index(["ts"])
-        df = df[~df.index.duplicated(keep="first")]  # Remove duplicate indexes
-        mask = (df.index > start) & (df.index <= now)
-        df = df.loc[mask]
-        df = pd.DataFrame(df)
+        start = None if timespan.lower() == "all" else (now - delta).timestamp()
+        data = await self.store.fetch(GLOBAL if is_global else ctx.guild.id, BANK, start, now.timestamp())
+        df = build_df(data, timezone)
 
         if df.empty or len(df.values) < 10:  # In case there is data but it is old
             embed = discord.Embed(
@@ -229,13 +216,13 @@ class EconomyTrackCommands(MixinMeta):
         else:
             title = f"Total economy balance over the last {humanize_timedelta(timedelta=delta)}"
 
-        lowest = df.min().total
-        highest = df.max().total
-        avg = df.mean().total
-        current = df.values[-1][0]
+        lowest = df["low"].min()
+        highest = df["high"].max()
+        avg = (df["total"] * df["count"]).sum() / max(df["count"].sum(), 1)
+        current = round(df["total"].iloc[-1])
 
         desc = (
-            f"`DataPoints: `{humanize_number(len(df.values))}\n"
+            f"`DataPoints: `{humanize_number(int(df['count'].sum()))}\n"
             f"`BankName:   `{bank_name}\n"
             f"`Currency:   `{currency_name}"
         )
@@ -248,7 +235,7 @@ class EconomyTrackCommands(MixinMeta):
             f"`Diff:    `{humanize_number(highest - lowest)}"
         )
 
-        first = df.values[0][0]
+        first = round(df["total"].iloc[0])
         diff = "+" if current > first else "-"
         field2 = f"{diff} {humanize_number(abs(current - first))}"
 
@@ -262,7 +249,8 @@ class EconomyTrackCommands(MixinMeta):
         embed.set_image(url="attachment://plot.png")
         embed.set_footer(text=f"Timezone: {timezone}")
         async with ctx.typing():
-            file = await self.get_plot(df, "Total Economy Credits")
+            key = (GLOBAL if is_global else ctx.guild.id, BANK, timespan.lower(), timezone, df.index[-1])
+            file = await self.get_plot(df, "Total Economy Credits", key)
         await ctx.send(embed=embed, file=file)
 
     @commands.command(aliases=["memgraph"])
@@ -287,26 +275,11 @@ class EconomyTrackCommands(MixinMeta):
             if delta is None:
                 delta = datetime.timedelta(hours=1)
 
-        data = await self.config.guild(ctx.guild).member_data()
-        if len(data) < 10:
-            embed = discord.Embed(
-                description="There is not enough data collected to generate a graph right now. Try again later.",
-                color=discord.Color.red(),
-            )
-            return await ctx.send(embed=embed)
         timezone = await self.config.guild(ctx.guild).timezone()
         now = datetime.datetime.now().astimezone(tz=pytz.timezone(timezone))
-        start = now - delta
-        columns = ["ts", "total"]
-        rows = [i for i in data]
-        for i in rows:
-            i[0] = datetime.datetime.fromtimestamp(i[0]).astimezone(tz=pytz.timezone(timezone))
-        df = pd.DataFrame(rows, columns=columns)
-        df = df.set_index(["ts"])
-        df = df[~df.index.duplicated(keep="first")]  # Remove duplicate indexes
-        mask = (df.index > start) & (df.index <= now)
-        df = df.loc[mask]
-        df = pd.DataFrame(df)
+        start = None if timespan.lower() == "all" else (now - delta).timestamp()
+        data = await self.store.fetch(ctx.guild.id, MEMBERS, start, now.timestamp())
+        df = build_df(data, timezone)
 
         if df.empty or len(df.values) < 10:  # In case there is data but it is old
             embed = discord.Embed(
@@ -321,12 +294,12 @@ class EconomyTrackCommands(MixinMeta):
         else:
             title = f"Total member count over the last {humanize_timedelta(timedelta=delta)}"
 
-        lowest = df.min().total
-        highest = df.max().total
-        avg = df.mean().total
-        current = df.values[-1][0]
+        lowest = df["low"].min()
+        highest = df["high"].max()
+        avg = (df["total"] * df["count"]).sum() / max(df["count"].sum(), 1)
+        current = round(df["total"].iloc[-1])
 
-        desc = f"`DataPoints: `{humanize_number(len(df.values))}"
+        desc = f"`DataPoints: `{humanize_number(int(df['count'].sum()))}"
 
         field = (
             f"`Current: `{humanize_number(current)}\n"
@@ -336,7 +309,7 @@ class EconomyTrackCommands(MixinMeta):
             f"`Diff:    `{humanize_number(highest - lowest)}"
         )
 
-        first = df.values[0][0]
+        first = round(df["total"].iloc[0])
         diff = "+" if current > first else "-"
         field2 = f"{diff} {humanize_number(abs(current - first))}"
 
@@ -350,5 +323,6 @@ class EconomyTrackCommands(MixinMeta):
         embed.set_image(url="attachment://plot.png")
         embed.set_footer(text=f"Timezone: {timezone}")
         async with ctx.typing():
-            file = await self.get_plot(df, "Member Count")
+            key = (ctx.guild.id, MEMBERS, timespan.lower(), timezone, df.index[-1])
+            file = await self.get_plot(df, "Member Count", key)
         await ctx.send(embed=embed, file=file)
@@ -1,22 +1,27 @@
 import asyncio
 import logging
+import typing as t
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from time import monotonic
 
 import discord
-import pandas as pd
 import pytz
 from discord.ext import tasks
 from redbot.core import Config, bank, commands
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import box, humanize_number, humanize_timedelta
 
 from economytrack.abc import CompositeMetaClass
 from economytrack.commands import EconomyTrackCommands
-from economytrack.graph import PlotGraph
+from economytrack.graph import PlotGraph, build_df
+from economytrack.storage import BANK, GLOBAL, MEMBERS, SeriesStore
 
 log = logging.getLogger("red.vrt.economytrack")
+# How often running bank totals get recalculated from a full scan of the bank
+RECONCILE_INTERVAL = 3600
 
 
 # Credits to Vexed01 for having a great reference cog for some of the logic that went into this!
@@ -31,7 +36,7 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "0.5.6"
+    __version__ = "0.6.3"
 
     def format_help_for_context(self, ctx):
         helpcmd = super().format_help_for_context(ctx)
@@ -45,7 +50,7 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
         super().__init__(*args, **kwargs)
         self.bot = bot
         self.config = Config.get_conf(self, identifier=117, force_registration=True)
-        default_global = {"max_points": 21600, "data": []}
+        default_global = {"max_points": 21600, "data": [], "renderer": "plotly"}
         default_guild = {
             "timezone": "UTC",
             "data": [],
@@ -55,11 +60,35 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
         }
         self.config.register_global(**default_global)
         self.config.register_guild(**default_guild)
+        self.store = SeriesStore(cog_data_path(self) / "series.db")
         self.looptime = None
+        # Rendered graph images keyed by (guild, series, timespan, timezone, last point, renderer)
+        self.plot_cache: OrderedDict = OrderedDict()
+        # Running bank totals kept up to date by BankEvents payloads, keyed by guild ID (0 for global)
+        self.totals: t.Dict[int, int] = {}
+        self.reconciled: t.Dict[int, float] = {}
         self.bank_loop.start()
 
     def cog_unload(self):
         self.bank_loop.cancel()
+        self.store.close()
+
+    async def migrate_config_data(self):
+        """Move series data stored in Config over to the local series store"""
+        data = await self.config.data()
+        if data:
+            imported = await self.store.extend(GLOBAL, BANK, data)
+            await self.config.data.clear()
+            log.info(f"Imported {imported} global bank points from config")
+        for guild_id, conf in (await self.config.all_guilds()).items():
+            for key, kind in (("data", BANK), ("member_data", MEMBERS)):
+                if not conf.get(key):
+                    continue
+                imported = await self.store.extend(guild_id, kind, conf[key])
+                await self.config.guild_from_id(guild_id).clear_raw(key)
+                log.info(f"Imported {imported} {kind} points from config for guild {guild_id}")
+        if built := await self.store.ensure_rollups():
+            log.info(f"Built rollups for {built} series")
 
     @tasks.loop(minutes=2)
     async def bank_loop(self):
@@ -70,29 +99,19 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
             max_points = 26280000  # 100 years is plenty
         now = datetime.now().replace(microsecond=0, second=0).timestamp()
         if is_global:
-            total = await self.get_total_bal()
-            async with self.config.data() as data:
-                data.append((now, total))
-                if len(data) > max_points:
-                    del data[0 : len(data) - max_points]
+            total = await self.get_tracked_bal()
+            await self.store.append(GLOBAL, BANK, now, total, max_points)
         else:
             async for guild in AsyncIter(self.bot.guilds):
                 if not await self.config.guild(guild).enabled():
                     continue
-                total = await self.get_total_bal(guild)
-                async with self.config.guild(guild).data() as data:
-                    data.append((now, total))
-                    if len(data) > max_points:
-                        del data[0 : len(data) - max_points]
+                total = await self.get_tracked_bal(guild)
+                await self.store.append(guild.id, BANK, now, total, max_points)
 
         async for guild in AsyncIter(self.bot.guilds):
             if not await self.config.guild(guild).member_tracking():
                 continue
-            members = guild.member_count
-            async with self.config.guild(guild).member_data() as data:
-                data.append((now, members))
-                if len(data) > max_points:
-                    del data[0 : len(data) - max_points]
+            await self.store.append(guild.id, MEMBERS, now, guild.member_count, max_points)
 
         iter_time = round((monotonic() - start) * 1000)
         avg_iter = self.looptime
@@ -111,9 +130,56 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
         total = sum(value["balance"] for value in members.values())
         return int(total)
 
+    async def get_tracked_bal(self, guild: discord.Guild = None) -> int:
+        """
+        Get the total bank balance from the running totals if possible
+
+        Totals are only trusted while BankEvents is loaded to keep them updated, and are
+        recalculated from a full bank scan every RECONCILE_INTERVAL seconds to correct any drift.
+        """
+        key = GLOBAL if guild is None else guild.id
+        if (
+            key in self.totals
+            and self.bot.get_cog("BankEvents")
+            and monotonic() - self.reconciled.get(key, 0) < RECONCILE_INTERVAL
+        ):
+            return self.totals[key]
+        total = await self.get_total_bal(guild)
+        self.totals[key] = total
+        self.reconciled[key] = monotonic()
+        return total
+
+    @commands.Cog.listener()
+    async def on_red_bank_set_balance(self, payload):
+        # Deposits, withdrawals and both sides of transfers all go through set_balance
+        key = GLOBAL if await bank.is_global() else getattr(payload.guild, "id", None)
+        if key in self.totals:
+            self.totals[key] += payload.recipient_new_balance - payload.recipient_old_balance
+
+    @commands.Cog.listener()
+    async def on_red_bank_wipe(self, scope: t.Optional[int]):
+        if scope is None:
+            self.totals.clear()
+        else:
+            self.totals.pop(GLOBAL if scope == -1 else scope, None)
+
+    @commands.Cog.listener()
+    async def on_red_bank_prune(self, payload):
+        # Let the next tick rescan whatever bank was pruned
+        if payload.guild is None:
+            self.totals.clear()
+        else:
+            self.totals.pop(payload.guild.id, None)
+            self.totals.pop(GLOBAL, None)
+
+    @commands.Cog.listener()
+    async def on_red_bank_set_global(self, is_global: bool):
+        self.totals.clear()
+
     @bank_loop.before_loop
     async def before_bank_loop(self):
         await self.bot.wait_until_red_ready()
+        await self.migrate_config_data()
         await asyncio.sleep(120)
         log.info("EconomyTrack Ready")
 
@@ -155,40 +221,28 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
             if delta is None:
                 delta = timedelta(hours=1)
 
-        data = await self.config.guild(guild).member_data()
-        if len(data) < 2:
-            return "There is not enough data collected. Try again later."
-
         timezone = await self.config.guild(guild).timezone()
         now = datetime.now().astimezone(tz=pytz.timezone(timezone))
-        start = now - delta
-        columns = ["ts", "total"]
-        rows = [i for i in data]
-        for i in rows:
-            i[0] = datetime.fromtimestamp(i[0]).astimezone(tz=pytz.timezone(timezone))
-        df = pd.DataFrame(rows, columns=columns)
-        df = df.set_index(["ts"])
-        df = df[~df.index.duplicated(keep="first")]  # Remove duplicate indexes
-        mask = (df.index > start) & (df.index <= now)
-        df = df.loc[mask]
-        df = pd.DataFrame(df)
+        start = None if timespan.lower() == "all" else (now - delta).timestamp()
+        data = await self.store.fetch(guild.id, MEMBERS, start, now.timestamp())
+        df = build_df(data, timezone)
 
         if df.empty or len(df.values) < 2:  # In case there is data but it is old
             return "There is not enough data collected. Try again later."
 
         if timespan.lower() == "all":
-            alltime = humanize_timedelta(seconds=len(data) * 60)
+            alltime = humanize_timedelta(seconds=int(df["count"].sum()) * 60)
             reply = f"Total member count for all time ({alltime})\n"
         else:
             delta: timedelta = df.index[-1] - df.index[0]
             reply = f"Total member count over the last {humanize_timedelta(timedelta=delta)}\n"
 
-        lowest = df.min().total
-        highest = df.max().total
-        avg = df.mean().total
-        current = df.values[-1][0]
+        lowest = df["low"].min()
+        highest = df["high"].max()
+        avg = (df["total"] * df["count"]).sum() / max(df["count"].sum(), 1)
+        current = round(df["total"].iloc[-1])
 
-        reply += f"`DataPoints: `{humanize_number(len(df.values))}\n"
+        reply += f"`DataPoints: `{humanize_number(int(df['count'].sum()))}\n"
 
         reply += (
             "Statistics\n"
@@ -199,7 +253,7 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
             f"`Diff:    `{humanize_number(highest - lowest)}\n"
         )
 
-        first = df.values[0][0]
+        first = round(df["total"].iloc[0])
         diff = "+" if current > first else "-"
         field = f"{diff} {humanize_number(abs(current - first))}"
         reply += f"Since <t:{int(df.index[0].timestamp())}:D>\n{box(field, 'diff')}"
@@ -216,45 +270,29 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
         is_global = await bank.is_global()
         currency_name = await bank.get_currency_name(guild)
         bank_name = await bank.get_bank_name(guild)
-        if is_global:
-            data = await self.config.data()
-        else:
-            data = await self.config.guild(guild).data()
-
-        if len(data) < 2:
-            return "There is not enough data collected. Try again later."
-
         timezone = await self.config.guild(guild).timezone()
         now = datetime.now().astimezone(tz=pytz.timezone(timezone))
-        start = now - delta
-        columns = ["ts", "total"]
-        rows = [i for i in data]
-        for i in rows:
-            i[0] = datetime.fromtimestamp(i[0]).astimezone(tz=pytz.timezone(timezone))
-        df = pd.DataFrame(rows, columns=columns)
-        df = df.set_index(["ts"])
-        df = df[~df.index.duplicated(keep="first")]  # Remove duplicate indexes
-        mask = (df.index > start) & (df.index <= now)
-        df = df.loc[mask]
-        df = pd.DataFrame(df)
+        start = None if timespan.lower() == "all" else (now - delta).timestamp()
+        data = await self.store.fetch(GLOBAL if is_global else guild.id, BANK, start, now.timestamp())
+        df = build_df(data, timezone)
 
         if df.empty or len(df.values) < 2:  # In case there is data but it is old
             return "There is not enough data collectedTry again later."
 
         if timespan.lower() == "all":
-            alltime = humanize_timedelta(seconds=len(data) * 60)
+            alltime = humanize_timedelta(seconds=int(df["count"].sum()) * 60)
             reply = f"Total economy balance for all time ({alltime})"
         else:
             delta: timedelta = df.index[-1] - df.index[0]
             reply = f"Total economy balance over the last {humanize_timedelta(timedelta=delta)}"
 
-        lowest = df.min().total
-        highest = df.max().total
-        avg = df.mean().total
-        current = df.values[-1][0]
+        lowest = df["low"].min()
+        highest = df["high"].max()
+        avg = (df["total"] * df["count"]).sum() / max(df["count"].sum(), 1)
+        current = round(df["total"].iloc[-1])
 
         reply += (
-            f"`DataPoints: `{humanize_number(len(df.values))}\n"
+            f"`DataPoints: `{humanize_number(int(df['count'].sum()))}\n"
             f"`BankName:   `{bank_name}\n"
             f"`Currency:   `{currency_name}"
         )
@@ -268,7 +306,7 @@ class EconomyTrack(commands.Cog, EconomyTrackCommands, PlotGraph, metaclass=Comp
             f"`Diff:    `{humanize_number(highest - lowest)}\n"
         )
 
-        first = df.values[0][0]
+        first = round(df["total"].iloc[0])
         diff = "+" if current > first else "-"
         field = f"{diff} {humanize_number(abs(current - first))}"
         reply += f"Since <t:{int(df.index[0].timestamp())}:D>\n{box(field, 'diff')}"
@@ -1,21 +1,76 @@
 import asyncio
+import typing as t
 from io import BytesIO
 
 import discord
 import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
 from plotly import express as px
 
 from economytrack.abc import MixinMeta
+from economytrack.storage import Row
+
+RENDERERS = ("plotly", "pil")
+# Max amount of rendered graphs to keep in memory
+CACHE_SIZE = 100
+
+WIDTH, HEIGHT = 800, 500
+# Plot area margins (left, top, right, bottom)
+MARGINS = (70, 30, 45, 60)
+BACKGROUND = (17, 17, 17)
+GRID = (40, 40, 40)
+TEXT = (242, 245, 250)
+LINE = (99, 110, 250)
+
+
+def build_df(rows: t.List[Row], timezone: str) -> pd.DataFrame:
+    """Turn rows from the series store into a DataFrame indexed by localized timestamps"""
+    df = pd.DataFrame(rows, columns=["ts", "total", "low", "high", "count"])
+    df["ts"] = pd.to_datetime(df["ts"], unit="s", utc=True).dt.tz_convert(timezone)
+    df = df.set_index(["ts"])
+    df = df[~df.index.duplicated(keep="first")]  # Remove duplicate indexes
+    return df
+
+
+def si_format(value: float) -> str:
+    """Format a number with an SI suffix like plotly's 'si' tickformat"""
+    for suffix, size in (("T", 1e12), ("G", 1e9), ("M", 1e6), ("k", 1e3)):
+        if abs(value) >= size:
+            return f"{value / size:.3g}{suffix}"
+    return f"{value:.3g}"
 
 
 class PlotGraph(MixinMeta):
-    async def get_plot(self, df: pd.DataFrame, y_label: str) -> discord.File:
-        return await asyncio.to_thread(self.make_plot, df, y_label)
+    async def get_plot(self, df: pd.DataFrame, y_label: str, key: t.Optional[tuple] = None) -> discord.File:
+        """
+        Render a graph of the dataframe's totals
+
+        If a key is given, the rendered image is cached under it so repeat calls between ticks are free.
+        Keys should include the last data point so new data invalidates them naturally.
+        """
+        renderer = await self.config.renderer()
+        if key is not None:
+            key = (*key, renderer)
+        if key is not None and key in self.plot_cache:
+            self.plot_cache.move_to_end(key)
+            image = self.plot_cache[key]
+        else:
+            if renderer == "pil":
+                image = await asyncio.to_thread(self.make_plot_pil, df, y_label)
+            else:
+                image = await asyncio.to_thread(self.make_plot, df, y_label)
+            if key is not None:
+                self.plot_cache[key] = image
+                while len(self.plot_cache) > CACHE_SIZE:
+                    self.plot_cache.popitem(last=False)
+        buffer = BytesIO(image)
+        buffer.seek(0)
+        return discord.File(buffer, filename="plot.png")
 
     @staticmethod
-    def make_plot(df: pd.DataFrame, y_label: str) -> discord.File:
+    def make_plot(df: pd.DataFrame, y_label: str) -> bytes:
         fig = px.line(
-            df,
+            df["total"],
             template="plotly_dark",
             labels={"ts": "Date", "value": y_label},
         )
@@ -24,8 +79,56 @@ class PlotGraph(MixinMeta):
         fig.update_layout(
             showlegend=False,
         )
-        bytefile = fig.to_image(format="png", width=800, height=500, scale=1)
-        buffer = BytesIO(bytefile)
-        buffer.seek(0)
-        file = discord.File(buffer, filename="plot.png")
-        return file
+        return fig.to_image(format="png", width=WIDTH, height=HEIGHT, scale=1)
+
+    @staticmethod
+    def make_plot_pil(df: pd.DataFrame, y_label: str) -> bytes:
+        """Lightweight renderer that draws the line directly with PIL instead of a headless browser"""
+        img = Image.new("RGB", (WIDTH, HEIGHT), BACKGROUND)
+        draw = ImageDraw.Draw(img)
+        font = ImageFont.load_default()
+
+        left, top, right, bottom = MARGINS[0], MARGINS[1], WIDTH - MARGINS[2], HEIGHT - MARGINS[3]
+        values = df["total"].tolist()
+        times = [ts.timestamp() for ts in df.index]
+        low, high = min(values), max(values)
+        if low == high:
+            low, high = low - 1, high + 1
+        start, end = times[0], times[-1]
+        if start == end:
+            end = start + 1
+
+        def x_pos(ts: float) -> float:
+            return left + (ts - start) / (end - start) * (right - left)
+
+        def y_pos(value: float) -> float:
+            return bottom - (value - low) / (high - low) * (bottom - top)
+
+        # Horizontal grid lines and Y axis labels
+        ticks = 5
+        for i in range(ticks + 1):
+            value = low + (high - low) * i / ticks
+            y = y_pos(value)
+            draw.line([(left, y), (right, y)], fill=GRID)
+            label = si_format(value)
+            width = draw.textlength(label, font=font)
+            draw.text((left - width - 6, y - 5), label, fill=TEXT, font=font)
+
+        # Vertical grid lines and X axis labels
+        for i in range(ticks + 1):
+            idx = round((len(times) - 1) * i / ticks)
+            x = x_pos(times[idx])
+            draw.line([(x, top), (x, bottom)], fill=GRID)
+            stamp = df.index[idx]
+            for line_no, label in enumerate((stamp.strftime("%I:%M %p"), stamp.strftime("%b %d %Y"))):
+                width = draw.textlength(label, font=font)
+                draw.text((x - width / 2, bottom + 6 + line_no * 12), label, fill=TEXT, font=font)
+
+        draw.line([(x_pos(ts), y_pos(v)) for ts, v in zip(times, values)], fill=LINE, width=2)
+
+        width = draw.textlength(y_label, font=font)
+        draw.text(((WIDTH - width) / 2, 8), y_label, fill=TEXT, font=font)
+
+        buffer = BytesIO()
+        img.save(buffer, format="PNG", optimize=False)
+        return buffer.getvalue()
@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import typing as t
+from pathlib import Path
+
+log = logging.getLogger("red.vrt.economytrack.storage")
+
+# Guild ID used for the global bank series
+GLOBAL = 0
+# Series kinds
+BANK = "bank"
+MEMBERS = "member"
+
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+# Rollup tiers in seconds, raw points are kept alongside them
+TIERS = (3600, 86400)
+# The bank loop runs every 2 minutes
+RAW_INTERVAL = 120
+# Queries pick the finest resolution that stays around this many points
+TARGET_POINTS = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    guild INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (guild, kind, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    guild INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    tier INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (guild, kind, tier, bucket)
+) WITHOUT ROWID;
+"""
+
+# Row format returned by fetch: (ts, avg, low, high, count)
+Row = t.Tuple[int, float, float, float, int]
+
+
+def _clean(value: t.Union[int, float]) -> t.Union[int, float]:
+    """SQLite integers are 64 bit, anything bigger gets stored as a float"""
+    value = int(value)
+    if INT64_MIN <= value <= INT64_MAX:
+        return value
+    return float(value)
+
+
+class SeriesStore:
+    """
+    Append-only time-series storage backed by a local SQLite database
+
+    Each series is identified by a guild ID (0 for the global bank) and a kind (bank or member).
+    Rows are clustered on (guild, kind, ts) so appends, trims and range queries only touch the pages they need.
+
+    Hourly and daily rollups (min/max/sum/count) are updated as points are written so long timespans
+    can be served from a few thousand pre-aggregated rows instead of every raw point.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # {(guild, kind): amount of raw points}, loaded on first append so trimming never has to count the series
+        self.sizes: t.Dict[t.Tuple[int, str], int] = {}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    # -------------------- SYNC --------------------
+    def _append(self, guild: int, kind: str, ts: int, value: int, max_points: int) -> None:
+        with self.lock:
+            ts, value = int(ts), _clean(value)
+            self.conn.execute("BEGIN")
+            try:
+                size = self._size(guild, kind)
+                existed = self.conn.execute(
+                    "SELECT 1 FROM points WHERE guild = ? AND kind = ? AND ts = ?",
+                    (guild, kind, ts),
+                ).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO points (guild, kind, ts, value) VALUES (?, ?, ?, ?)",
+                    (guild, kind, ts, value),
+                )
+                if existed:
+                    # The old value may have been a bucket's low or high, so recalculate instead of merging
+                    self._rebuild_buckets(guild, kind, ts)
+                else:
+                    self.conn.executemany(
+                        """
+                        INSERT INTO rollups (guild, kind, tier, bucket, low, high, total, count)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                        ON CONFLICT (guild, kind, tier, bucket) DO UPDATE SET
+                            low = MIN(low, excluded.low),
+                            high = MAX(high, excluded.high),
+                            total = total + excluded.total,
+                            count = count + 1
+                        """,
+                        [(guild, kind, tier, ts - ts % tier, value, value, float(value)) for tier in TIERS],
+                    )
+                if not existed:
+                    size += 1
+                    self.sizes[(guild, kind)] = size
+                if max_points > 0 and size > max_points:
+                    self._trim(guild, kind, size - max_points)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self.sizes.pop((guild, kind), None)
+                raise
+            self.conn.execute("COMMIT")
+
+    def _size(self, guild: int, kind: str) -> int:
+        """Cached amount of points in a series, counted once"""
+        key = (guild, kind)
+        if key not in self.sizes:
+            self.sizes[key] = self.conn.execute(
+                "SELECT COUNT(*) FROM points WHERE guild = ? AND kind = ?",
+                (guild, kind),
+            ).fetchone()[0]
+        return self.sizes[key]
+
+    def _extend(self, guild: int, kind: str, rows: t.Iterable[t.Sequence[t.Union[int, float]]]) -> int:
+        cleaned = [(guild, kind, int(ts), _clean(value)) for ts, value in rows if value is not None]
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO points (guild, kind, ts, value) VALUES (?, ?, ?, ?)",
+                    cleaned,
+                )
+                self._rebuild(guild, kind)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                self.sizes.pop((guild, kind), None)
+            self.conn.execute("COMMIT")
+        return len(cleaned)
+
+    def _trim(self, guild: int, kind: str, amount: int) -> None:
+        """Drop the `amount` oldest points of a series"""
+        # Walks the primary key from the oldest end, so this only touches the rows being removed
+        cursor = self.conn.execute(
+            """
+            DELETE FROM points WHERE guild = ? AND kind = ? AND ts IN (
+                SELECT ts FROM points WHERE guild = ? AND kind = ?
+                ORDER BY ts LIMIT ?
+            )
+            """,
+            (guild, kind, guild, kind, amount),
+        )
+        self.sizes[(guild, kind)] -= cursor.rowcount
+        oldest = self.conn.execute(
+            "SELECT MIN(ts) FROM points WHERE guild = ? AND kind = ?",
+            (guild, kind),
+        ).fetchone()[0]
+        if oldest is None:
+            return
+        for tier in TIERS:
+            self.conn.execute(
+                "DELETE FROM rollups WHERE guild = ? AND kind = ? AND tier = ? AND bucket < ?",
+                (guild, kind, tier, oldest - oldest % tier),
+            )
+        # The bucket holding the new oldest point may still include some of the trimmed points
+        self._rebuild_buckets(guild, kind, oldest)
+
+    def _rebuild_buckets(self, guild: int, kind: str, ts: int) -> None:
+        """Recalculate the rollup bucket of each tier that `ts` falls in"""
+        for tier in TIERS:
+            bucket = ts - ts % tier
+            self.conn.execute(
+                "DELETE FROM rollups WHERE guild = ? AND kind = ? AND tier = ? AND bucket = ?",
+                (guild, kind, tier, bucket),
+            )
+            self.conn.execute(
+                """
+                INSERT INTO rollups (guild, kind, tier, bucket, low, high, total, count)
+                SELECT guild, kind, ?, ?, MIN(value), MAX(value), TOTAL(value), COUNT(*)
+                FROM points WHERE guild = ? AND kind = ? AND ts >= ? AND ts < ?
+                GROUP BY guild, kind
+                """,
+                (tier, bucket, guild, kind, bucket, bucket + tier),
+            )
+
+    def _rebuild(self, guild: int, kind: str) -> None:
+        """Recalculate all rollups of a series from its raw points"""
+        self.conn.execute("DELETE FROM rollups WHERE guild = ? AND kind = ?", (guild, kind))
+        for tier in TIERS:
+            self.conn.execute(
+                """
+                INSERT INTO rollups (guild, kind, tier, bucket, low, high, total, count)
+                SELECT guild, kind, ?, ts - ts % ?, MIN(value), MAX(value), TOTAL(value), COUNT(*)
+                FROM points WHERE guild = ? AND kind = ?
+                GROUP BY ts - ts % ?
+                """,
+                (tier, tier, guild, kind, tier),
+            )
+
+    def _pick_tier(self, guild: int, kind: str, start: t.Optional[float], end: t.Optional[float]) -> int:
+        """Get the finest resolution (0 for raw) that keeps a query around TARGET_POINTS rows"""
+        bounds = self.conn.execute(
+            "SELECT MIN(ts), MAX(ts) FROM points WHERE guild = ? AND kind = ?",
+            (guild, kind),
+        ).fetchone()
+        if bounds[0] is None:
+            return 0
+        first = bounds[0] if start is None else max(bounds[0], start)
+        last = bounds[1] if end is None else min(bounds[1], end)
+        span = max(last - first, 0)
+        if span / RAW_INTERVAL <= TARGET_POINTS:
+            return 0
+        for tier in TIERS:
+            if span / tier <= TARGET_POINTS:
+                return tier
+        return TIERS[-1]
+
+    def _fetch(
+        self,
+        guild: int,
+        kind: str,
+        start: t.Optional[float] = None,
+        end: t.Optional[float] = None,
+        raw: bool = False,
+    ) -> t.List[Row]:
+        with self.lock:
+            tier = 0 if raw else self._pick_tier(guild, kind, start, end)
+            args: list = [guild, kind]
+            if tier:
+                query = (
+                    "SELECT bucket, total / count, low, high, count FROM rollups "
+                    "WHERE guild = ? AND kind = ? AND tier = ?"
+                )
+                args.append(tier)
+                col = "bucket"
+            else:
+                query = "SELECT ts, value, value, value, 1 FROM points WHERE guild = ? AND kind = ?"
+                col = "ts"
+            if start is not None:
+                if tier:
+                    # Include the bucket the start falls in
+                    query += " AND bucket >= ?"
+                    args.append(int(start) - int(start) % tier)
+                else:
+                    query += " AND ts > ?"
+                    args.append(int(start))
+            if end is not None:
+                query += f" AND {col} <= ?"
+                args.append(int(end))
+            query += f" ORDER BY {col}"
+            rows = self.conn.execute(query, args).fetchall()
+            if tier and rows:
+                # Finish on the latest raw point so the current value is exact
+                latest = self.conn.execute(
+                    "SELECT ts, value, value, value, 0 FROM points WHERE guild = ? AND kind = ?"
+                    + (" AND ts <= ?" if end is not None else "")
+                    + " ORDER BY ts DESC LIMIT 1",
+                    [guild, kind] + ([int(end)] if end is not None else []),
+                ).fetchone()
+                if latest and latest[0] > rows[-1][0]:
+                    rows.append(latest)
+            return rows
+
+    def _count(self, guild: int, kind: str) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM points WHERE guild = ? AND kind = ?",
+                (guild, kind),
+            ).fetchone()[0]
+
+    def _remove_above(self, guild: int, kind: str, max_value: int) -> int:
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                cursor = self.conn.execute(
+                    "DELETE FROM points WHERE guild = ? AND kind = ? AND (value > ? OR value = 0)",
+                    (guild, kind, _clean(max_value)),
+                )
+                if cursor.rowcount:
+                    self._rebuild(guild, kind)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                self.sizes.pop((guild, kind), None)
+            self.conn.execute("COMMIT")
+            return cursor.rowcount
+
+    def _ensure_rollups(self) -> int:
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone():
+                return 0
+            series = self.conn.execute("SELECT DISTINCT guild, kind FROM points").fetchall()
+            self.conn.execute("BEGIN")
+            try:
+                for guild, kind in series:
+                    self._rebuild(guild, kind)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return len(series)
+
+    # -------------------- ASYNC --------------------
+    async def append(self, guild: int, kind: str, ts: int, value: int, max_points: int = 0) -> None:
+        """Add a point to a series, trimming the oldest points beyond `max_points` (0 for no limit)"""
+        await asyncio.to_thread(self._append, guild, kind, ts, value, max_points)
+
+    async def extend(self, guild: int, kind: str, rows: t.Iterable[t.Sequence[t.Union[int, float]]]) -> int:
+        """Bulk insert (ts, value) rows, used to import legacy Config data"""
+        return await asyncio.to_thread(self._extend, guild, kind, rows)
+
+    async def fetch(
+        self,
+        guild: int,
+        kind: str,
+        start: t.Optional[float] = None,
+        end: t.Optional[float] = None,
+        raw: bool = False,
+    ) -> t.List[Row]:
+        """
+        Get the (ts, avg, low, high, count) rows of a series where start < ts <= end, oldest first
+
+        Long timespans are served from hourly or daily rollups unless `raw` is True
+        """
+        return await asyncio.to_thread(self._fetch, guild, kind, start, end, raw)
+
+    async def count(self, guild: int, kind: str) -> int:
+        return await asyncio.to_thread(self._count, guild, kind)
+
+    async def remove_above(self, guild: int, kind: str, max_value: int) -> int:
+        """Delete points with a value above `max_value` (or empty ones), returns the amount deleted"""
+        return await asyncio.to_thread(self._remove_above, guild, kind, max_value)
+
+    async def ensure_rollups(self) -> int:
+        """Build rollups for existing points if the rollup table is empty, returns the amount of series built"""
+        return await asyncio.to_thread(self._ensure_rollups)
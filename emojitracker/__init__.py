@@ -1,17 +1,11 @@
-import json
-from pathlib import Path
-
-from redbot.core import VersionInfo, version_info
+from redbot.core.bot import Red
+from redbot.core.utils import get_end_user_data_statement
 
 from .emojitracker import EmojiTracker
 
-with open(Path(__file__).parent / "info.json") as fp:
-    __red_end_user_data_statement__ = json.load(fp)["end_user_data_statement"]
+__red_end_user_data_statement__ = get_end_user_data_statement(__file__)
 
 
-async def setup(bot):
+async def setup(bot: Red):
     cog = EmojiTracker(bot)
-    if version_info >= VersionInfo.from_str("3.5.0"):
-        await bot.add_cog(cog)
-    else:
-        bot.add_cog(cog)
+    await bot.add_cog(cog)
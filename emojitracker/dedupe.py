@@ -0,0 +1,70 @@
+import sys
+import typing as t
+from time import monotonic
+
+
+class RotatingDedupe:
+    """
+    Remembers keys for a time window using two generations of sets
+
+    New keys go into the current generation. Once it is `window` seconds old, or holds `max_keys` keys, the previous
+    generation is dropped and the current one takes its place, so a key is remembered for one to two windows unless
+    the ceiling forces an early rotation. Keys are stored as their hash to keep each entry a single int.
+    """
+
+    def __init__(self, window: int = 86400, max_keys: int = 200_000):
+        self.window = window
+        self.max_keys = max_keys
+        self.current: t.Set[int] = set()
+        self.previous: t.Set[int] = set()
+        self.started = monotonic()
+        self.rotations = 0
+        # Rotations forced by the ceiling before the window was up
+        self.early_rotations = 0
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous)
+
+    def seen(self, *key: t.Hashable) -> bool:
+        """Record a key, returns True if it was already recorded within the window"""
+        self.maybe_rotate()
+        digest = hash(key)
+        if digest in self.current or digest in self.previous:
+            self.duplicates += 1
+            return True
+        self.current.add(digest)
+        return False
+
+    def maybe_rotate(self) -> None:
+        now = monotonic()
+        expired = now - self.started >= self.window
+        full = len(self.current) >= self.max_keys
+        if not expired and not full:
+            return
+        if now - self.started >= self.window * 2:
+            # Idle for two windows, everything is stale
+            self.previous = set()
+        else:
+            self.previous = self.current
+        self.current = set()
+        self.started = now
+        self.rotations += 1
+        if full and not expired:
+            self.early_rotations += 1
+
+    def configure(self, window: int, max_keys: int) -> None:
+        self.window = window
+        self.max_keys = max_keys
+        self.maybe_rotate()
+
+    def clear(self) -> None:
+        self.current = set()
+        self.previous = set()
+        self.started = monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        # Set tables plus the int objects they point to
+        ints = sum(sys.getsizeof(i) for i in self.current) + sum(sys.getsizeof(i) for i in self.previous)
+        return sys.getsizeof(self.current) + sys.getsizeof(self.previous) + ints
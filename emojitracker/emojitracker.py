@@ -1,11 +1,22 @@
+import asyncio
+import logging
 import math
-import sys
+import typing as t
 
 import discord
 import tabulate
+from discord.ext import tasks
 from redbot.core import Config, commands
+from redbot.core.utils.chat_formatting import box, humanize_timedelta
 from redbot.core.utils.menus import DEFAULT_CONTROLS, menu
 
+from .dedupe import RotatingDedupe
+from .ranking import RankedCounter
+
+log = logging.getLogger("red.vrt.emojitracker")
+# Leaderboards show this many pages of the top entries
+LB_PAGES = 50
+
 
 class EmojiTracker(commands.Cog):
     """
@@ -17,7 +28,7 @@ class EmojiTracker(commands.Cog):
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "0.1.0"
+    __version__ = "0.3.1"
 
     def format_help_for_context(self, ctx):
         helpcmd = super().format_help_for_context(ctx)
@@ -29,11 +40,75 @@ class EmojiTracker(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = Config.get_conf(self, 117, force_registration=True)
-        default_global = {"blacklist": []}
+        default_global = {"blacklist": [], "dedupe_window": 86400, "dedupe_max": 200000}
         default_guild = {"users": {}}
         self.config.register_global(**default_global)
         self.config.register_guild(**default_guild)
-        self.reacted = {}
+        # (user, message, emoji) keys already counted
+        self.reacted = RotatingDedupe()
+
+        # Live reaction counts, {guild_id: {user_id: {emoji: count}}}
+        self.counters: t.Dict[int, t.Dict[str, t.Dict[str, int]]] = {}
+        # Running totals per guild kept in ranked order, {guild_id: RankedCounter}
+        self.emoji_totals: t.Dict[int, RankedCounter] = {}
+        self.user_totals: t.Dict[int, RankedCounter] = {}
+        # Guilds with counts that haven't been written to Config yet
+        self.dirty: t.Set[int] = set()
+        self.blacklist: t.Set[int] = set()
+        self.ready = asyncio.Event()
+        # False if the saved counts failed to load, nothing is counted or saved so they aren't overwritten
+        self.loaded = False
+        self.init_task: t.Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        self.init_task = asyncio.create_task(self.initialize())
+
+    async def cog_unload(self) -> None:
+        if self.init_task is not None:
+            self.init_task.cancel()
+        self.flush_loop.cancel()
+        await self.flush()
+
+    async def initialize(self):
+        try:
+            await self.load_counts()
+            self.loaded = True
+        except Exception as e:
+            log.error("Failed to load reaction counts, tracking is off until the cog is reloaded", exc_info=e)
+        finally:
+            # Listeners wait on this, never leave them hanging
+            self.ready.set()
+        if self.loaded:
+            self.flush_loop.start()
+
+    async def load_counts(self):
+        self.blacklist = set(await self.config.blacklist())
+        self.reacted.configure(await self.config.dedupe_window(), await self.config.dedupe_max())
+        guilds = await self.config.all_guilds()
+        self.counters = {guild_id: data["users"] for guild_id, data in guilds.items() if data["users"]}
+        for guild_id, users in self.counters.items():
+            emoji_counts: t.Dict[str, int] = {}
+            user_counts: t.Dict[str, int] = {}
+            for uid, emojis in users.items():
+                user_counts[uid] = sum(emojis.values())
+                for emoji, count in emojis.items():
+                    emoji_counts[emoji] = emoji_counts.get(emoji, 0) + count
+            self.emoji_totals[guild_id] = RankedCounter.from_counts(emoji_counts)
+            self.user_totals[guild_id] = RankedCounter.from_counts(user_counts)
+
+    async def flush(self):
+        """Write every guild with unsaved counts to Config"""
+        dirty, self.dirty = self.dirty, set()
+        for guild_id in dirty:
+            try:
+                await self.config.guild_from_id(guild_id).users.set(self.counters.get(guild_id, {}))
+            except Exception as e:
+                log.error(f"Failed to save reactions for guild {guild_id}", exc_info=e)
+                self.dirty.add(guild_id)
+
+    @tasks.loop(seconds=60)
+    async def flush_loop(self):
+        await self.flush()
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -46,9 +121,11 @@ class EmojiTracker(commands.Cog):
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             return
+        await self.ready.wait()
+        if not self.loaded:
+            return
         # Ignore blacklisted guilds
-        blacklist = await self.config.blacklist()
-        if guild.id in blacklist:
+        if guild.id in self.blacklist:
             return
         user = payload.member
         if not user:
@@ -62,26 +139,17 @@ class EmojiTracker(commands.Cog):
 
         emoji = str(payload.emoji)
         uid = str(user.id)
-        mid = str(payload.message_id)
 
         # Only allow one reaction count per emoji on a message so users cant unreact and add the same emoji
-        # This may eat up cache over time for bots with a long ass uptime and in massive servers
-        if uid not in self.reacted:
-            self.reacted[uid] = {}
-        if mid not in self.reacted[uid]:
-            self.reacted[uid][mid] = []
-        if emoji in self.reacted[uid][mid]:
+        if self.reacted.seen(user.id, payload.message_id, emoji):
             return
-        else:
-            self.reacted[uid][mid].append(mid)
 
-        async with self.config.guild(guild).users() as users:
-            if uid not in users:
-                users[uid] = {}
-            if emoji not in users[uid]:
-                users[uid][emoji] = 1
-            else:
-                users[uid][emoji] += 1
+        users = self.counters.setdefault(guild.id, {})
+        emojis = users.setdefault(uid, {})
+        emojis[emoji] = emojis.get(emoji, 0) + 1
+        self.emoji_totals.setdefault(guild.id, RankedCounter()).increment(emoji)
+        self.user_totals.setdefault(guild.id, RankedCounter()).increment(uid)
+        self.dirty.add(guild.id)
 
     @commands.command(name="ignoreguild")
     @commands.is_owner()
@@ -94,9 +162,11 @@ class EmojiTracker(commands.Cog):
         async with self.config.blacklist() as bl:
             if guild_id in bl:
                 bl.remove(guild_id)
+                self.blacklist.discard(guild_id)
                 await ctx.send(f"Guild {guild_id} removed from the blacklist")
             else:
                 bl.append(guild_id)
+                self.blacklist.add(guild_id)
                 await ctx.send(f"Guild {guild_id} added to the blacklist")
 
     @commands.command(name="viewblacklist")
@@ -118,6 +188,10 @@ class EmojiTracker(commands.Cog):
     @commands.has_permissions(manage_messages=True)
     async def reset_reactions(self, ctx):
         """Reset reaction data for this guild"""
+        self.counters.pop(ctx.guild.id, None)
+        self.emoji_totals.pop(ctx.guild.id, None)
+        self.user_totals.pop(ctx.guild.id, None)
+        self.dirty.discard(ctx.guild.id)
         await self.config.guild(ctx.guild).clear()
         await ctx.tick()
 
@@ -126,41 +200,24 @@ class EmojiTracker(commands.Cog):
     @commands.bot_has_permissions(embed_links=True)
     async def emoji_lb(self, ctx):
         """View the emoji leaderboard"""
-        users = await self.config.guild(ctx.guild).users()
-        emojis = {}
-        total_emojis = 0
-        for data in users.values():
-            for emoji, count in data.items():
-                if emoji not in emojis:
-                    emojis[emoji] = count
-                else:
-                    emojis[emoji] += count
-                total_emojis += count
-        sorted_emojis = sorted(emojis.items(), key=lambda x: x[1], reverse=True)
+        ranked = self.emoji_totals.get(ctx.guild.id)
+        if not ranked:
+            return await ctx.send("No reactions saved yet!")
+        sorted_emojis = ranked.top(0, LB_PAGES * 10)
         pages = math.ceil(len(sorted_emojis) / 10)
-        start = 0
-        stop = 10
         color = discord.Color.random()
         embeds = []
         for p in range(pages):
-            if stop > len(sorted_emojis):
-                stop = len(sorted_emojis)
             top = ""
-            for i in range(start, stop, 1):
-                emoji = sorted_emojis[i][0]
-                count = sorted_emojis[i][1]
+            for emoji, count in sorted_emojis[p * 10 : p * 10 + 10]:
                 top += f"{emoji} - `{count}`\n"
             embed = discord.Embed(
                 title="Emoji Leaderboard",
-                description=f"Total Reactions: {'{:,}'.format(total_emojis)}\n{top}",
+                description=f"Total Reactions: {'{:,}'.format(ranked.total)}\n{top}",
                 color=color,
             )
             embed.set_footer(text=f"Pages {p + 1}/{pages}")
             embeds.append(embed)
-            start += 10
-            stop += 10
-        if not embeds:
-            return await ctx.send("No reactions saved yet!")
         await menu(ctx, embeds, DEFAULT_CONTROLS)
 
     @commands.command(name="reactlb")
@@ -168,43 +225,34 @@ class EmojiTracker(commands.Cog):
     @commands.bot_has_permissions(embed_links=True)
     async def reaction_lb(self, ctx):
         """View user leaderboard for most emojis added"""
-        users = await self.config.guild(ctx.guild).users()
-        lb = {}
-        total_reactions = 0
-        for uid, data in users.items():
-            user = ctx.guild.get_member(int(uid))
-            if not user:
-                continue
-            user = user.name
-            if user not in lb:
-                lb[user] = 0
-            for count in data.values():
-                lb[user] += count
-                total_reactions += count
-        sorted_reactions = sorted(lb.items(), key=lambda x: x[1], reverse=True)
-        pages = math.ceil(len(sorted_reactions) / 10)
+        ranked = self.user_totals.get(ctx.guild.id)
+        if not ranked:
+            return await ctx.send("No reactions saved yet!")
+        # Walk the ranking until the pages are full, skipping members that left
+        sorted_reactions = []
         start = 0
-        stop = 10
+        while len(sorted_reactions) < LB_PAGES * 10 and start < len(ranked):
+            for uid, count in ranked.top(start, start + 100):
+                user = ctx.guild.get_member(int(uid))
+                if user:
+                    sorted_reactions.append((user.name, count))
+            start += 100
+        sorted_reactions = sorted_reactions[: LB_PAGES * 10]
+        pages = math.ceil(len(sorted_reactions) / 10)
         color = discord.Color.random()
+        rank = ranked.rank(str(ctx.author.id))
+        you = f" | Your rank: #{rank + 1}" if rank is not None else ""
         embeds = []
         for p in range(pages):
-            if stop > len(sorted_reactions):
-                stop = len(sorted_reactions)
-            table = []
-            for i in range(start, stop, 1):
-                user = sorted_reactions[i][0]
-                count = sorted_reactions[i][1]
-                table.append([count, user])
+            table = [[count, user] for user, count in sorted_reactions[p * 10 : p * 10 + 10]]
             top = tabulate.tabulate(table, tablefmt="presto")
             embed = discord.Embed(
                 title="Reaction Leaderboard",
-                description=f"Total Reactions: {'{:,}'.format(total_reactions)}\n```py\n{top}\n```",
+                description=f"Total Reactions: {'{:,}'.format(ranked.total)}\n```py\n{top}\n```",
                 color=color,
             )
-            embed.set_footer(text=f"Pages {p + 1}/{pages}")
+            embed.set_footer(text=f"Pages {p + 1}/{pages}{you}")
             embeds.append(embed)
-            start += 10
-            stop += 10
         if not embeds:
             return await ctx.send("No reactions saved yet!")
         await menu(ctx, embeds, DEFAULT_CONTROLS)
@@ -213,14 +261,38 @@ class EmojiTracker(commands.Cog):
     @commands.is_owner()
     async def get_reaction_cache(self, ctx):
         """Get the size of EmojiTracker cache"""
-        size = sys.getsizeof(self.reacted)
-        if size > 1000:
-            formatted = "{:,}".format(round(size / 1000, 2))
-            inc = "KB"
-        elif size > 1000000:
+        dedupe = self.reacted
+        size = dedupe.nbytes
+        if size > 1000000:
             formatted = "{:,}".format(round(size / 1000000, 2))
             inc = "MB"
+        elif size > 1000:
+            formatted = "{:,}".format(round(size / 1000, 2))
+            inc = "KB"
         else:
             formatted = "{:,}".format(size)
             inc = "Bytes"
-        await ctx.send(f"EmojiTracker Cache Size: `{formatted} {inc}`")
+        txt = (
+            f"Cache Size: {formatted} {inc}\n"
+            f"Keys: {'{:,}'.format(len(dedupe))}/{'{:,}'.format(dedupe.max_keys * 2)}\n"
+            f"Window: {humanize_timedelta(seconds=dedupe.window)}\n"
+            f"Rotations: {dedupe.rotations} ({dedupe.early_rotations} early)\n"
+            f"Duplicates Ignored: {'{:,}'.format(dedupe.duplicates)}"
+        )
+        await ctx.send(f"EmojiTracker Cache\n{box(txt, lang='py')}")
+
+    @commands.command(name="emojidedupe")
+    @commands.is_owner()
+    async def set_dedupe(self, ctx, window_seconds: int, max_keys: int):
+        """
+        Set how long reactions are remembered to stop users from counting the same reaction twice
+
+        Reactions are remembered for one to two windows. If more than `max_keys` reactions come in within a window
+        the oldest ones are forgotten early to cap memory, each key takes roughly 80 bytes.
+        """
+        if window_seconds < 60 or max_keys < 1000:
+            return await ctx.send("The window must be at least 60 seconds and max keys at least 1000")
+        await self.config.dedupe_window.set(window_seconds)
+        await self.config.dedupe_max.set(max_keys)
+        self.reacted.configure(window_seconds, max_keys)
+        await ctx.tick()
@@ -0,0 +1,69 @@
+import typing as t
+
+
+class RankedCounter:
+    """
+    Counter that keeps its keys ordered by count, highest first
+
+    Keys with equal counts sit in one contiguous run of `order`. Incrementing a key swaps it with the first key of its
+    run and then moves that run boundary, so every increment is O(1) and any page of the ranking is a plain slice.
+    Only increments by one are supported at runtime, bulk loads go through `from_counts`.
+    """
+
+    def __init__(self):
+        self.order: t.List[str] = []
+        self.pos: t.Dict[str, int] = {}
+        self.counts: t.Dict[str, int] = {}
+        # {count: index of the first key in `order` with that count}
+        self.first: t.Dict[int, int] = {}
+        self.total = 0
+
+    @classmethod
+    def from_counts(cls, counts: t.Dict[str, int]) -> "RankedCounter":
+        ranked = cls()
+        ranked.order = sorted(counts, key=lambda x: counts[x], reverse=True)
+        ranked.counts = dict(counts)
+        ranked.total = sum(counts.values())
+        for idx, key in enumerate(ranked.order):
+            ranked.pos[key] = idx
+            ranked.first.setdefault(counts[key], idx)
+        return ranked
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, key: str) -> int:
+        return self.counts.get(key, 0)
+
+    def increment(self, key: str) -> None:
+        self.total += 1
+        count = self.counts.get(key)
+        if count is None:
+            # New keys have the lowest possible count so they go on the end
+            self.order.append(key)
+            self.pos[key] = len(self.order) - 1
+            self.counts[key] = 1
+            self.first.setdefault(1, len(self.order) - 1)
+            return
+
+        idx = self.pos[key]
+        head = self.first[count]
+        if head != idx:
+            other = self.order[head]
+            self.order[head], self.order[idx] = key, other
+            self.pos[key], self.pos[other] = head, idx
+        # The key now closes the run above it (or starts it) and the run it left starts one later
+        if head + 1 < len(self.order) and self.counts[self.order[head + 1]] == count:
+            self.first[count] = head + 1
+        else:
+            del self.first[count]
+        self.first.setdefault(count + 1, head)
+        self.counts[key] = count + 1
+
+    def top(self, start: int = 0, stop: t.Optional[int] = None) -> t.List[t.Tuple[str, int]]:
+        """Slice of the ranking as (key, count) pairs"""
+        return [(key, self.counts[key]) for key in self.order[start:stop]]
+
+    def rank(self, key: str) -> t.Optional[int]:
+        """Zero based position of a key in the ranking, keys with equal counts get consecutive positions"""
+        return self.pos.get(key)
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import typing as t
+from time import monotonic
 
 import deepl
 import googletrans
@@ -13,9 +14,25 @@ from aiohttp import (
 from httpx import ReadTimeout
 from rapidfuzz import fuzz
 
+from .cache import TranslationCache
 from .constants import deepl_langs, google_langs
 
 log = logging.getLogger("red.vrt.fluent.api")
+# Seconds a Deepl usage check is trusted before asking the API again
+USAGE_TTL = 300
+
+
+def build_aliases(langs: t.List[dict]) -> t.Dict[str, str]:
+    """{lowercase code or name: code} so exact lookups skip fuzzy matching"""
+    aliases = {}
+    for i in langs:
+        aliases[i["language"].lower()] = i["language"]
+        aliases[i["name"].lower()] = i["language"]
+    return aliases
+
+
+DEEPL_ALIASES = build_aliases(deepl_langs)
+GOOGLE_ALIASES = build_aliases(google_langs)
 
 
 class Result:
@@ -29,8 +46,58 @@ class Result:
 
 
 class TranslateManager:
-    def __init__(self, deepl_key: t.Optional[str] = None):
+    """
+    Translates text with Deepl, Google or Flowery
+
+    Provider clients are created on first use and reused, so keep one manager around and call `close` when done.
+    If a `TranslationCache` is given, results are looked up there before any provider is called.
+    """
+
+    def __init__(self, deepl_key: t.Optional[str] = None, cache: t.Optional[TranslationCache] = None):
         self.deepl_key = deepl_key
+        self.cache = cache
+        self._deepl: t.Optional[deepl.Translator] = None
+        self._google: t.Optional[googletrans.Translator] = None
+        self._session: t.Optional[ClientSession] = None
+        self.limit_reached = False
+        self.usage_checked = 0.0
+
+    def set_deepl_key(self, key: t.Optional[str]) -> None:
+        if key == self.deepl_key:
+            return
+        self.deepl_key = key
+        self.close_deepl()
+        self.limit_reached = False
+        self.usage_checked = 0.0
+
+    def close_deepl(self) -> None:
+        if self._deepl is not None and hasattr(self._deepl, "close"):
+            self._deepl.close()
+        self._deepl = None
+
+    @property
+    def deepl_client(self) -> deepl.Translator:
+        if self._deepl is None:
+            self._deepl = deepl.Translator(self.deepl_key, send_platform_info=False)
+        return self._deepl
+
+    @property
+    def google_client(self) -> googletrans.Translator:
+        if self._google is None:
+            self._google = googletrans.Translator()
+        return self._google
+
+    @property
+    def session(self) -> ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(timeout=ClientTimeout(total=10))
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self.close_deepl()
+        self._google = None
 
     async def translate(
         self,
@@ -56,32 +123,68 @@ class TranslateManager:
         if self.deepl_key:
             if lang := await self.fuzzy_deepl_lang(target_lang.lower()):
                 log.debug("Using deepl")
-                res = await self.deepl(text, lang, formality)
+                res = await self.cached("deepl", text, lang, formality)
                 if res is None or (res.text == text and not force):
                     log.warning(f"Deepl failed to translate to {target_lang}")
                     res = None
 
         if res is None:
             if lang := await self.fuzzy_google_flowery_lang(target_lang.lower()):
-                res = await self.google(text, lang)
+                res = await self.cached("google", text, lang)
                 if res is None or (res.text == text and not force):
                     log.info("Google failed. Calling flowery as fallback")
-                    res = await self.flowery(text, lang)
+                    res = await self.cached("flowery", text, lang)
                     if res is None:
                         log.info("Flowery returned None as well")
         return res
 
+    async def cached(
+        self,
+        provider: str,
+        text: str,
+        target_lang: str,
+        formality: t.Optional[str] = None,
+    ) -> t.Optional[Result]:
+        """Call a provider through the translation cache, failed or unchanged translations are never stored"""
+        if self.cache is not None:
+            if hit := await asyncio.to_thread(self.cache.get, provider, text, target_lang, formality):
+                return Result(*hit)
+        if provider == "deepl":
+            res = await self.deepl(text, target_lang, formality)
+        elif provider == "google":
+            res = await self.google(text, target_lang)
+        else:
+            res = await self.flowery(text, target_lang)
+        # Results identical to the source count as failures in translate, caching them would stop the fallback
+        # providers from ever being tried for this text
+        if res is not None and res.text != text and self.cache is not None:
+            result = (res.text, str(res.src), str(res.dest))
+            await asyncio.to_thread(self.cache.put, provider, text, target_lang, result, formality)
+        return res
+
+    async def deepl_limit_reached(self) -> bool:
+        """Deepl usage check, only asks the API once every USAGE_TTL seconds"""
+        if monotonic() - self.usage_checked < USAGE_TTL:
+            return self.limit_reached
+        try:
+            usage = await asyncio.to_thread(self.deepl_client.get_usage)
+            self.limit_reached = usage.any_limit_reached
+        except deepl.exceptions.DeepLException as e:
+            log.error("Failed to check deepl usage", exc_info=e)
+            self.limit_reached = True
+        self.usage_checked = monotonic()
+        return self.limit_reached
+
     async def get_lang(self, target: str) -> t.Optional[str]:
         return await self.fuzzy_deepl_lang(target.lower()) or await self.fuzzy_google_flowery_lang(target.lower())
 
     async def fuzzy_deepl_lang(self, target: str) -> t.Optional[str]:
-        def _fuzzy_deepl_lang():
-            if len(target) == 2 or "-" in target:
-                for i in deepl_langs:
-                    if i["language"].lower() == target:
-                        return i["language"]
-                return None
+        if lang := DEEPL_ALIASES.get(target):
+            return lang
+        if len(target) == 2 or "-" in target:
+            return None
 
+        def _fuzzy_deepl_lang():
             scores = [(i["language"], fuzz.ratio(i["name"].lower(), target)) for i in deepl_langs]
             lang = max(scores, key=lambda x: x[1])
             if lang[1] > 80:
@@ -90,13 +193,12 @@ class TranslateManager:
         return await asyncio.to_thread(_fuzzy_deepl_lang)
 
     async def fuzzy_google_flowery_lang(self, target: str) -> t.Optional[str]:
-        def _fuzzy_google_flowery_lang():
-            if len(target) == 2 or "-" in target:
-                for i in google_langs:
-                    if i["language"].lower() == target:
-                        return i["language"]
-                return None
+        if lang := GOOGLE_ALIASES.get(target):
+            return lang
+        if len(target) == 2 or "-" in target:
+            return None
 
+        def _fuzzy_google_flowery_lang():
             scores = [(i["language"], fuzz.ratio(i["name"].lower(), target)) for i in google_langs]
             lang = max(scores, key=lambda x: x[1])
             if lang[1] > 80:
@@ -111,42 +213,40 @@ class TranslateManager:
         formality: t.Optional[str] = None,
     ) -> t.Optional[Result]:
         log.debug(f"Deepl: {target_lang}")
-        translator = deepl.Translator(self.deepl_key, send_platform_info=False)
-        usage = await asyncio.to_thread(translator.get_usage)
-        if usage.any_limit_reached:
+        if await self.deepl_limit_reached():
             return None
         try:
             res = await asyncio.to_thread(
-                translator.translate_text, text=text, target_lang=target_lang, formality=formality
+                self.deepl_client.translate_text, text=text, target_lang=target_lang, formality=formality
             )
             return Result(text=res.text, src=res.detected_source_lang, dest=target_lang)
+        except deepl.exceptions.QuotaExceededException:
+            log.warning("Deepl quota exceeded")
+            self.limit_reached = True
+            self.usage_checked = monotonic()
         except deepl.exceptions.DeepLException as e:
             log.error(f"Failed to make deepl translation to {target_lang}", exc_info=e)
 
     async def google(self, text: str, target_lang: str) -> t.Optional[Result]:
         log.debug(f"Google: {target_lang}")
-        translator = googletrans.Translator()
         try:
-            res = await asyncio.to_thread(translator.translate, text, target_lang)
+            res = await asyncio.to_thread(self.google_client.translate, text, target_lang)
             return Result(text=res.text, src=res.src, dest=res.dest)
         except (AttributeError, TypeError, ReadTimeout):
             return None
 
-    @staticmethod
-    async def flowery(text: str, target_lang: str) -> t.Optional[Result]:
+    async def flowery(self, text: str, target_lang: str) -> t.Optional[Result]:
         log.debug(f"Flowery: {target_lang}")
         endpoint = "https://api.flowery.pw/v1/translation/translate"
         params = {"text": text, "result_language_code": target_lang}
-        timeout = ClientTimeout(total=10)
         try:
-            async with ClientSession(timeout=timeout) as session:
-                async with session.get(url=endpoint, params=params) as res:
-                    if res.status == 200:
-                        data = await res.json()
-                        return Result(
-                            text=data["text"],
-                            src=data["language"]["original"],
-                            dest=data["language"]["result"],
-                        )
+            async with self.session.get(url=endpoint, params=params) as res:
+                if res.status == 200:
+                    data = await res.json()
+                    return Result(
+                        text=data["text"],
+                        src=data["language"]["original"],
+                        dest=data["language"]["result"],
+                    )
         except (ClientResponseError, ClientConnectorError):
             return None
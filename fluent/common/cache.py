@@ -0,0 +1,121 @@
+import hashlib
+import itertools
+import logging
+import sqlite3
+import threading
+import typing as t
+from pathlib import Path
+
+log = logging.getLogger("red.vrt.fluent.cache")
+
+
+class TranslationCache:
+    """
+    Persistent LRU cache of translations backed by SQLite
+
+    Entries are keyed by provider, target language, formality and a hash of the source text. The source language
+    isn't part of the key since every provider auto-detects it, it is stored with the result instead.
+    Once the cache holds more than `max_entries`, the least recently used entries are evicted.
+    Lookups and stores that land after `close` (calls still running in a thread when the cog unloads) are skipped.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.closed = False
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                text TEXT NOT NULL,
+                src TEXT NOT NULL,
+                dest TEXT NOT NULL,
+                used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS translations_used ON translations (used)")
+        self.count: int = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        # `used` is a counter rather than a timestamp, clock resolution could tie entries touched back to back
+        last = self.conn.execute("SELECT MAX(used) FROM translations").fetchone()[0] or 0
+        self.tick = itertools.count(int(last) + 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def key(provider: str, text: str, dest: str, formality: t.Optional[str] = None) -> str:
+        raw = "\0".join([provider, dest.lower(), formality or "", text])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(
+        self, provider: str, text: str, dest: str, formality: t.Optional[str] = None
+    ) -> t.Optional[t.Tuple[str, str, str]]:
+        """Cached (text, src, dest) for a translation, or None"""
+        key = self.key(provider, text, dest, formality)
+        with self.lock:
+            if self.closed:
+                return None
+            row = self.conn.execute("SELECT text, src, dest FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE translations SET used = ? WHERE key = ?", (next(self.tick), key))
+        return row
+
+    def put(
+        self,
+        provider: str,
+        text: str,
+        dest: str,
+        result: t.Tuple[str, str, str],
+        formality: t.Optional[str] = None,
+    ) -> None:
+        """Store a (text, src, dest) result"""
+        key = self.key(provider, text, dest, formality)
+        with self.lock:
+            if self.closed:
+                return
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO translations (key, provider, text, src, dest, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, *result, next(self.tick)),
+            )
+            if cur.rowcount:
+                self.count += 1
+            else:
+                self.conn.execute(
+                    "UPDATE translations SET text = ?, src = ?, dest = ?, used = ? WHERE key = ?",
+                    (*result, next(self.tick), key),
+                )
+            if self.count > self.max_entries:
+                self._evict(self.count - self.max_entries)
+
+    def _evict(self, amount: int) -> None:
+        # Oldest `used` first, the index keeps this from scanning the table
+        cur = self.conn.execute(
+            "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY used LIMIT ?)",
+            (amount,),
+        )
+        self.count -= cur.rowcount
+        log.debug("Evicted %s cached translations", cur.rowcount)
+
+    def clear(self) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            self.conn.execute("DELETE FROM translations")
+            self.count = 0
+            self.tick = itertools.count(1)
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.conn.close()
@@ -0,0 +1,316 @@
+import math
+import re
+import typing as t
+import unicodedata
+from collections import Counter
+
+# Discord markup and links that say nothing about the language of a message
+NOISE = re.compile(
+    r"<a?:\w+:\d+>"  # custom emojis
+    r"|<(?:@[!&]?|#)\d+>"  # user, role and channel mentions
+    r"|<t:\d+(?::\w)?>"  # timestamps
+    r"|https?://\S+"
+    r"|```.*?```|`[^`]*`"  # code
+    r"|:\w+:",  # emoji shortcodes
+    re.DOTALL,
+)
+# Trigrams needed before a Latin or Cyrillic guess is trusted
+MIN_TRIGRAMS = 8
+# Average log-likelihood per trigram the best language must lead the runner up by
+MIN_MARGIN = 0.1
+# Share of the letters that marker letters must make up to be trusted when the trigram ranking disagrees,
+# a single borrowed word ("a new Straße map") shouldn't flip the language of a whole sentence
+MIN_MARKER_DENSITY = 0.1
+# Only the start of long messages is scored
+MAX_CHARS = 500
+# Codes that providers use interchangeably
+EQUIVALENT = {"iw": "he", "nb": "no", "nn": "no", "jw": "jv", "fil": "tl"}
+
+# Unicode ranges of scripts that (mostly) belong to a single language
+SCRIPTS: t.List[t.Tuple[int, int, str]] = [
+    (0x0370, 0x03FF, "el"),
+    (0x0530, 0x058F, "hy"),
+    (0x0590, 0x05FF, "he"),
+    (0x0900, 0x097F, "hi"),
+    (0x0980, 0x09FF, "bn"),
+    (0x0A00, 0x0A7F, "pa"),
+    (0x0A80, 0x0AFF, "gu"),
+    (0x0B00, 0x0B7F, "or"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0C00, 0x0C7F, "te"),
+    (0x0C80, 0x0CFF, "kn"),
+    (0x0D00, 0x0D7F, "ml"),
+    (0x0D80, 0x0DFF, "si"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x0E80, 0x0EFF, "lo"),
+    (0x1000, 0x109F, "my"),
+    (0x10A0, 0x10FF, "ka"),
+    (0x1100, 0x11FF, "ko"),
+    (0x1200, 0x137F, "am"),
+    (0x1780, 0x17FF, "km"),
+    (0x3040, 0x30FF, "ja"),
+    (0x3130, 0x318F, "ko"),
+    (0x4E00, 0x9FFF, "zh"),
+    (0xAC00, 0xD7AF, "ko"),
+]
+# Letters that single out a language sharing its script with others
+MARKERS: t.Dict[str, t.List[t.Tuple[str, str]]] = {
+    "latin": [
+        ("ơưđạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ", "vi"),
+        ("őű", "hu"),
+        ("řůě", "cs"),
+        ("łąężźśń", "pl"),
+        ("ğı", "tr"),
+        ("șț", "ro"),
+        ("ß", "de"),
+    ],
+    "arabic": [("ےٹڈڑںہ", "ur"), ("پچژگکی", "fa")],
+    "cyrillic": [("әғқңөұүһ", "kk"), ("ѓќѕ", "mk"), ("ђћџ", "sr"), ("ў", "be"), ("іїєґ", "uk")],
+}
+
+# High frequency words per language, trigram profiles are built from these when the module is imported
+SEEDS: t.Dict[str, t.Tuple[str, str]] = {
+    "en": (
+        "latin",
+        "the of and to in is you that it he was for on are as with his they at be this have from or one had by "
+        "but not what all were we when your can said there use an each which she do how their if will up other "
+        "about out many then them these so some her would make like him into time has look two more write go see "
+        "no way could people my than first been call who its now find long down day did get come made may part "
+        "just know yeah really think good thanks please because going want why where here there thing something",
+    ),
+    "es": (
+        "latin",
+        "de la que el en y a los se del las un por con no una su para es al lo como más o pero sus le ha me si "
+        "sin sobre este ya entre cuando todo esta ser son dos también fue había era muy años hasta desde está mi "
+        "porque qué sólo han yo hay vez puede todos así nos ni parte tiene él uno donde bien tiempo mismo ese "
+        "ahora cada vida otro después te otros aunque esa eso hace otra tan durante siempre día tanto ella sí "
+        "dijo gran menos hola gracias bueno cómo estás quiero tengo vamos nada algo aquí entonces usted",
+    ),
+    "fr": (
+        "latin",
+        "de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il sont avec ou "
+        "mais comme on tout nous sa aussi elle être fait leur ses très ont bien deux même été cette je vous son "
+        "sans peut lui entre après tous temps avait autre faire encore moi toi merci bonjour oui non quoi c'est "
+        "j'ai pourquoi parce quand alors donc ça va suis rien quelque chose ici maintenant tu es avoir aux",
+    ),
+    "de": (
+        "latin",
+        "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus "
+        "er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur oder aber "
+        "vor zur bis mehr durch man sein wurde sei ich du wir ihr mich dich was warum ja nein danke bitte gut "
+        "jetzt heute schon kann kein keine hier wo wer immer etwas nichts habe bist müssen möchte sehr",
+    ),
+    "it": (
+        "latin",
+        "di e il la che in a per un è del non sono le con una i da si al lo come ma ha anche più dei della nel "
+        "alla se gli questo ci ho mi ti cosa perché quando molto essere fare tutto tutti anno ancora dove sempre "
+        "bene grazie ciao sei siamo hai questa quello sul nella delle stato fatto io tu lui lei noi voi loro "
+        "adesso qui niente qualcosa allora quindi voglio posso buongiorno",
+    ),
+    "pt": (
+        "latin",
+        "de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem à "
+        "seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois sem "
+        "mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha têm "
+        "numa pelos elas obrigado olá tudo bem então agora aqui vamos nada coisa porque não",
+    ),
+    "nl": (
+        "latin",
+        "de en van ik te dat die in een hij het niet zijn is was op aan met als voor had er maar om hem dan zou "
+        "of wat mijn men dit zo door over ze zich bij ook tot je mij uit daar haar naar heb hoe heeft hebben "
+        "deze want nog zal zij nu geen omdat iets worden toch al waren veel meer doen toen moet ben zonder kan "
+        "hun dus alles onder ja eens hier wie werd altijd wordt bedankt goed jij jullie waarom",
+    ),
+    "sv": (
+        "latin",
+        "och i att det som en på är av för med till den har de inte om ett han men var jag sig från vi så kan "
+        "man när år säger hon under också efter eller nu sin där vid mot ska skulle kommer ut får finns vara "
+        "hade alla andra mycket än här då sedan över bara blir upp även vad två dem du tack hej ja nej varför "
+        "hur bra något ingen mig dig jättebra",
+    ),
+    "da": (
+        "latin",
+        "og i at det er en til på de med for af den ikke der var han som har jeg sig et om vi men så skal fra "
+        "kan hun da sin efter over når ud op også være havde blev bliver hvor eller nu mig dig hvad hvis ja nej "
+        "tak hej godt meget noget kun dem jo alle år siger andre mod får selv hvorfor nogen ingen rigtig",
+    ),
+    "no": (
+        "latin",
+        "og i det på som er en til å av for med at de ikke den har jeg om et han var men så seg fra vi kan hun "
+        "da sin etter over når ut opp også være hadde ble blir hvor eller nå meg deg hva hvis ja nei takk hei "
+        "bra mye noe bare dem alle år sier andre mot får selv hvorfor noen ingen veldig kjempe",
+    ),
+    "fi": (
+        "latin",
+        "ja on ei se että hän oli ovat mutta kun niin myös vain tai jos kuin mitä minä sinä me te he tämä tuo "
+        "joka mikä siitä sen sitä hänen heidän ole olen olet olemme kanssa nyt sitten vielä jo kaikki paljon "
+        "hyvä kiitos hei moi kyllä miksi missä koska täällä siellä jotain aina mutta minun sinun voi pitää",
+    ),
+    "pl": (
+        "latin",
+        "i w nie na się z do to że jest jak o co ale po tak za od jego już tylko jej czy przez może być był było "
+        "dla ich bardzo jestem jesteś mnie ciebie ten ta te tego które który która gdzie kiedy dlaczego dziękuję "
+        "cześć dobrze wszystko teraz tutaj jeszcze więc też coś nic mam masz chcę będzie",
+    ),
+    "cs": (
+        "latin",
+        "a se na v je to že s z o do i jsem jako ale by k od po tak jsou pro za už jen jeho co jak které který "
+        "která byl bylo být mi mě tě ty my vy oni není jsme když proč děkuji ahoj dobře ano ne všechno teď tady "
+        "ještě také nebo protože něco nic mám máš chci bude",
+    ),
+    "tr": (
+        "latin",
+        "ve bir bu da de için ile çok ne var ben sen o biz siz onlar ama gibi daha en değil mi mı mu mü olarak "
+        "kadar sonra şey her nasıl neden evet hayır teşekkürler merhaba iyi şimdi burada orada yok bana sana onu "
+        "bunu şu olan oldu olur ise ki istiyorum geliyor yapıyor değilim misin",
+    ),
+    "id": (
+        "latin",
+        "yang dan di ini itu dengan untuk tidak dari dalam akan pada juga saya anda kamu kami kita mereka ada "
+        "adalah ke bisa sudah karena atau seperti jika apa bagaimana kenapa terima kasih halo baik sekarang sini "
+        "sana lagi hanya banyak sangat belum harus mau sedang tahu",
+    ),
+    "ro": (
+        "latin",
+        "și de la în a pe cu o un nu că se este din care mai sunt pentru ce să ca fi dar am ai au eu tu el ea "
+        "noi voi ei lui acest această foarte bine mulțumesc salut da unde când acum aici tot toate ceva nimic "
+        "vreau poate fost avem",
+    ),
+    "hu": (
+        "latin",
+        "a az és hogy nem is egy van meg de már csak ez mint még ki el be fel le volt lesz vagy mert ha én te ő "
+        "mi ti ők nagyon jó köszönöm szia igen miért hol mikor most itt ott minden valami azt ezt kell lehet "
+        "akkor vagyok vagy",
+    ),
+    "vi": (
+        "latin",
+        "và của có là không được trong cho những một người với các này đã để khi thì cũng tôi bạn anh em chúng "
+        "ta họ như đó rất nhiều làm gì sao đâu bây giờ cảm ơn xin chào vâng tốt biết muốn đang sẽ",
+    ),
+    "ru": (
+        "cyrillic",
+        "и в не на я что он с как а то все она так его но да ты к у же вы за бы по только ее мне было вот от "
+        "меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас опять вам ведь там "
+        "потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам без чего раз тоже "
+        "себе под будет спасибо привет хорошо почему это очень",
+    ),
+    "uk": (
+        "cyrillic",
+        "і в не на я що він з як а то все вона так його але ти до у же ви за б по тільки її мені було ось від "
+        "мене ще ні о йому тепер коли навіть ну якщо вже або бути був нього вас там потім себе нічого їй може "
+        "вони тут де є треба неї для ми тебе їх чим була сам без чого раз теж собі під буде дякую привіт добре "
+        "чому це дуже",
+    ),
+    "bg": (
+        "cyrillic",
+        "и в не на да се е че с за от по как са това той тя ние вие те но ако или във към при след има беше ще "
+        "бъде аз ти много добре благодаря здравей защо къде кога сега тук там всичко нещо още само също какво "
+        "искам мога",
+    ),
+}
+
+
+def trigrams(text: str) -> t.List[str]:
+    grams = []
+    for word in re.findall(r"[^\W\d_]+(?:'[^\W\d_]+)?", text.lower()):
+        padded = f" {word} "
+        grams.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def build_profiles() -> t.Dict[str, t.Dict[str, t.Dict[str, float]]]:
+    """{script: {lang: {trigram: log probability}}}, unseen trigrams score the `""` entry"""
+    counts = {lang: Counter(trigrams(words)) for lang, (_, words) in SEEDS.items()}
+    vocab = len(set().union(*counts.values()))
+    profiles: t.Dict[str, t.Dict[str, t.Dict[str, float]]] = {}
+    for lang, (script, _) in SEEDS.items():
+        total = sum(counts[lang].values()) + vocab
+        profile = {gram: math.log((count + 1) / total) for gram, count in counts[lang].items()}
+        profile[""] = math.log(1 / total)
+        profiles.setdefault(script, {})[lang] = profile
+    return profiles
+
+
+PROFILES = build_profiles()
+
+
+def normalize(code: str) -> str:
+    """Base language code of a provider or locale code, EN-US -> en, zh-CN -> zh, iw -> he"""
+    base = code.split("-")[0].split("_")[0].lower()
+    return EQUIVALENT.get(base, base)
+
+
+def strip_noise(text: str) -> str:
+    return NOISE.sub(" ", text)
+
+
+def has_words(text: str) -> bool:
+    """Whether there is anything to translate once emojis, mentions, links and code are removed"""
+    return any(char.isalpha() for char in strip_noise(text))
+
+
+def script_of(char: str) -> t.Optional[str]:
+    point = ord(char)
+    if point < 0x0250:
+        return "latin"
+    if 0x0400 <= point <= 0x04FF:
+        return "cyrillic"
+    if 0x0600 <= point <= 0x06FF:
+        return "arabic"
+    for start, end, lang in SCRIPTS:
+        if start <= point <= end:
+            return lang
+    if unicodedata.category(char).startswith("L"):
+        return "other"
+    return None
+
+
+def rank(script: str, grams: t.List[str]) -> t.List[t.Tuple[float, str]]:
+    """(average log-likelihood, lang) of every profiled language of a script, best first"""
+    scores = []
+    for lang, profile in PROFILES.get(script, {}).items():
+        unseen = profile[""]
+        scores.append((sum(profile.get(gram, unseen) for gram in grams) / len(grams), lang))
+    scores.sort(reverse=True)
+    return scores
+
+
+def detect(text: str, strict: bool = False) -> t.Optional[str]:
+    """
+    Guess the language of a message without calling any API
+
+    Returns a base language code, or None when the text is too short or too ambiguous to tell.
+    With `strict`, Latin, Cyrillic and Arabic script guesses are only returned when the trigram scores are confident,
+    marker letters alone aren't enough. Use it where a wrong guess skips a translation rather than costing a retry.
+    """
+    text = strip_noise(text)[:MAX_CHARS].lower()
+    scripts = Counter(script for char in text if char.isalpha() and (script := script_of(char)))
+    if not scripts:
+        return None
+    script = scripts.most_common(1)[0][0]
+    if script == "zh" and "ja" in scripts:
+        # Japanese mixes kanji with kana
+        return "ja"
+    if script == "other":
+        return None
+    if script not in ("latin", "cyrillic", "arabic"):
+        return script
+
+    grams = trigrams(text)
+    scores = rank(script, grams) if grams else []
+    best = scores[0][1] if scores else None
+
+    if not strict:
+        letters = sum(scripts.values())
+        for chars, lang in MARKERS.get(script, []):
+            hits = sum(text.count(char) for char in chars)
+            if hits and (lang == best or hits / letters >= MIN_MARKER_DENSITY):
+                return lang
+        if script == "arabic":
+            return "ar"
+
+    if len(grams) < MIN_TRIGRAMS or not scores:
+        return None
+    if len(scores) > 1 and scores[0][0] - scores[1][0] < MIN_MARGIN:
+        return None
+    return best
@@ -7,11 +7,14 @@ from aiocache import cached
 from discord import app_commands
 from redbot.core import Config, commands
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from redbot.core.i18n import Translator, cog_i18n
 from redbot.core.utils.chat_formatting import pagify
 
 from .common.api import Result, TranslateManager
+from .common.cache import TranslationCache
 from .common.constants import available_langs
+from .common.detect import detect, has_words, normalize
 
 log = logging.getLogger("red.vrt.fluent")
 _ = Translator("Fluent", __file__)
@@ -26,7 +29,13 @@ async def translate_message_ctx(interaction: discord.Interaction, message: disco
         await interaction.response.defer(ephemeral=True)
     bot: Red = interaction.client
     content = message.content or message.embeds[0].description
-    res: t.Optional[Result] = await bot.get_cog("Fluent").translate(content, message.guild.preferred_locale.value)
+    target = message.guild.preferred_locale.value
+    # Skipping on a wrong guess would refuse a valid translation, only trust confident guesses here
+    if detect(content, strict=True) == normalize(target):
+        return await interaction.followup.send(
+            _("❌ The detected language is the same as the target language."), ephemeral=True
+        )
+    res: t.Optional[Result] = await bot.get_cog("Fluent").translate(content, target)
     if res is None:
         return await interaction.followup.send(_("❌ Translation failed."), ephemeral=True)
     if res.src == res.dest:
@@ -60,7 +69,7 @@ class Fluent(commands.Cog):
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "2.2.0"
+    __version__ = "2.4.1"
 
     def format_help_for_context(self, ctx: commands.Context):
         helpcmd = super().format_help_for_context(ctx)
@@ -75,12 +84,17 @@ class Fluent(commands.Cog):
         self.config.register_guild(channels={})
         logging.getLogger("hpack.hpack").setLevel(logging.INFO)
         logging.getLogger("deepl").setLevel(logging.WARNING)
+        self.cache = TranslationCache(cog_data_path(self) / "translations.db")
+        self.translator = TranslateManager(cache=self.cache)
 
     async def cog_load(self):
         self.bot.tree.add_command(translate_message_ctx)
 
     async def cog_unload(self):
         self.bot.tree.remove_command(translate_message_ctx)
+        await self.translator.close()
+        # Lookups still running in a thread see the cache closed and skip it instead of erroring
+        self.cache.close()
 
     @cached(ttl=10)
     async def get_channels(self, guild: discord.Guild) -> dict:
@@ -99,8 +113,8 @@ class Fluent(commands.Cog):
             t.Optional[Result]: Result object containing source/target lang and translated text
         """
         deepl_key = await self.bot.get_shared_api_tokens("deepl")
-        translator = TranslateManager(deepl_key=deepl_key.get("key"))
-        return await translator.translate(msg, dest, force=force)
+        self.translator.set_deepl_key(deepl_key.get("key"))
+        return await self.translator.translate(msg, dest, force=force)
 
     @commands.command(name="serverlocale")
     async def server_locale(self, ctx: commands.Context):
@@ -113,8 +127,7 @@ class Fluent(commands.Cog):
     @commands.bot_has_permissions(embed_links=True)
     async def translate_command(self, ctx: commands.Context, to_language: str, *, message: t.Optional[str] = None):
         """Translate a message"""
-        translator = TranslateManager()
-        lang = await translator.get_lang(to_language)
+        lang = await self.translator.get_lang(to_language)
         if not lang:
             txt = _("The target language `{}` was not found.").format(to_language)
             return await ctx.send(txt)
@@ -196,9 +209,8 @@ class Fluent(commands.Cog):
             )
             return await ctx.send(txt)
 
-        translator = TranslateManager()
-        lang1 = await translator.get_lang(language1)
-        lang2 = await translator.get_lang(language2)
+        lang1 = await self.translator.get_lang(language1)
+        lang2 = await self.translator.get_lang(language2)
 
         if not lang1 and not lang2:
             txt = _("Both of those languages are invalid.")
@@ -274,7 +286,8 @@ class Fluent(commands.Cog):
             return
         if not message.channel:
             return
-        if not message.content.strip():
+        if not has_words(message.content):
+            # Only emojis, mentions, links or code
             return
 
         channels = await self.get_channels(message.guild)
@@ -284,13 +297,16 @@ class Fluent(commands.Cog):
 
         lang1 = channels[channel_id]["lang1"]
         lang2 = channels[channel_id]["lang2"]
-        log.debug(f"Translating... {lang1} <-> {lang2}")
+        base1 = normalize(await self.translator.get_lang(lang1) or lang1)
+        # Messages already in language1 go straight to language2, everything else goes to language1
+        detected = detect(message.content)
+        target = lang2 if detected == base1 else lang1
+        log.debug(f"Translating... {lang1} <-> {lang2}, detected {detected}, target {target}")
 
         channel = message.channel
         async with channel.typing():
-            # Attempts to translate message into language1.
             try:
-                trans = await self.translate(message.content, lang1, force=True)
+                trans = await self.translate(message.content, target, force=True)
             except Exception as e:
                 log.error("Initial listener translation failed", exc_info=e)
                 self.bot._last_exception = e
@@ -300,19 +316,14 @@ class Fluent(commands.Cog):
                 log.debug("Auto translation first phase returned None")
                 return
 
-            translator = TranslateManager()
-            source = await translator.get_lang(trans.src)
-            source = source.split("-")[0].lower()
-            target = await translator.get_lang(lang1)
-            target = target.split("-")[0].lower()
-            log.debug(f"Source: {source}, target: {target}")
-            log.debug(f"Raw Source: {trans.src}")
-
-            # If the source language is also language1, translate into language2
-            # If source language was language2, this saves api calls because translating gets the source and translation
-            if source == target:
+            source = normalize(str(trans.src))
+            log.debug(f"Source: {source}, language1: {base1}, raw source: {trans.src}")
+
+            # The provider's detected source disagrees with the local guess, retarget
+            if (source == base1) != (target == lang2):
+                target = lang1 if target == lang2 else lang2
                 try:
-                    trans = await self.translate(message.content, lang2)
+                    trans = await self.translate(message.content, target, force=target == lang1)
                 except Exception as e:
                     log.error("Secondary listener translation failed", exc_info=e)
                     return
@@ -357,8 +368,7 @@ class Fluent(commands.Cog):
         await cog.register_function(cog_name="Fluent", schema=schema)
 
     async def get_translation(self, message: str, to_language: str, *args, **kwargs) -> str:
-        translator = TranslateManager()
-        lang = await translator.get_lang(to_language)
+        lang = await self.translator.get_lang(to_language)
         if not lang:
             return _("Invalid target language")
         try:
@@ -5,8 +5,12 @@ import pytest
 
 try:
     from .common.api import Result, TranslateManager
+    from .common.cache import TranslationCache
+    from .common.detect import detect, has_words, normalize
 except ImportError:
     from fluent.common.api import Result, TranslateManager
+    from fluent.common.cache import TranslationCache
+    from fluent.common.detect import detect, has_words, normalize
 
 
 @pytest.fixture
@@ -51,6 +55,94 @@ async def test_same_text_translation(manager):
     assert result.dest == "en"
 
 
+@pytest.mark.asyncio
+async def test_cached_translation(tmp_path):
+    manager = TranslateManager(cache=TranslationCache(tmp_path / "translations.db"))
+    manager.google = AsyncMock(return_value=Result("Hola", "en", "es"))
+    first = await manager.translate("Hello", "es")
+    second = await manager.translate("Hello", "es")
+    assert manager.google.await_count == 1
+    assert (second.text, second.src, second.dest) == (first.text, first.src, first.dest)
+
+
+@pytest.mark.asyncio
+async def test_failed_translation_not_cached(tmp_path):
+    manager = TranslateManager(cache=TranslationCache(tmp_path / "translations.db"))
+    manager.google = AsyncMock(return_value=None)
+    manager.flowery = AsyncMock(return_value=None)
+    await manager.translate("Hello", "es")
+    await manager.translate("Hello", "es")
+    assert manager.google.await_count == 2
+    assert len(manager.cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_unchanged_translation_not_cached(tmp_path):
+    manager = TranslateManager(cache=TranslationCache(tmp_path / "translations.db"))
+    manager.google = AsyncMock(return_value=Result("Hello", "en", "es"))
+    manager.flowery = AsyncMock(return_value=Result("Hola", "en", "es"))
+    await manager.translate("Hello", "es")
+    await manager.translate("Hello", "es")
+    assert manager.google.await_count == 2
+    assert manager.cache.get("google", "Hello", "es") is None
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = TranslationCache(tmp_path / "translations.db", max_entries=2)
+    cache.put("google", "one", "es", ("uno", "en", "es"))
+    cache.put("google", "two", "es", ("dos", "en", "es"))
+    # Touch the first entry so the second becomes the least recently used
+    assert cache.get("google", "one", "es") == ("uno", "en", "es")
+    cache.put("google", "three", "es", ("tres", "en", "es"))
+    assert len(cache) == 2
+    assert cache.get("google", "two", "es") is None
+    assert cache.get("google", "one", "es") is not None
+    assert cache.get("google", "three", "es") is not None
+
+
+@pytest.mark.parametrize(
+    "text, lang",
+    [
+        ("I think we should try again tomorrow evening if everyone is available", "en"),
+        ("Creo que deberíamos intentarlo otra vez mañana por la tarde", "es"),
+        ("Ich glaube wir sollten es morgen Abend noch einmal versuchen", "de"),
+        ("Всем привет, я не смог присоединиться из-за работы", "ru"),
+        ("大家好，昨晚有人完成了突袭吗？", "zh"),
+        ("みなさん、昨夜のレイドを終わらせた人はいますか？", "ja"),
+        ("ok", None),
+        ("ŁÓDŹ JEST PIĘKNA", "pl"),
+        ("I bought a new Straße map for the trip tomorrow", "en"),
+    ],
+)
+def test_detect(text, lang):
+    assert detect(text) == lang
+
+
+def test_detect_strict():
+    # Marker letters alone are enough for a best guess, but not for a strict one
+    assert detect("Straße") == "de"
+    assert detect("Straße", strict=True) is None
+    assert detect("Ich glaube wir sollten es morgen Abend noch einmal versuchen", strict=True) == "de"
+
+
+def test_has_words():
+    assert not has_words("<:pepe:1234> <@1234> https://example.com 😂")
+    assert has_words("<@1234> hello")
+
+
+def test_normalize():
+    assert normalize("EN-US") == "en"
+    assert normalize("zh-cn") == "zh"
+    assert normalize("iw") == "he"
+
+
+@pytest.mark.asyncio
+async def test_get_lang_aliases(manager):
+    assert await manager.get_lang("English") == "EN-US"
+    assert await manager.get_lang("es") == "ES"
+    assert await manager.get_lang("haitian creole") == "ht"
+
+
 if __name__ == "__main__":
     trans = TranslateManager()
     res = asyncio.run(trans.google("hello", "es"))
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+from time import time
+from typing import Dict, Iterable, Optional
+
+from .utils import RenderPool, exe, get_content_from_url, prepare_image
+
+log = logging.getLogger("red.vrt.pixl.cache")
+
+# Cached images are re-downloaded in the background once they are this old
+REFRESH_AFTER = 60 * 60 * 24 * 7
+# Failed urls are skipped without a network round-trip for this long, multiplied by the failure streak
+RETRY_AFTER = 60 * 60 * 24
+# Concurrent downloads while warming up
+WARMUP_CONCURRENCY = 4
+
+
+class ImageCache:
+    """
+    On-disk cache of validated, pre-resized game images keyed by url hash
+
+    Index entries look like {"url": str, "status": "ok" | "unreachable" | "invalid", "checked": float, "failures": int}
+    """
+
+    def __init__(self, path: Path, pool: Optional[RenderPool] = None):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.index_path = path / "index.json"
+        self.pool = pool
+        self.index: Dict[str, dict] = {}
+        self.refreshing: Dict[str, asyncio.Task] = {}
+        self.dirty = False
+        self.lock = asyncio.Lock()
+        if self.index_path.exists():
+            try:
+                self.index = json.loads(self.index_path.read_text())
+            except (json.JSONDecodeError, OSError) as e:
+                log.warning(f"Image cache index is unreadable, starting fresh: {e}")
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def file(self, url: str) -> Path:
+        return self.path / f"{self.key(url)}.webp"
+
+    def status(self, url: str) -> Optional[str]:
+        entry = self.index.get(self.key(url))
+        return entry["status"] if entry else None
+
+    def known_bad(self, url: str) -> bool:
+        entry = self.index.get(self.key(url))
+        if not entry or entry["status"] == "ok":
+            return False
+        return time() - entry["checked"] < RETRY_AFTER * entry["failures"]
+
+    async def get(self, url: str) -> Optional[bytes]:
+        """Get a prepared image, hitting the network only on a miss and refreshing stale entries in the background"""
+        if self.known_bad(url):
+            return None
+        entry = self.index.get(self.key(url))
+        if entry and entry["status"] == "ok":
+            data = await exe(self._read, url)
+            if data is not None:
+                if time() - entry["checked"] > REFRESH_AFTER:
+                    self.refresh(url)
+                return data
+        return await self.fetch(url)
+
+    def refresh(self, url: str) -> None:
+        key = self.key(url)
+        if key in self.refreshing:
+            return
+        task = asyncio.create_task(self.fetch(url, keep_on_failure=True))
+        task.add_done_callback(lambda _: self.refreshing.pop(key, None))
+        self.refreshing[key] = task
+
+    async def fetch(
+        self,
+        url: str,
+        timeout: int = 60,
+        keep_on_failure: bool = False,
+        save: bool = True,
+    ) -> Optional[bytes]:
+        """
+        Download, validate and store an image
+
+        Args:
+            url: image url
+            timeout: download timeout in seconds
+            keep_on_failure: keep serving the previously cached copy if the refresh fails
+            save: write the index afterwards, batch callers save once when they are done instead
+        """
+        key = self.key(url)
+        raw = await get_content_from_url(url, timeout=timeout)
+        data = None
+        if not raw:
+            await self._failed(url, "unreachable", keep_on_failure)
+        else:
+            try:
+                if self.pool is None:
+                    data = await exe(prepare_image, raw)
+                else:
+                    data = await self.pool.run(prepare_image, raw)
+            except OSError:  # UnidentifiedImageError or a truncated image
+                await self._failed(url, "invalid", keep_on_failure)
+        if data is not None:
+            await exe(self.file(url).write_bytes, data)
+            self.index[key] = {"url": url, "status": "ok", "checked": time(), "failures": 0}
+            self.dirty = True
+        if save:
+            await self.save()
+        return data
+
+    async def _failed(self, url: str, status: str, keep_on_failure: bool) -> None:
+        key = self.key(url)
+        entry = self.index.get(key)
+        if keep_on_failure and entry and entry["status"] == "ok":
+            # Try again on the next refresh rather than dropping a working copy
+            entry["checked"] = time() - REFRESH_AFTER + RETRY_AFTER
+        else:
+            failures = entry["failures"] + 1 if entry and entry["status"] != "ok" else 1
+            self.index[key] = {"url": url, "status": status, "checked": time(), "failures": failures}
+            await exe(self.file(url).unlink, True)
+        self.dirty = True
+
+    def _read(self, url: str) -> Optional[bytes]:
+        try:
+            return self.file(url).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    async def warmup(self, urls: Iterable[str]) -> int:
+        """Fetch every url that isn't cached yet, returns how many were fetched"""
+        sem = asyncio.Semaphore(WARMUP_CONCURRENCY)
+        todo = set()
+        for url in urls:
+            if self.known_bad(url):
+                continue
+            if self.status(url) != "ok" or not self.file(url).exists():
+                todo.add(url)
+
+        async def _fetch(url: str):
+            async with sem:
+                try:
+                    await self.fetch(url, timeout=30, save=False)
+                except Exception as e:
+                    log.warning(f"Failed to warm up {url}", exc_info=e)
+
+        try:
+            await asyncio.gather(*[_fetch(url) for url in todo])
+        finally:
+            await self.save()
+        return len(todo)
+
+    async def save(self) -> None:
+        async with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            await exe(self._write, json.dumps(self.index))
+
+    def _write(self, dump: str) -> None:
+        # Write then swap so a crash mid-write never leaves a truncated index behind
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(dump)
+        tmp.replace(self.index_path)
@@ -1,16 +1,14 @@
 import asyncio
-import functools
 import logging
 import math
 import random
 import traceback
-from io import BytesIO
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import discord
-from PIL import Image, UnidentifiedImageError
 from redbot.core import Config, bank, commands
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from redbot.core.errors import BalanceTooHigh
 from redbot.core.utils.chat_formatting import (
     box,
@@ -21,8 +19,9 @@ from redbot.core.utils.chat_formatting import (
 )
 from tabulate import tabulate
 
+from .cache import ImageCache
 from .defaults import defaults
-from .utils import PixlGrids, delete, exe, get_content_from_url
+from .utils import BLOCKS, PixlGrids, RenderPool, delete, prerender
 
 log = logging.getLogger("red.vrt.pixl")
 dpy2 = True if discord.version_info.major >= 2 else False
@@ -48,7 +47,7 @@ class Pixl(commands.Cog):
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "0.3.7"
+    __version__ = "0.4.3"
 
     def __init__(self, bot: Red, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -75,6 +74,43 @@ class Pixl(commands.Cog):
         self.config.register_member(wins=0, games=0, score=0)
 
         self.active = set()
+        # {channel_id: PixlGrids}
+        self.games: Dict[int, PixlGrids] = {}
+        # Reveal frames are rendered here so encoding never runs on the event loop, workers start in cog_load
+        self.pool = RenderPool(workers=2)
+        # Validated, pre-resized copies of game images
+        self.cache = ImageCache(cog_data_path(self) / "images", self.pool)
+        self.warmup_task: Optional[asyncio.Task] = None
+        if not dpy2:
+            # Older Red versions don't call cog_load
+            asyncio.create_task(self.cog_load())
+
+    async def cog_load(self):
+        self.pool.start()
+        self.warmup_task = asyncio.create_task(self.warmup())
+
+    def cog_unload(self):
+        if self.warmup_task is not None:
+            self.warmup_task.cancel()
+        self.pool.shutdown()
+
+    async def warmup(self):
+        """Cache every guild, global and default image in the background so games start without a download"""
+        await self.bot.wait_until_red_ready()
+        urls = [i["url"] for i in defaults]
+        urls.extend(i["url"] for i in await self.config.images())
+        for data in (await self.config.all_guilds()).values():
+            urls.extend(i["url"] for i in data.get("images", []))
+        fetched = await self.cache.warmup(urls)
+        if fetched:
+            log.info(f"Image cache warmed up with {fetched} images")
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or not message.guild:
+            return
+        if game := self.games.get(message.channel.id):
+            game.on_message(message)
 
     @commands.command(name="pixlboard", aliases=["pixlb", "pixelb", "pixlelb", "pixleaderboard"])
     @commands.guild_only()
@@ -185,6 +221,9 @@ class Pixl(commands.Cog):
         if conf["use_default"] or len(to_use) == 0:
             to_use.extend(defaults)
 
+        # Only render the frames that can be shown before the time limit
+        max_frames = conf["time_limit"] // max(delay, 1) + 1
+
         tries = 0
         cant_get = []
         while tries < 3:
@@ -192,13 +231,14 @@ class Pixl(commands.Cog):
             choice = random.choice(to_use)
             url = choice["url"]
             correct = choice["answers"]
-            imgbytes = await get_content_from_url(url)
+            imgbytes = await self.cache.get(url)
             if not imgbytes:
                 cant_get.append(url)
                 continue
             try:
-                game_image = await exe(functools.partial(Image.open, BytesIO(imgbytes)))
-            except UnidentifiedImageError:
+                async with ctx.typing():
+                    frames, final = await prerender(self.pool, imgbytes, conf["blocks_to_reveal"], max_frames)
+            except OSError:  # UnidentifiedImageError or a truncated image
                 cant_get.append(url)
                 continue
             break
@@ -210,13 +250,14 @@ class Pixl(commands.Cog):
             invalid = "\n".join(cant_get)
             await ctx.send(f"Some images failed during prep\n{box(invalid)}")
 
-        game = PixlGrids(ctx, game_image, correct, conf["blocks_to_reveal"], conf["time_limit"])
+        game = PixlGrids(ctx, frames, final, correct, conf["blocks_to_reveal"], conf["time_limit"])
         msg = None
         embed = discord.Embed(
             title="Pixl Guess",
             description=f"Guess the image before it's fully revealed!\nTime runs out {game.time_left}",
             color=discord.Color.random(),
         )
+        self.games[ctx.channel.id] = game
         try:
             async with ctx.typing():
                 async for image in game:
@@ -227,7 +268,7 @@ class Pixl(commands.Cog):
                     else:
                         asyncio.create_task(delete(msg))
                         msg = await ctx.send(embed=embed, file=image)
-                    await asyncio.sleep(delay)
+                    await game.wait(delay)
         except Exception:
             return await ctx.send(
                 f"Something went wrong during the game!\n"
@@ -236,11 +277,12 @@ class Pixl(commands.Cog):
             )
         finally:
             game.data["in_progress"] = False
+            self.games.pop(ctx.channel.id, None)
 
         winner = game.winner
         participants = len(game.data["participants"])
-        points = len(game.to_chop)
-        shown = 192 - points
+        points = game.remaining
+        shown = BLOCKS - points
         reward = round(points * conf["currency_ratio"])
         min_p = conf["min_participants"]
 
@@ -540,7 +582,7 @@ class Pixl(commands.Cog):
                     if any([g["url"] == url for g in global_images]):
                         failed.append(f"Line {index + 1}(Already Exists): {line}")
                         continue
-                    image = await get_content_from_url(url)
+                    image = await self.cache.fetch(url)
                     if not image:
                         failed.append(f"Line {index + 1}(Invalid URL): {line}")
                         continue
@@ -574,7 +616,7 @@ class Pixl(commands.Cog):
             else:
                 if any([g["url"] == url for g in global_images]):
                     return await ctx.send("That global image url already exists!")
-                image = await get_content_from_url(url)
+                image = await self.cache.fetch(url)
                 if not image:
                     return await ctx.send("I am unable to pull this image to use, please try another one")
                 answers = [a.strip().lower() for a in answers.split(",")]
@@ -636,7 +678,7 @@ class Pixl(commands.Cog):
                     if any([g["url"] == url for g in guild_images]):
                         failed.append(f"Line {i + 1}(Already Exists): {line}")
                         continue
-                    image = await get_content_from_url(url)
+                    image = await self.cache.fetch(url)
                     if not image:
                         failed.append(f"Line {i + 1}(Invalid URL): {line}")
                         continue
@@ -667,7 +709,7 @@ class Pixl(commands.Cog):
             else:
                 if any([g["url"] == url for g in guild_images]):
                     return await ctx.send("That guild image url already exists!")
-                image = await get_content_from_url(url)
+                image = await self.cache.fetch(url)
                 if not image:
                     return await ctx.send("I am unable to pull this image to use, please try another one")
                 answers = [a.strip().lower() for a in answers.split(",")]
@@ -796,23 +838,18 @@ class Pixl(commands.Cog):
                 pass
         return content
 
-    @staticmethod
-    async def test_images(images: list):
+    async def test_images(self, images: list):
         good = []
         bad = []
 
         async def check(img):
-            bytefile = await get_content_from_url(img["url"], timeout=10)
-            if not bytefile:
-                bad.append(f"(Bad URL)`{img['answers'][0]}: {img['url']}`")
-                return
-            try:
-                partial = functools.partial(Image.open, BytesIO(bytefile))
-                await exe(partial)
-            except UnidentifiedImageError:
+            # Served from the cache when already validated, known dead urls are skipped without a request
+            if await self.cache.get(img["url"]):
+                good.append(img["url"])
+            elif self.cache.status(img["url"]) == "invalid":
                 bad.append(f"(Bad Image)`{img['answers'][0]}: {img['url']}`")
-                return
-            good.append(img["url"])
+            else:
+                bad.append(f"(Bad URL)`{img['answers'][0]}: {img['url']}`")
 
         tasks = [check(i) for i in images]
         await asyncio.gather(*tasks)
@@ -2,23 +2,34 @@ import asyncio
 import contextlib
 import functools
 import logging
+import math
 import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from io import BytesIO
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
 import discord
-from aiocache import cached
 from aiohttp import ClientSession, ClientTimeout
-from PIL import Image
-from rapidfuzz import fuzz
+from PIL import Image, ImageOps
+from rapidfuzz import fuzz, process
 from redbot.core import VersionInfo, commands, version_info
 
 log = logging.getLogger("red.vrt.pixl.generator")
 dpy2 = True if version_info >= VersionInfo.from_str("3.5.0") else False
 
+# Images are split into 192 blocks (16 by 12) or (12 by 16)
+GRID = (16, 12)
+BLOCKS = GRID[0] * GRID[1]
+# Longest side of game images, sources are downsized to this once before the game starts
+MAX_SIZE = 1024
+# Broken process pools are rebuilt this many times before image work moves to threads for good
+MAX_POOL_FAILURES = 3
+# Guesses must score above 92 to count as correct, score_cutoff is inclusive so use the next float up
+SCORE_CUTOFF = math.nextafter(92, 100)
+
 
-@cached(ttl=240)
 async def get_content_from_url(url: str, timeout: Optional[int] = 60) -> Optional[bytes]:
     headers = {"User-Agent": "Mozilla/5.0"}
     try:
@@ -39,110 +50,198 @@ async def delete(message: discord.Message):
         await message.delete()
 
 
-async def listener(ctx: commands.Context, data: dict):
-    def check(message: discord.Message):
-        return ctx.channel == message.channel and not message.author.bot
+def normalize_answer(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class AnswerMatcher:
+    """Exact lookup of normalized answers first, fuzzy matching only when that misses"""
+
+    def __init__(self, answers: List[str]):
+        self.exact = {normalize_answer(a) for a in answers if a.strip()}
+        self.choices = list(self.exact)
+
+    def __call__(self, text: str) -> bool:
+        text = normalize_answer(text)
+        if text in self.exact:
+            return True
+        return process.extractOne(text, self.choices, scorer=fuzz.ratio, score_cutoff=SCORE_CUTOFF) is not None
+
+
+def normalize_image(data: bytes) -> Image.Image:
+    """Decode, orient and downsize a source image"""
+    image = Image.open(BytesIO(data))
+    image = ImageOps.exif_transpose(image).convert("RGBA")
+    image.thumbnail((MAX_SIZE, MAX_SIZE))
+    return image
+
+
+def encode_image(image: Image.Image, quality: int = 90) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="WEBP", quality=quality)
+    return buffer.getvalue()
+
+
+def prepare_image(data: bytes) -> bytes:
+    """Validate and downsize a downloaded image for the cache, raises UnidentifiedImageError if it isn't an image"""
+    return encode_image(normalize_image(data), quality=95)
+
+
+def render_frames(data: bytes, per_step: int, max_frames: int, seed: int) -> Tuple[List[bytes], bytes]:
+    """
+    Render every reveal frame of a game up front, runs in a worker process
+
+    Args:
+        data: raw source image
+        per_step: blocks revealed per frame
+        max_frames: frames that can be shown before the time limit, no point encoding the rest
+        seed: seed for the reveal order, workers don't share the cog's random state
 
-    while True:
-        if not data["in_progress"]:
+    Returns:
+        encoded frames in reveal order, and the encoded full image
+    """
+    image = normalize_image(data)
+    horiz, vert = GRID if image.width > image.height else GRID[::-1]
+    w, h = (image.width / horiz, image.height / vert)
+    boxes = []
+    for x in range(horiz):
+        for y in range(vert):
+            boxes.append((round(x * w), round(y * h), round((x * w) + w), round((y * h) + h)))
+    random.Random(seed).shuffle(boxes)
+
+    # Solid blank canvas to paste image pieces on
+    canvas = Image.new("RGBA", image.size, (0, 0, 0, 255))
+    per_step = max(per_step, 1)
+    frames = []
+    for i in range(0, len(boxes), per_step):
+        if len(frames) >= max_frames:
+            break
+        for bbox in boxes[i : i + per_step]:
+            canvas.paste(image.crop(bbox), (bbox[0], bbox[1]))
+        frames.append(encode_image(canvas))
+    return frames, encode_image(image)
+
+
+class RenderPool:
+    """
+    Process pool for image work that never takes a game down with it
+
+    Workers use the platform's default start method. Red loads cogs from module specs, so spawned workers can't
+    import this module where forked ones inherit it. A broken pool is rebuilt for the next call until it has broken
+    MAX_POOL_FAILURES times, after which image work runs in threads. Any failure in a worker is retried in a thread.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.failures = 0
+
+    def start(self) -> None:
+        if self.failures >= MAX_POOL_FAILURES:
             return
-        tasks = [asyncio.ensure_future(ctx.bot.wait_for("message", check=check))]
-        done, pending = await asyncio.wait(tasks, timeout=60)
-        [task.cancel() for task in pending]
-        if len(done) == 0:
-            continue
-        res: discord.Message = done.pop().result()
-        if not res.content.strip():
-            continue
-        data["responses"].append((res.author, res.content.strip().lower(), datetime.now().timestamp()))
-        data["participants"].add(res.author)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def run(self, func: Callable, *args):
+        """Run a picklable function in the pool, falling back to a thread if that fails for any reason"""
+        partial = functools.partial(func, *args)
+        executor = self.executor
+        if executor is not None:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, partial)
+            except BrokenProcessPool as e:
+                # Concurrent calls on the same broken pool only count and rebuild it once
+                if self.executor is executor:
+                    self.failures += 1
+                    self.shutdown()
+                    if self.failures >= MAX_POOL_FAILURES:
+                        log.error(f"Process pool broke {self.failures} times, rendering in threads from now on: {e}")
+                    else:
+                        log.warning(f"Process pool broke, rebuilding it: {e}")
+                        self.start()
+                log.warning(f"Running {func.__name__} in a thread after the process pool broke")
+            except Exception as e:
+                log.warning(f"{func.__name__} failed in the process pool, retrying in a thread: {e}")
+        return await exe(partial)
+
+
+async def prerender(
+    pool: Optional[RenderPool], data: bytes, per_step: int, max_frames: int
+) -> Tuple[List[bytes], bytes]:
+    """Render a game's frames off the event loop"""
+    args = (data, per_step, max_frames, random.getrandbits(32))
+    if pool is None:
+        return await exe(render_frames, *args)
+    return await pool.run(render_frames, *args)
 
 
 class PixlGrids:
-    """Slowly reveal blocks from an image while waiting for text response"""
+    """Slowly reveal blocks from an image while the cog's dispatcher feeds it channel messages"""
 
     def __init__(
         self,
         ctx: commands.Context,
-        image: Image.Image,
+        frames: List[bytes],
+        final: bytes,
         answers: list,
         amount_to_reveal: int,
         time_limit: int,
     ):
         self.ctx = ctx
-        self.image = image
-        self.answers = answers
+        self.frames = frames
+        self.final = final
+        self.matcher = AnswerMatcher(answers)
         self.amount_to_reveal = amount_to_reveal
         self.time_limit = time_limit
         # Game stuff
         self.start = datetime.now()
         self.time_left = f"<t:{round(self.start.timestamp() + self.time_limit)}:R>"
         self.winner = None
-        self.data = {"in_progress": True, "responses": [], "participants": set()}
-        self.to_chop = []
-        self.task: asyncio.Task = None
-        # Make solid blank canvas to paste image pieces on
-        self.blank = Image.new("RGBA", image.size, (0, 0, 0, 256))
+        self.solved = asyncio.Event()
+        self.data = {"in_progress": True, "participants": set()}
+        self.remaining = BLOCKS  # Blocks left to reveal
+        self.frame = 0
 
     def __aiter__(self):
-        self.init()
+        # Add game starter to participants
+        self.data["participants"].add(self.ctx.author)
         return self
 
     async def __anext__(self) -> discord.File:
         end_conditions = [
-            len(self.to_chop) <= 0,  # Image is fully revealed
-            self.have_winner(),  # Someone guessed it right
+            self.remaining <= 0,  # Image is fully revealed
+            self.frame >= len(self.frames),  # No more frames could be shown before the time limit
+            self.winner is not None,  # Someone guessed it right
             (datetime.now() - self.start).total_seconds() > self.time_limit,  # Time is up
         ]
         if any(end_conditions):
             self.data["in_progress"] = False
             raise StopAsyncIteration
-        pop = self.amount_to_reveal if self.amount_to_reveal <= len(self.to_chop) else len(self.to_chop)
-        for _ in range(pop):
-            bbox = self.to_chop.pop(random.randrange(len(self.to_chop)))
-            cropped = await exe(self.image.crop, bbox)
-            await exe(self.blank.paste, cropped, (bbox[0], bbox[1]))
-        buffer = BytesIO()
-        buffer.name = f"{random.randint(999, 9999999)}.webp"
-        self.blank.save(buffer, format="WEBP", quality=100)
-        buffer.seek(0)
-        return discord.File(buffer, filename=buffer.name)
-
-    async def __aexit__(self):
-        if self.task:
-            self.task.cancel()
-
-    def init(self) -> None:
-        # Add game starter to participants
-        self.data["participants"].add(self.ctx.author)
-        # Get box size to fit 192 boxes (16 by 12) or (12 by 16)
-        horiz, vert = (16, 12) if self.image.width > self.image.height else (12, 16)
-        w, h = (self.image.width / horiz, self.image.height / vert)
-        # Get block locations to chop the image up and paste to the canvas iteratively
-        for x in range(horiz):
-            for y in range(vert):
-                x1 = x * w
-                y1 = y * h
-                x2 = (x * w) + w
-                y2 = (y * h) + h
-                bbox = (round(x1), round(y1), round(x2), round(y2))
-                self.to_chop.append(bbox)
-        # Start the message listener
-        self.task = asyncio.create_task(listener(self.ctx, self.data))
+        self.remaining -= min(self.amount_to_reveal, self.remaining)
+        buffer = BytesIO(self.frames[self.frame])
+        self.frame += 1
+        return discord.File(buffer, filename=f"{random.randint(999, 9999999)}.webp")
+
+    def on_message(self, message: discord.Message) -> None:
+        """Called by the cog's dispatcher for every message in the game's channel"""
+        if not self.data["in_progress"] or self.winner is not None:
+            return
+        content = message.content.strip()
+        if not content:
+            return
+        self.data["participants"].add(message.author)
+        if self.matcher(content):
+            self.winner = message.author
+            self.solved.set()
+
+    async def wait(self, delay: float) -> None:
+        """Sleep until the next frame, waking up as soon as someone guesses correctly"""
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.solved.wait(), timeout=delay)
 
     async def get_result(self) -> discord.File:
-        buffer = BytesIO()
-        buffer.name = f"{random.randint(999, 9999999)}.webp"
-        self.image.save(buffer, format="WEBP", quality=100)
-        buffer.seek(0)
-        return discord.File(buffer, filename=buffer.name)
-
-    def have_winner(self) -> bool:
-        responses = sorted(self.data["responses"].copy(), key=lambda x: x[2], reverse=False)
-        self.data["responses"].clear()
-        for author, answer, _ in responses:
-            if any([fuzz.ratio(answer, a) > 92 for a in self.answers]):
-                self.winner = author
-                return True
-        else:
-            return False
+        return discord.File(BytesIO(self.final), filename=f"{random.randint(999, 9999999)}.webp")
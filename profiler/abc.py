@@ -4,7 +4,12 @@ from abc import ABCMeta, abstractmethod
 from discord.ext.commands.cog import CogMeta
 from redbot.core.bot import Red
 
+from .common.aggregate import MethodAggregate
+from .common.columnar import SampleSink, StatsStore
+from .common.mem_tracker import MemoryTracker
 from .common.models import DB, Method
+from .common.sampler import StackSampler
+from .common.watchdog import LoopWatchdog
 
 
 class CompositeMetaClass(CogMeta, ABCMeta):
@@ -16,6 +21,11 @@ class MixinMeta(metaclass=ABCMeta):
 
     bot: Red
     db: DB
+    watchdog: LoopWatchdog
+    sampler: StackSampler
+    mem_tracker: MemoryTracker
+    store: StatsStore
+    sink: t.Optional[SampleSink]
 
     # {cog_name: {method_name: original_method}}
     original_methods: t.Dict[str, t.Dict[str, t.Callable]] = {}
@@ -31,6 +41,8 @@ class MixinMeta(metaclass=ABCMeta):
     # {method_key: Method}
     methods: t.Dict[str, Method] = {}
     currently_tracked: t.Set[str] = set()
+    # {method_key: MethodAggregate}
+    aggregates: t.Dict[str, MethodAggregate] = {}
 
     @abstractmethod
     def save(self) -> None:
@@ -40,6 +52,10 @@ class MixinMeta(metaclass=ABCMeta):
     async def rebuild(self) -> None:
         raise NotImplementedError
 
+    @abstractmethod
+    async def cleanup(self) -> int:
+        raise NotImplementedError
+
     # -------------- profiler.common.profiling --------------
     @abstractmethod
     def attach_method(self, method_key: str) -> bool:
@@ -73,3 +89,7 @@ class MixinMeta(metaclass=ABCMeta):
     @abstractmethod
     def profile_wrapper(self, func: t.Callable, cog_name: str, func_type: str):
         raise NotImplementedError
+
+    @abstractmethod
+    def prune_aggregates(self) -> int:
+        raise NotImplementedError
@@ -1,8 +1,12 @@
 import asyncio
+import gzip
+import inspect
 import logging
 import sys
 import typing as t
 from contextlib import suppress
+from io import BytesIO
+from pathlib import Path
 
 import discord
 from discord import app_commands
@@ -13,6 +17,7 @@ from redbot.core.utils.chat_formatting import box, humanize_number, pagify
 from ..abc import MixinMeta
 from ..common.formatting import humanize_size
 from ..common.mem_profiler import profile_memory
+from ..common.watchdog import HEARTBEAT
 from ..views.profile_menu import ProfileMenu
 
 log = logging.getLogger("red.vrt.profiler.commands")
@@ -82,14 +87,30 @@ class Owner(MixinMeta):
         mem_usage = humanize_size(mem_size_raw)
         txt += f"- Cog RAM Usage: `{mem_usage}`\n"
 
+        txt += f"- Sample Buffers: `{humanize_size(self.store.nbytes)}`\n"
+
         # TRACKING COUNTS
-        records = 0
-        monitoring = 0
-        for methods in self.db.stats.values():
-            monitoring += len(methods)
-            for statprofiles in methods.values():
-                records += len(statprofiles)
+        records = self.store.records
+        monitoring = len(self.store.get_methods())
+        verbose = sum(len(profiles) for methods in self.db.stats.values() for profiles in methods.values())
         txt += f"- Monitoring: `{humanize_number(monitoring)}` methods (`{humanize_number(records)}` Records)\n"
+        if verbose:
+            txt += f"- Verbose Profiles: `{humanize_number(verbose)}`\n"
+
+        # AGGREGATION
+        txt += f"- Aggregation mode is **{'Enabled' if self.db.aggregate else 'Disabled'}**"
+        txt += f" (`{humanize_number(len(self.aggregates))}` aggregated methods)\n"
+
+        # WATCHDOG
+        txt += f"- Loop watchdog is **{'Enabled' if self.db.watchdog else 'Disabled'}**"
+        txt += f" (threshold: `{self.db.lag_threshold}ms`)\n"
+
+        # SAMPLER
+        if self.sampler.running:
+            txt += f"- Sampling profiler is **Running** at `{self.sampler.rate}Hz`"
+            txt += f" (`{humanize_number(self.sampler.samples)}` samples)\n"
+        else:
+            txt += "- Sampling profiler is **Stopped**\n"
 
         # TRACKED COGS
         y = "**Included**"
@@ -117,7 +138,7 @@ class Owner(MixinMeta):
     @profiler.command(name="cleanup", aliases=["c"])
     async def run_cleanup(self, ctx: commands.Context):
         """Run a cleanup of the stats"""
-        cleaned = await asyncio.to_thread(self.db.cleanup)
+        cleaned = await self.cleanup()
         await ctx.send(f"Cleanup complete, {cleaned} records were removed")
         if cleaned:
             await self.save()
@@ -128,6 +149,11 @@ class Owner(MixinMeta):
         Clear all saved metrics
         """
         self.db.stats.clear()
+        self.store.clear()
+        if self.sink is not None:
+            await asyncio.to_thread(self.sink.clear)
+        self.aggregates.clear()
+        self.watchdog.reset()
         await self.save()
         await ctx.send("All metrics have been cleared")
 
@@ -136,7 +162,9 @@ class Owner(MixinMeta):
         """
         Toggle saving stats persistently
 
-        **Warning**: The config size can grow very large if this is enabled for a long time
+        Runtime samples are written to a SQLite file in the cog's data folder, only verbose profiles go to the config.
+
+        **Warning**: The config size can grow very large if verbose profiling is enabled for a long time
         """
         self.db.save_stats = not self.db.save_stats
         await self.save()
@@ -150,7 +178,7 @@ class Owner(MixinMeta):
         **WARNING**: Enabling this will increase memory usage significantly if there are a lot of watched methods
         """
         self.db.verbose = not self.db.verbose
-        cleaned = await asyncio.to_thread(self.db.cleanup)
+        cleaned = await self.cleanup()
         if cleaned:
             await self.save()
         if self.db.verbose:
@@ -165,6 +193,150 @@ class Owner(MixinMeta):
                 "Verbose stats are now **Disabled**. Detailed stat breakdowns will no longer be recorded for tracked methods"
             )
 
+    @profiler.command(name="aggregate")
+    async def aggregate_toggle(self, ctx: commands.Context):
+        """
+        Toggle aggregation mode for non-verbose stats
+
+        Runtimes always feed fixed-size per method histograms (count, min/max, p50/p95/p99) which the overview is built
+        from. When enabled, the individual runtimes aren't kept as well, so memory stays constant and overhead is
+        minimal, making it suitable for profiling hot listeners like `on_message`.
+
+        Histograms are kept in memory only. Verbose and explicitly tracked methods are unaffected.
+        """
+        self.db.aggregate = not self.db.aggregate
+        await self.save()
+        if self.db.aggregate:
+            await ctx.send("Aggregation mode is now **Enabled**, runtimes will be recorded into histograms")
+        else:
+            await ctx.send("Aggregation mode is now **Disabled**, individual runtimes will be recorded as well")
+
+    @profiler.command(name="watchdog")
+    async def watchdog_toggle(self, ctx: commands.Context, threshold: t.Optional[float] = None):
+        """
+        Toggle the event loop watchdog, or set its lag threshold
+
+        The watchdog measures event loop lag continuously. When the loop is blocked for longer than the threshold,
+        the blocking stack is captured and attributed to the cog that owns it.
+        Use `[p]profiler blockers` to view the results.
+
+        **Arguments**:
+        - `threshold`: (Optional) Minimum loop lag in milliseconds to capture, defaults to 100ms
+        """
+        if threshold is not None:
+            if threshold <= HEARTBEAT * 1000:
+                return await ctx.send(f"Threshold must be above {HEARTBEAT * 1000:.0f}ms")
+            self.db.lag_threshold = threshold
+            self.watchdog.threshold = threshold / 1000
+            if not self.db.watchdog:
+                self.db.watchdog = True
+                self.watchdog.start()
+            await self.save()
+            return await ctx.send(f"Loop watchdog is **Enabled** with a threshold of **{threshold}ms**")
+
+        self.db.watchdog = not self.db.watchdog
+        if self.db.watchdog:
+            self.watchdog.start()
+            await ctx.send(f"Loop watchdog is now **Enabled** with a threshold of **{self.db.lag_threshold}ms**")
+        else:
+            self.watchdog.stop()
+            await ctx.send("Loop watchdog is now **Disabled**")
+        await self.save()
+
+    @profiler.command(name="blockers")
+    async def view_blockers(self, ctx: commands.Context, limit: int = 10):
+        """
+        View the top event loop blockers caught by the watchdog
+        """
+        if not self.watchdog.running:
+            return await ctx.send(
+                f"The loop watchdog is not running, enable it with `{ctx.clean_prefix}profiler watchdog`"
+            )
+        txt = (
+            f"Current Lag: {self.watchdog.last_lag * 1000:.1f}ms\n"
+            f"Max Lag: {self.watchdog.max_lag * 1000:.1f}ms\n"
+            f"Stalls Over {self.db.lag_threshold}ms: {humanize_number(self.watchdog.stalls)}\n\n"
+        )
+        blockers = self.watchdog.top(limit)
+        if not blockers:
+            txt += "No blocking calls have been caught yet"
+        for idx, blocker in enumerate(blockers):
+            txt += (
+                f"#{idx + 1} [{blocker.cog_name}] {blocker.location}\n"
+                f"    Count: {blocker.count}, Total: {blocker.total:.2f}s, Worst: {blocker.worst * 1000:.1f}ms\n"
+            )
+            for frame in blocker.stack[:3]:
+                txt += f"      - {frame}\n"
+        for p in pagify(txt, page_length=1980):
+            await ctx.send(box(p, "py"))
+
+    @profiler.group(name="sampler")
+    async def sampler_group(self, ctx: commands.Context):
+        """
+        Statistical sampling profiler for the whole bot
+
+        Snapshots the stacks of all threads at a fixed rate and aggregates them into a collapsed stack table.
+        Unlike attaching profilers, this covers everything the bot is doing with very little overhead,
+        and the results can be exported as flamegraphs.
+        """
+
+    @sampler_group.command(name="start")
+    async def sampler_start(self, ctx: commands.Context, rate: int = 100):
+        """
+        Start sampling all threads
+
+        **Arguments**:
+        - `rate`: Samples per second, defaults to 100
+        """
+        if self.sampler.running:
+            return await ctx.send("The sampling profiler is already running")
+        if not 1 <= rate <= 1000:
+            return await ctx.send("Rate must be between 1 and 1000 samples per second")
+        self.sampler.start(rate)
+        await ctx.send(f"Sampling profiler started at **{rate}Hz**, previous samples have been cleared")
+
+    @sampler_group.command(name="stop")
+    async def sampler_stop(self, ctx: commands.Context):
+        """Stop the sampling profiler, collected samples are kept for exporting"""
+        if not self.sampler.running:
+            return await ctx.send("The sampling profiler is not running")
+        self.sampler.stop()
+        await ctx.send(
+            f"Sampling profiler stopped after `{self.sampler.duration:.1f}s` "
+            f"with `{humanize_number(self.sampler.samples)}` samples"
+        )
+
+    @sampler_group.command(name="export")
+    @commands.bot_has_permissions(attach_files=True)
+    async def sampler_export(self, ctx: commands.Context, fmt: t.Literal["speedscope", "collapsed"] = "speedscope"):
+        """
+        Export the collected samples
+
+        **Arguments**:
+        - `fmt`: `speedscope` for a JSON file that can be opened at https://www.speedscope.app
+        or `collapsed` for collapsed stacks usable with flamegraph.pl/inferno
+        """
+        if not self.sampler.stacks:
+            return await ctx.send("No samples have been collected")
+
+        def _export() -> t.Tuple[bytes, str]:
+            if fmt == "collapsed":
+                return self.sampler.export_collapsed().encode(), "profile.collapsed.txt"
+            return self.sampler.export_speedscope(), "profile.speedscope.json"
+
+        async with ctx.typing():
+            data, filename = await asyncio.to_thread(_export)
+            limit = ctx.guild.filesize_limit if ctx.guild else 8 * 1024 * 1024
+            if len(data) > limit:
+                data = await asyncio.to_thread(gzip.compress, data)
+                filename += ".gz"
+            if len(data) > limit:
+                return await ctx.send(f"The export is too large to upload ({humanize_size(len(data))})")
+            await ctx.send(
+                f"`{humanize_number(self.sampler.samples)}` samples over `{self.sampler.duration:.1f}s`",
+                file=discord.File(BytesIO(data), filename=filename),
+            )
+
     @profiler.command(name="delta")
     async def set_delta(self, ctx: commands.Context, delta: int):
         """
@@ -173,7 +345,8 @@ class Owner(MixinMeta):
         if delta < 1:
             return await ctx.send("Delta must be at least 1 hour")
         self.db.delta = delta
-        cleaned = await asyncio.to_thread(self.db.cleanup)
+        self.prune_aggregates()
+        cleaned = await self.cleanup()
         if cleaned:
             await self.save()
         await ctx.send(f"Data retention is now set to **{delta} {'hour' if delta == 1 else 'hours'}**")
@@ -205,7 +378,7 @@ class Owner(MixinMeta):
         elif method == "tasks":
             self.db.track_tasks = state
 
-        cleaned = await asyncio.to_thread(self.db.cleanup)
+        cleaned = await self.cleanup()
         if cleaned:
             await self.save()
         await ctx.send(f"Tracking of {method} is now set to **{state}**")
@@ -227,6 +400,8 @@ class Owner(MixinMeta):
         """
         if method_name in self.db.ignored_methods:
             self.db.discard_method(method_name)
+            self.store.discard_method(method_name)
+            self.aggregates.pop(method_name, None)
             self.db.ignored_methods.remove(method_name)
             await ctx.send(f"**{method_name}** is no longer being ignored")
             await self.save()
@@ -429,6 +604,77 @@ class Owner(MixinMeta):
             for p in pagify(res, page_length=1980):
                 await ctx.send(box(p, "py"))
 
+    @profiler.group(name="tracemalloc", aliases=["tm"])
+    async def tracemalloc_group(self, ctx: commands.Context):
+        """
+        Continuous memory growth tracking with tracemalloc
+
+        Unlike `[p]profiler memory`, this doesn't walk every object in the bot.
+        Lightweight snapshots are taken on an interval and diffed by allocation site or by cog,
+        making it suitable for leak hunting in production.
+        """
+
+    @tracemalloc_group.command(name="start")
+    async def tracemalloc_start(self, ctx: commands.Context, frames: int = 5, interval: int = 300, retention: int = 6):
+        """
+        Start tracking memory allocations
+
+        **Arguments**:
+        - `frames`: Traceback depth to record per allocation (1-25), more frames means more overhead
+        - `interval`: Seconds between snapshots, defaults to 5 minutes
+        - `retention`: Amount of snapshots to keep (1-48)
+        """
+        if self.mem_tracker.running:
+            return await ctx.send("Memory tracking is already running")
+        if not 1 <= frames <= 25:
+            return await ctx.send("Frames must be between 1 and 25")
+        if interval < 30:
+            return await ctx.send("Interval must be at least 30 seconds")
+        if not 1 <= retention <= 48:
+            return await ctx.send("Retention must be between 1 and 48 snapshots")
+        self.mem_tracker.start(frames, interval, retention)
+        await ctx.send(
+            f"Memory tracking started with `{self.mem_tracker.frames}` frames, "
+            f"taking a snapshot every `{interval}s` and keeping the last `{retention}`"
+        )
+
+    @tracemalloc_group.command(name="stop")
+    async def tracemalloc_stop(self, ctx: commands.Context):
+        """Stop tracking memory allocations and discard snapshots"""
+        if not self.mem_tracker.running:
+            return await ctx.send("Memory tracking is not running")
+        self.mem_tracker.stop()
+        await ctx.send("Memory tracking stopped")
+
+    @tracemalloc_group.command(name="diff")
+    async def tracemalloc_diff(
+        self,
+        ctx: commands.Context,
+        since: t.Literal["last", "start"] = "last",
+        group_by: t.Literal["line", "cog"] = "line",
+        limit: int = 15,
+    ):
+        """
+        View the top memory growers
+
+        **Arguments**:
+        - `since`: `last` to compare against the latest snapshot, `start` for when tracking began
+        - `group_by`: `line` for allocation sites, `cog` to total growth per cog
+        - `limit`: Amount of rows to show
+        """
+        if not self.mem_tracker.running:
+            return await ctx.send(
+                f"Memory tracking is not running, start it with `{ctx.clean_prefix}profiler tm start`"
+            )
+        cog_dirs = {}
+        for cog_name, cog in self.bot.cogs.items():
+            with suppress(TypeError, OSError):
+                cog_dirs[str(Path(inspect.getfile(cog.__class__)).parent)] = cog_name
+        async with ctx.typing():
+            res = await asyncio.to_thread(self.mem_tracker.diff, since, group_by, limit, cog_dirs)
+            for p in pagify(res, page_length=1980):
+                await ctx.send(box(p, "py"))
+
     @profiler.command(name="view", aliases=["v"])
     async def profile_menu(self, ctx: commands.Context):
         """
@@ -0,0 +1,151 @@
+import math
+import typing as t
+from collections import deque
+from time import time
+
+# Sub-buckets per power of two, 8 gives ~9% relative precision
+SUB_BUCKETS = 8
+# Width of each aggregation window in seconds
+WINDOW = 60
+
+
+def bucket_index(micros: float) -> int:
+    """Map a duration in microseconds to a log-linear (HDR style) bucket"""
+    if micros < 1:
+        return 0
+    return int(math.log2(micros) * SUB_BUCKETS) + 1
+
+
+def bucket_value(index: int) -> float:
+    """Get the duration in seconds at the middle of a bucket"""
+    if index == 0:
+        return 0.0
+    low = 2 ** ((index - 1) / SUB_BUCKETS)
+    high = 2 ** (index / SUB_BUCKETS)
+    return (low + high) / 2 / 1_000_000
+
+
+class Histogram:
+    """Fixed precision runtime histogram with running count/sum/min/max"""
+
+    __slots__ = ("buckets", "count", "total", "squares", "errors", "low", "high")
+
+    def __init__(self):
+        # {bucket_index: count}, sparse since most methods only hit a handful of buckets
+        self.buckets: t.Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.errors = 0
+        self.low = math.inf
+        self.high = 0.0
+
+    def record(self, delta: float, errored: bool = False) -> None:
+        idx = bucket_index(delta * 1_000_000)
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += delta
+        self.squares += delta * delta
+        if errored:
+            self.errors += 1
+        if delta < self.low:
+            self.low = delta
+        if delta > self.high:
+            self.high = delta
+
+    def copy(self) -> "Histogram":
+        hist = Histogram()
+        hist.merge(self)
+        return hist
+
+    def merge(self, other: "Histogram") -> None:
+        # Snapshot the buckets, `other` may be the live window the wrappers are recording into from the loop
+        for idx, count in list(other.buckets.items()):
+            self.buckets[idx] = self.buckets.get(idx, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+        self.errors += other.errors
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stdev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        variance = (self.squares - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def percentile(self, pct: float) -> float:
+        """Get an approximate runtime percentile in seconds (0-100)"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= target:
+                # Clamp to the recorded extremes so small samples stay exact at the edges
+                return min(max(bucket_value(idx), self.low), self.high)
+        return self.high
+
+
+class MethodAggregate:
+    """Per method histograms bucketed into fixed time windows, oldest windows fall off automatically"""
+
+    __slots__ = ("cog_name", "func_type", "is_coro", "windows")
+
+    def __init__(self, cog_name: str, func_type: str, is_coro: bool, hours: int):
+        self.cog_name = cog_name
+        self.func_type = func_type
+        self.is_coro = is_coro
+        # [(window_start, Histogram)]
+        self.windows: t.Deque[t.Tuple[int, Histogram]] = deque(maxlen=max(hours, 1) * 3600 // WINDOW)
+
+    def record(self, delta: float, errored: bool = False, ts: t.Optional[float] = None) -> None:
+        window = int(ts or time()) // WINDOW * WINDOW
+        if self.windows and window < self.windows[-1][0]:
+            # Samples loaded out of order go into the newest window rather than breaking the ordering
+            window = self.windows[-1][0]
+        if not self.windows or self.windows[-1][0] != window:
+            self.windows.append((window, Histogram()))
+        self.windows[-1][1].record(delta, errored)
+
+    def resize(self, hours: int) -> None:
+        maxlen = max(hours, 1) * 3600 // WINDOW
+        if self.windows.maxlen != maxlen:
+            self.windows = deque(self.windows, maxlen=maxlen)
+
+    def snapshot(self) -> t.List[t.Tuple[int, Histogram]]:
+        """
+        Copy of the windows that can be summarized from another thread
+
+        Must be called on the loop. Only the newest window is still being recorded into, so it is the only one copied.
+        """
+        windows = list(self.windows)
+        if windows:
+            window, hist = windows[-1]
+            windows[-1] = (window, hist.copy())
+        return windows
+
+    def summary(
+        self,
+        hours: t.Optional[int] = None,
+        windows: t.Optional[t.List[t.Tuple[int, Histogram]]] = None,
+    ) -> t.Tuple[Histogram, float]:
+        """Merge the windows within the last X hours, returns the merged histogram and the minutes it covers"""
+        cutoff = time() - hours * 3600 if hours else 0
+        merged = Histogram()
+        oldest = None
+        for window, hist in self.snapshot() if windows is None else windows:
+            if window + WINDOW < cutoff:
+                continue
+            if oldest is None:
+                oldest = window
+            merged.merge(hist)
+        minutes = (time() - oldest) / 60 if oldest is not None else 0.0
+        return merged, minutes
@@ -0,0 +1,280 @@
+import logging
+import sqlite3
+import threading
+import typing as t
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import time
+
+from .models import DB, StatsProfile
+
+log = logging.getLogger("red.vrt.profiler.columnar")
+
+# Max samples kept per method, the overview comes from the method's histograms so it isn't limited by this
+CAPACITY = 5000
+
+# (cog_name, method_key, func_type, is_coro, timestamp, duration, exception)
+SampleRow = t.Tuple[str, str, str, bool, float, float, t.Optional[str]]
+
+
+class SampleBuffer:
+    """
+    Columnar ring buffer of a method's most recent runtimes
+
+    Used for inspecting individual calls and for the on-disk sink, the overview stats live in MethodAggregate.
+    """
+
+    __slots__ = (
+        "cog_name",
+        "func_type",
+        "is_coro",
+        "capacity",
+        "timestamps",
+        "durations",
+        "errors",
+        "messages",
+        "start",
+        "end",
+        "flushed",
+    )
+
+    def __init__(self, cog_name: str, func_type: str, is_coro: bool, capacity: int = CAPACITY):
+        self.cog_name = cog_name
+        self.func_type = func_type
+        self.is_coro = is_coro
+        self.capacity = capacity
+        # Columns grow until capacity is reached, then wrap around
+        self.timestamps = array("d")
+        self.durations = array("d")
+        self.errors = bytearray()
+        # {sequence: exception message} for the few samples that errored
+        self.messages: t.Dict[int, str] = {}
+        # Sequence numbers of the oldest sample and the next sample to be written
+        self.start = 0
+        self.end = 0
+        # Sequence up to which samples have been written to the sink
+        self.flushed = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def append(self, ts: float, duration: float, exception: t.Optional[str] = None) -> None:
+        if len(self) == self.capacity:
+            self._pop()
+        seq = self.end
+        errored = exception is not None
+        if seq < self.capacity:
+            self.timestamps.append(ts)
+            self.durations.append(duration)
+            self.errors.append(errored)
+        else:
+            idx = seq % self.capacity
+            self.timestamps[idx] = ts
+            self.durations[idx] = duration
+            self.errors[idx] = errored
+        if errored:
+            self.messages[seq] = exception
+        self.end += 1
+
+    def _pop(self) -> None:
+        self.messages.pop(self.start, None)
+        self.start += 1
+
+    def expire(self, cutoff: float) -> int:
+        """Drop samples older than the cutoff timestamp, returns the amount of samples dropped"""
+        dropped = 0
+        while len(self) and self.timestamps[self.start % self.capacity] < cutoff:
+            self._pop()
+            dropped += 1
+        return dropped
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.itemsize * len(self.timestamps) * 2 + len(self.errors)
+
+    def rows(self, since: t.Optional[int] = None) -> t.List[SampleRow]:
+        """Get samples as rows, oldest first, optionally only from a sequence number onwards"""
+        rows = []
+        for seq in range(max(self.start, since or 0), self.end):
+            idx = seq % self.capacity
+            rows.append(
+                (
+                    self.cog_name,
+                    "",
+                    self.func_type,
+                    self.is_coro,
+                    self.timestamps[idx],
+                    self.durations[idx],
+                    self.messages.get(seq) if self.errors[idx] else None,
+                )
+            )
+        return rows
+
+    def to_profiles(self, limit: int = 1000) -> t.List[StatsProfile]:
+        """Build StatsProfile objects for the most recent samples, used when inspecting a method"""
+        profiles = []
+        for seq in range(max(self.start, self.end - limit), self.end):
+            idx = seq % self.capacity
+            profiles.append(
+                StatsProfile(
+                    total_tt=self.durations[idx],
+                    func_type=self.func_type,
+                    is_coro=self.is_coro,
+                    exception_thrown=self.messages.get(seq, "Exception") if self.errors[idx] else None,
+                    timestamp=datetime.fromtimestamp(self.timestamps[idx]),
+                )
+            )
+        return profiles
+
+
+class StatsStore:
+    """{cog_name: {method_key: SampleBuffer}}"""
+
+    def __init__(self):
+        self.buffers: t.Dict[str, t.Dict[str, SampleBuffer]] = {}
+
+    def add(
+        self,
+        cog_name: str,
+        method_key: str,
+        func_type: str,
+        is_coro: bool,
+        duration: float,
+        exception: t.Optional[str] = None,
+        ts: t.Optional[float] = None,
+    ) -> None:
+        methods = self.buffers.setdefault(cog_name, {})
+        buffer = methods.get(method_key)
+        if buffer is None:
+            buffer = methods[method_key] = SampleBuffer(cog_name, func_type, is_coro)
+        buffer.append(ts or time(), duration, exception)
+
+    def get(self, method_key: str) -> t.Optional[SampleBuffer]:
+        for methods in self.buffers.values():
+            if buffer := methods.get(method_key):
+                return buffer
+        return None
+
+    def items(self) -> t.List[t.Tuple[str, SampleBuffer]]:
+        return [(key, buffer) for methods in list(self.buffers.values()) for key, buffer in list(methods.items())]
+
+    def get_methods(self) -> t.Set[str]:
+        return {key for key, _ in self.items()}
+
+    def discard_method(self, method_key: str) -> None:
+        for methods in self.buffers.values():
+            methods.pop(method_key, None)
+
+    def clear(self) -> None:
+        self.buffers.clear()
+
+    @property
+    def records(self) -> int:
+        return sum(len(buffer) for _, buffer in self.items())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for _, buffer in self.items())
+
+    def cleanup(self, db: DB) -> int:
+        """Same rules as DB.cleanup, applied to the sample buffers"""
+        cutoff = (datetime.now() - timedelta(hours=db.delta)).timestamp()
+        cleaned = 0
+        for cog_name in list(self.buffers.keys()):
+            methods = self.buffers[cog_name]
+            for method_key in list(methods.keys()):
+                buffer = methods[method_key]
+                invalid = [
+                    buffer.func_type in ["command", "hybrid", "slash"] and not db.track_commands,
+                    buffer.func_type == "listener" and not db.track_listeners,
+                    buffer.func_type == "task" and not db.track_tasks,
+                    buffer.func_type == "method" and not db.track_methods,
+                    cog_name not in db.tracked_cogs and method_key not in db.tracked_methods,
+                ]
+                if any(invalid):
+                    methods.pop(method_key)
+                    cleaned += 1
+                    continue
+                if buffer.expire(cutoff):
+                    cleaned += 1
+                if not len(buffer):
+                    methods.pop(method_key)
+                    cleaned += 1
+            if not methods:
+                self.buffers.pop(cog_name)
+                cleaned += 1
+        return cleaned
+
+    def unflushed(self) -> t.List[SampleRow]:
+        """Get the samples that haven't been written to the sink yet and mark them as written"""
+        rows = []
+        for method_key, buffer in self.items():
+            end = buffer.end
+            for row in buffer.rows(since=buffer.flushed):
+                rows.append((row[0], method_key, *row[2:]))
+            buffer.flushed = end
+        return rows
+
+    def load(self, rows: t.Iterable[SampleRow]) -> int:
+        count = 0
+        for cog_name, method_key, func_type, is_coro, ts, duration, exception in rows:
+            self.add(cog_name, method_key, func_type, bool(is_coro), duration, exception, ts)
+            count += 1
+        # Loaded samples are already in the sink
+        for _, buffer in self.items():
+            buffer.flushed = buffer.end
+        return count
+
+
+class SampleSink:
+    """Optional on-disk SQLite sink so samples survive reloads without going through Config"""
+
+    def __init__(self, path: Path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS samples (
+                cog TEXT NOT NULL,
+                method TEXT NOT NULL,
+                func_type TEXT NOT NULL,
+                is_coro INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                duration REAL NOT NULL,
+                exception TEXT
+            );
+            CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+            """
+        )
+
+    def write(self, rows: t.List[SampleRow]) -> None:
+        if not rows:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            except Exception:
+                # Leaving the transaction open would make every later write fail on BEGIN
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def load(self, since: float) -> t.List[SampleRow]:
+        with self.lock:
+            return self.conn.execute("SELECT * FROM samples WHERE ts >= ? ORDER BY ts", (since,)).fetchall()
+
+    def prune(self, before: float) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM samples WHERE ts < ?", (before,))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM samples")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from redbot.core.utils.chat_formatting import box
 from tabulate import tabulate
 
+from .aggregate import Histogram, MethodAggregate
 from .models import DB, StatsProfile
 
 
@@ -91,65 +92,72 @@ def format_method_tables(data: t.List[StatsProfile]) -> t.List[str]:
     return tables
 
 
+def format_aggregate_page(method_key: str, aggregate: MethodAggregate, hours: int) -> str:
+    hist, minutes = aggregate.summary(hours)
+    if not hist.count:
+        return "No data to display. Come back later."
+
+    def _format(value: float):
+        return f"{value:.4f}s" if value > 1 else f"{value * 1000:.2f}ms"
+
+    calls_per_minute = hist.count / minutes if minutes else 0
+    return (
+        f"# {method_key}\n"
+        "## Overview (Aggregated)\n"
+        f"- Type: {aggregate.func_type.capitalize()}\n"
+        f"- Is Coroutine: {aggregate.is_coro}\n"
+        f"- Max Runtime: {_format(hist.high)}\n"
+        f"- Min Runtime: {_format(hist.low)}\n"
+        f"- Avg Runtime: {_format(hist.mean)}\n"
+        f"- p50: {_format(hist.percentile(50))}\n"
+        f"- p95: {_format(hist.percentile(95))}\n"
+        f"- p99: {_format(hist.percentile(99))}\n"
+        f"- Calls/Min: {calls_per_minute:.1f}\n"
+        f"- Total Calls: {hist.count}\n"
+        f"- Errors: {hist.errors}\n"
+    )
+
+
 def format_runtime_pages(
     db: DB,
     sort_by: str,
     query: str = None,
+    snapshots: t.Optional[t.Dict[str, t.Tuple[MethodAggregate, t.List[t.Tuple[int, Histogram]]]]] = None,
 ) -> t.List[str]:
-    now = datetime.now()
-    stats: t.Dict[str, list] = {}
-    keys = list(db.stats.keys())
-    for k in keys:
-        methodlist = db.stats[k]
-        method_keys = list(methodlist.keys())
-        for method_key in method_keys:
-            profiles = methodlist[method_key]
-            if query and query not in method_key:
-                continue
-
-            # Calculate the calls per minute and total calls in the last specified delta
-            valid_profiles = [i for i in profiles if i.timestamp > (now - timedelta(hours=db.delta))]
-            if not valid_profiles:
-                # Don't show any results beyond the set delta
-                continue
+    """
+    Build the overview pages
 
-            runtimes = [profile.total_tt for profile in valid_profiles]
-
-            max_runtime = max(runtimes)
-            min_runtime = min(runtimes)
-            avg_runtime = statistics.mean(runtimes)
-
-            # Now calculate the calls per minute
-            oldest_profile = min(valid_profiles, key=lambda i: i.timestamp)
-            timeframe_minutes = (now - oldest_profile.timestamp).total_seconds() / 60
-            calls_per_minute = len(valid_profiles) / timeframe_minutes if timeframe_minutes else 0
-
-            total_calls = len(valid_profiles)
-            error_count = len([i for i in valid_profiles if i.exception_thrown])
-
-            # Calculate impact score
-            std_dev = statistics.stdev(runtimes) if len(runtimes) > 1 else 0
-            variability_score = std_dev / avg_runtime if avg_runtime > 0 else 0
-            impact_score = (avg_runtime * calls_per_minute) * (1 + variability_score)
-
-            name = method_key
-            if profiles[0].func_type != "method":
-                name = f"{method_key} ({profiles[0].func_type[0].upper()})"
-
-            if method_key in db.tracked_methods:
-                name = f"+ {name}"
-            elif error_count > 0:
-                name = f"- {name}"
-
-            stats[name] = [
-                max_runtime,
-                min_runtime,
-                avg_runtime,
-                calls_per_minute,
-                total_calls,
-                error_count,
-                impact_score,
-            ]
+    `snapshots` is {method_key: (aggregate, aggregate.snapshot())}, taken on the loop so this can run in a thread.
+    """
+    stats: t.Dict[str, list] = {}
+    for method_key, (aggregate, windows) in (snapshots or {}).items():
+        if query and query not in method_key:
+            continue
+        hist, timeframe_minutes = aggregate.summary(db.delta, windows)
+        if not hist.count:
+            # Don't show any results beyond the set delta
+            continue
+        calls_per_minute = hist.count / timeframe_minutes if timeframe_minutes else 0
+        variability_score = hist.stdev / hist.mean if hist.mean > 0 else 0
+        impact_score = (hist.mean * calls_per_minute) * (1 + variability_score)
+
+        name = method_key
+        if aggregate.func_type != "method":
+            name = f"{method_key} ({aggregate.func_type[0].upper()})"
+        if method_key in db.tracked_methods:
+            name = f"+ {name}"
+        elif hist.errors > 0:
+            name = f"- {name}"
+
+        stats[name] = [
+            hist.high,
+            hist.low,
+            hist.mean,
+            calls_per_minute,
+            hist.count,
+            hist.errors,
+            impact_score,
+        ]
 
     per_page = 10
     start = 0
@@ -188,6 +196,7 @@ def format_runtime_pages(
             return f"{value * 1000:.1f}ms"
         return f"{value:.3f}s"
 
+    items = list(stats.items())
     pages = []
     for p in range(page_count):
         if end > len(stats):
@@ -195,10 +204,8 @@ def format_runtime_pages(
 
         rows = []
         for i in range(start, end):
-            method_key = list(stats.keys())[i]
-            max_runtime, min_runtime, avg_runtime, calls_per_minute, total_calls, error_count, impact_score = stats[
-                method_key
-            ]
+            method_key, values = items[i]
+            max_runtime, min_runtime, avg_runtime, calls_per_minute, total_calls, error_count, impact_score = values
             rows.append(
                 [
                     method_key,
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import tracemalloc
+import typing as t
+from collections import deque
+from time import time
+
+from tabulate import tabulate
+
+from .formatting import humanize_size
+
+log = logging.getLogger("red.vrt.profiler.mem_tracker")
+
+# Allocations made by the tracing machinery itself are noise
+FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class MemoryTracker:
+    """
+    Continuous leak hunting with tracemalloc
+
+    Lightweight snapshots are taken on an interval and kept in a bounded history, so growth can be
+    diffed by allocation site or by cog since the last snapshot or since tracking started.
+    """
+
+    def __init__(self):
+        self.frames: int = 5
+        self.interval: int = 300
+        # (timestamp, snapshot) of when tracking started
+        self.baseline: t.Optional[t.Tuple[float, tracemalloc.Snapshot]] = None
+        self.snapshots: t.Deque[t.Tuple[float, tracemalloc.Snapshot]] = deque(maxlen=6)
+        self.task: t.Optional[asyncio.Task] = None
+        # Don't stop tracing on unload if something else (like PYTHONTRACEMALLOC) started it
+        self.owns_tracing = False
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, frames: int = 5, interval: int = 300, retention: int = 6) -> None:
+        if self.running:
+            return
+        if tracemalloc.is_tracing():
+            self.frames = tracemalloc.get_traceback_limit()
+        else:
+            tracemalloc.start(frames)
+            self.frames = frames
+            self.owns_tracing = True
+        self.interval = interval
+        self.baseline = None
+        self.snapshots = deque(maxlen=retention)
+        self.task = asyncio.create_task(self.snapshot_loop())
+        log.info(f"Memory tracking started with {self.frames} frames every {interval}s")
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.owns_tracing = False
+        self.baseline = None
+        self.snapshots.clear()
+
+    async def snapshot_loop(self) -> None:
+        while True:
+            snapshot = await asyncio.to_thread(self.take_snapshot)
+            entry = (time(), snapshot)
+            if self.baseline is None:
+                self.baseline = entry
+            self.snapshots.append(entry)
+            await asyncio.sleep(self.interval)
+
+    @staticmethod
+    def take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(FILTERS)
+
+    def diff(
+        self,
+        since: t.Literal["last", "start"] = "last",
+        group_by: t.Literal["line", "cog"] = "line",
+        limit: int = 15,
+        cog_dirs: t.Optional[t.Dict[str, str]] = None,
+    ) -> str:
+        """
+        Compare a fresh snapshot against the last periodic one or the baseline
+
+        Args:
+            since: "last" for the most recent periodic snapshot, "start" for the baseline
+            group_by: "line" for allocation sites, "cog" to total growth per cog
+            limit: amount of rows to show
+            cog_dirs: {directory: cog_name} used to attribute allocations when grouping by cog
+        """
+        reference = self.baseline if since == "start" else (self.snapshots[-1] if self.snapshots else None)
+        if reference is None:
+            return "No snapshots have been taken yet"
+        taken, old = reference
+        new = self.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        header = (
+            f"Traced: {humanize_size(current)} (Peak: {humanize_size(peak)})\n"
+            f"Comparing to snapshot from {int(time() - taken)}s ago\n\n"
+        )
+
+        if group_by == "cog":
+            totals: t.Dict[str, t.List[int]] = {}
+            dirs = sorted((cog_dirs or {}).items(), key=lambda i: len(i[0]), reverse=True)
+            # {filename: cog_name or None}
+            owners: t.Dict[str, t.Optional[str]] = {}
+            for stat in new.compare_to(old, "traceback"):
+                owner = "Other"
+                # Innermost frame that lives in a cog's directory owns the allocation
+                for frame in reversed(stat.traceback):
+                    if frame.filename not in owners:
+                        owners[frame.filename] = next(
+                            (name for path, name in dirs if frame.filename.startswith(path)), None
+                        )
+                    if match := owners[frame.filename]:
+                        owner = match
+                        break
+                entry = totals.setdefault(owner, [0, 0, 0])
+                entry[0] += stat.size_diff
+                entry[1] += stat.size
+                entry[2] += stat.count_diff
+            ordered = sorted(totals.items(), key=lambda i: i[1][0], reverse=True)[:limit]
+            rows = [[name, humanize_size(diff), humanize_size(size), count] for name, (diff, size, count) in ordered]
+            return header + tabulate(rows, headers=["cog", "growth", "total size", "objects +/-"])
+
+        rows = []
+        growers = [i for i in new.compare_to(old, "lineno") if i.size_diff > 0]
+        for stat in growers[:limit]:
+            frame = stat.traceback[-1]
+            location = f"{frame.filename}:{frame.lineno}"
+            if len(location) > 60:
+                location = "..." + location[-57:]
+            rows.append([location, humanize_size(stat.size_diff), humanize_size(stat.size), stat.count_diff])
+        return header + tabulate(rows, headers=["allocation site", "growth", "total size", "objects +/-"])
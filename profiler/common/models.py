@@ -51,6 +51,14 @@ class DB(Base):
     verbose: bool = False  # If true, tracked_methods will be profiled verbosely
     tracked_threshold: float = 0.0  # Minimum execution delta to record a profile of tracked methods
 
+    # Record non-verbose runtimes into fixed-size per method histograms instead of individual profiles
+    aggregate: bool = False
+
+    # Event loop lag watchdog
+    watchdog: bool = False
+    lag_threshold: float = 100.0  # Minimum loop lag in ms to capture the blocking stack
+
+    # Verbose profiles only, runtimes live in the columnar sample buffers
     # {cog_name: {method_key: [StatsProfile]}}
     stats: t.Dict[str, t.Dict[str, t.List[StatsProfile]]] = {}
 
@@ -0,0 +1,158 @@
+import logging
+import sys
+import threading
+import typing as t
+from time import perf_counter
+
+import orjson
+
+log = logging.getLogger("red.vrt.profiler.sampler")
+
+# Max amount of distinct stacks to keep, anything beyond is counted under a single overflow stack
+MAX_STACKS = 50000
+# Max frames per stack, deeper frames are cut from the root side
+MAX_DEPTH = 128
+
+# (thread_name, (code, ...)) from root to leaf
+StackKey = t.Tuple[str, t.Tuple[t.Any, ...]]
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical sampling profiler for the whole bot
+
+    A background thread snapshots the stacks of every thread at a fixed rate and counts identical stacks,
+    so the cost depends on the sample rate rather than on how much code is running.
+    """
+
+    def __init__(self):
+        self.rate: int = 100  # Samples per second
+        self.stacks: t.Dict[StackKey, int] = {}
+        self.samples = 0
+        self.overflow = 0
+        self.started: t.Optional[float] = None
+        self.elapsed = 0.0
+        self.thread: t.Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, rate: int = 100) -> None:
+        if self.running:
+            return
+        self.rate = rate
+        self.reset()
+        self.stop_event = threading.Event()
+        self.started = perf_counter()
+        self.thread = threading.Thread(
+            target=self.run, args=(self.stop_event,), name="profiler-sampler", daemon=True
+        )
+        self.thread.start()
+        log.info(f"Sampling profiler started at {rate}Hz")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.started is not None:
+            self.elapsed = perf_counter() - self.started
+            self.started = None
+        self.thread = None
+
+    def reset(self) -> None:
+        self.stacks.clear()
+        self.samples = 0
+        self.overflow = 0
+        self.elapsed = 0.0
+
+    @property
+    def duration(self) -> float:
+        if self.started is not None:
+            return perf_counter() - self.started
+        return self.elapsed
+
+    def run(self, stop_event: threading.Event) -> None:
+        """Runs in the sampler thread"""
+        interval = 1 / self.rate
+        me = threading.get_ident()
+        while not stop_event.wait(interval):
+            try:
+                self.sample(me)
+            except Exception as e:
+                log.debug("Failed to take sample", exc_info=e)
+
+    def sample(self, ignore: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == ignore:
+                continue
+            codes = []
+            while frame is not None and len(codes) < MAX_DEPTH:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            key = (names.get(ident, str(ident)), tuple(codes))
+            if key in self.stacks:
+                self.stacks[key] += 1
+            elif len(self.stacks) < MAX_STACKS:
+                self.stacks[key] = 1
+            else:
+                self.overflow += 1
+        self.samples += 1
+
+    def export_collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format, usable with flamegraph.pl, speedscope, inferno, etc."""
+        labels: t.Dict[t.Any, str] = {}
+        lines = []
+        for (thread_name, codes), count in list(self.stacks.items()):
+            frames = [thread_name.replace(";", ":")]
+            for code in codes:
+                if code not in labels:
+                    labels[code] = frame_label(code).replace(";", ":")
+                frames.append(labels[code])
+            lines.append(f"{';'.join(frames)} {count}")
+        if self.overflow:
+            lines.append(f"[truncated stacks] {self.overflow}")
+        return "\n".join(lines)
+
+    def export_speedscope(self) -> bytes:
+        """Speedscope's JSON format with one sampled profile per thread"""
+        frames: t.List[dict] = []
+        frame_index: t.Dict[t.Any, int] = {}
+        profiles: t.Dict[str, dict] = {}
+        interval = 1 / self.rate
+        for (thread_name, codes), count in list(self.stacks.items()):
+            stack = []
+            for code in codes:
+                if code not in frame_index:
+                    frame_index[code] = len(frames)
+                    frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+                stack.append(frame_index[code])
+            profile = profiles.setdefault(
+                thread_name,
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": 0,
+                    "samples": [],
+                    "weights": [],
+                },
+            )
+            profile["samples"].append(stack)
+            profile["weights"].append(count * interval)
+            profile["endValue"] += count * interval
+        data = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "Red Bot Sampling Profile",
+            "exporter": "vrt-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+        return orjson.dumps(data)
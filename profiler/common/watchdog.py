@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import sys
+import threading
+import typing as t
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from .models import Method
+
+log = logging.getLogger("red.vrt.profiler.watchdog")
+
+# How often the heartbeat task wakes up, in seconds
+HEARTBEAT = 0.05
+# Max amount of distinct blockers to keep
+MAX_BLOCKERS = 250
+# Frames to keep per captured stack
+STACK_DEPTH = 8
+
+
+@dataclass
+class Blocker:
+    cog_name: str
+    location: str  # file:line in function
+    stack: t.List[str] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0  # Total seconds blocked
+    worst: float = 0.0  # Longest single block in seconds
+
+
+def package_root(module: str) -> str:
+    """Get the root package of a cog's module"""
+    parts = module.split(".")
+    if module.startswith("redbot.cogs."):
+        return ".".join(parts[:3])
+    return parts[0]
+
+
+class LoopWatchdog:
+    """
+    Measure event loop lag from a heartbeat task and find out who is blocking it
+
+    A helper thread keeps an eye on the heartbeat, when it hasn't ticked for longer than the threshold
+    the loop thread's current stack is captured and attributed to the cog that owns the innermost frame.
+    """
+
+    def __init__(self, get_methods: t.Callable[[], t.Dict[str, Method]], threshold: float):
+        self.get_methods = get_methods
+        self.threshold = threshold  # Seconds
+
+        self.loop_thread: t.Optional[int] = None
+        self.last_beat: float = perf_counter()
+        self.task: t.Optional[asyncio.Task] = None
+        self.thread: t.Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+        # Stack captured by the helper thread for the current stall: (beat, cog_name, location, stack)
+        self.pending: t.Optional[t.Tuple[float, str, str, t.List[str]]] = None
+        # {(cog_name, location): Blocker}
+        self.blockers: t.Dict[t.Tuple[str, str], Blocker] = {}
+
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+
+        self._module_map: t.Dict[str, str] = {}
+        self._mapped_count = -1
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        # Fresh event so a previous helper thread that hasn't woken up yet still exits
+        self.stop_event = threading.Event()
+        self.last_beat = perf_counter()
+        self.task = asyncio.create_task(self.heartbeat())
+        self.thread = threading.Thread(
+            target=self.monitor, args=(self.stop_event,), name="profiler-watchdog", daemon=True
+        )
+        self.thread.start()
+        log.info("Loop watchdog started")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.thread = None
+
+    def reset(self) -> None:
+        self.blockers.clear()
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    async def heartbeat(self) -> None:
+        self.loop_thread = threading.get_ident()
+        while True:
+            self.last_beat = perf_counter()
+            await asyncio.sleep(HEARTBEAT)
+            lag = perf_counter() - self.last_beat - HEARTBEAT
+            self.last_lag = max(lag, 0.0)
+            if lag < self.threshold:
+                continue
+            self.stalls += 1
+            self.max_lag = max(self.max_lag, lag)
+            pending = self.pending
+            self.pending = None
+            if pending is None or pending[0] != self.last_beat:
+                continue
+            self.add_blocker(pending[1], pending[2], pending[3], lag)
+
+    def add_blocker(self, cog_name: str, location: str, stack: t.List[str], lag: float) -> None:
+        key = (cog_name, location)
+        blocker = self.blockers.get(key)
+        if blocker is None:
+            if len(self.blockers) >= MAX_BLOCKERS:
+                # Make room by dropping the least impactful blocker
+                smallest = min(self.blockers, key=lambda k: self.blockers[k].total)
+                del self.blockers[smallest]
+            blocker = self.blockers[key] = Blocker(cog_name, location, stack)
+        blocker.count += 1
+        blocker.total += lag
+        blocker.worst = max(blocker.worst, lag)
+
+    def monitor(self, stop_event: threading.Event) -> None:
+        """Runs in the helper thread"""
+        while not stop_event.wait(HEARTBEAT):
+            beat = self.last_beat
+            # The heartbeat sleeps for HEARTBEAT between beats, only time beyond that is lag
+            if perf_counter() - beat < HEARTBEAT + self.threshold:
+                continue
+            if self.pending is not None and self.pending[0] == beat:
+                # Already captured this stall
+                continue
+            try:
+                captured = self.capture()
+            except Exception as e:
+                log.debug("Failed to capture loop stack", exc_info=e)
+                continue
+            if captured is not None:
+                self.pending = (beat, *captured)
+
+    def capture(self) -> t.Optional[t.Tuple[str, str, t.List[str]]]:
+        if self.loop_thread is None:
+            return None
+        frame = sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return None
+        module_map = self.module_map()
+        frames = []
+        owner = None
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", "")
+            location = f"{code.co_filename}:{frame.f_lineno} in {code.co_name}"
+            frames.append(location)
+            if owner is None:
+                cog_name = module_map.get(module) or module_map.get(package_root(module))
+                if cog_name:
+                    owner = (cog_name, location)
+            frame = frame.f_back
+        if owner is None:
+            owner = ("Unknown", frames[0])
+        return owner[0], owner[1], frames[:STACK_DEPTH]
+
+    def module_map(self) -> t.Dict[str, str]:
+        """{module or package root: cog_name}, built from the profiler's method map"""
+        methods = self.get_methods()
+        if len(methods) == self._mapped_count:
+            return self._module_map
+        mapping = {}
+        for key, method in list(methods.items()):
+            module = key.rsplit(".", 1)[0]
+            mapping[module] = method.cog_name
+            mapping.setdefault(package_root(module), method.cog_name)
+        # Never attribute stalls to red or discord.py internals
+        mapping = {k: v for k, v in mapping.items() if k not in ("redbot", "discord")}
+        self._module_map = mapping
+        self._mapped_count = len(methods)
+        return mapping
+
+    def top(self, limit: int = 10) -> t.List[Blocker]:
+        return sorted(self.blockers.values(), key=lambda b: b.total, reverse=True)[:limit]
@@ -8,6 +8,7 @@ from dataclasses import asdict
 from time import perf_counter
 
 from ..abc import MixinMeta
+from .aggregate import MethodAggregate
 from .models import StatsProfile
 
 log = logging.getLogger("red.vrt.profiler.wrapper")
@@ -21,14 +22,16 @@ class Wrapper(MixinMeta):
 
         self.currently_tracked.add(key)
         log.debug(f"Attaching profiler to {func_type.upper()}: {key}")
+        is_coro = asyncio.iscoroutinefunction(func)
 
-        if asyncio.iscoroutinefunction(func):
+        if is_coro:
 
             async def async_wrapper(*args, **kwargs):
                 exception = None
 
                 if self.db.verbose or key in self.db.tracked_methods:
                     profile = cProfile.Profile()
+                    start = perf_counter()
                     profile.enable()
                     try:
                         retval = await func(*args, **kwargs)
@@ -38,6 +41,7 @@ class Wrapper(MixinMeta):
                         raise exc
                     finally:
                         profile.disable()
+                        self.add_sample(key, cog_name, func_type, is_coro, perf_counter() - start, exception)
                         await asyncio.to_thread(self.add_stats, func, profile, cog_name, func_type, exception)
 
                 else:
@@ -50,7 +54,10 @@ class Wrapper(MixinMeta):
                         raise exc
                     finally:
                         delta = perf_counter() - start
-                        await asyncio.to_thread(self.add_stats, func, delta, cog_name, func_type, exception)
+                        if self.db.aggregate:
+                            self.add_aggregate(key, cog_name, func_type, is_coro, delta, exception is not None)
+                        else:
+                            self.add_sample(key, cog_name, func_type, is_coro, delta, exception)
 
             # Preserve the signature of the original function
             functools.update_wrapper(async_wrapper, func)
@@ -63,6 +70,7 @@ class Wrapper(MixinMeta):
 
                 if self.db.verbose or key in self.db.tracked_methods:
                     profile = cProfile.Profile()
+                    start = perf_counter()
                     profile.enable()
                     try:
                         retval = func(*args, **kwargs)
@@ -72,6 +80,7 @@ class Wrapper(MixinMeta):
                         raise exc
                     finally:
                         profile.disable()
+                        self.add_sample(key, cog_name, func_type, is_coro, perf_counter() - start, exception)
                         self.add_stats(func, profile, cog_name, func_type, exception)
 
                 else:
@@ -84,7 +93,10 @@ class Wrapper(MixinMeta):
                         raise exc
                     finally:
                         delta = perf_counter() - start
-                        self.add_stats(func, delta, cog_name, func_type, exception)
+                        if self.db.aggregate:
+                            self.add_aggregate(key, cog_name, func_type, is_coro, delta, exception is not None)
+                        else:
+                            self.add_sample(key, cog_name, func_type, is_coro, delta, exception)
 
             # Preserve the signature of the original function
             functools.update_wrapper(sync_wrapper, func)
@@ -93,33 +105,72 @@ class Wrapper(MixinMeta):
     def add_stats(
         self,
         func: t.Callable,
-        profile_or_delta: t.Union[cProfile.Profile, float],
+        profile: cProfile.Profile,
         cog_name: str,
         func_type: str,
         exception_thrown: t.Optional[str] = None,
     ):
+        """Build a verbose profile, runtimes themselves are recorded into the sample buffers by add_sample"""
         try:
             key = f"{func.__module__}.{func.__name__}"
-            if isinstance(profile_or_delta, cProfile.Profile):
-                results = pstats.Stats(profile_or_delta)
-                results.sort_stats(pstats.SortKey.CUMULATIVE)
-                stats = asdict(results.get_stats_profile())
-                stats_profile = StatsProfile.model_validate(
-                    {
-                        **stats,
-                        "func_type": func_type,
-                        "is_coro": asyncio.iscoroutinefunction(func),
-                        "exception_thrown": exception_thrown,
-                    }
-                )
-            else:
-                stats_profile = StatsProfile(
-                    total_tt=profile_or_delta,
-                    func_type=func_type,
-                    is_coro=asyncio.iscoroutinefunction(func),
-                    func_profiles={},
-                    exception_thrown=exception_thrown,
-                )
+            results = pstats.Stats(profile)
+            results.sort_stats(pstats.SortKey.CUMULATIVE)
+            stats = asdict(results.get_stats_profile())
+            stats_profile = StatsProfile.model_validate(
+                {
+                    **stats,
+                    "func_type": func_type,
+                    "is_coro": asyncio.iscoroutinefunction(func),
+                    "exception_thrown": exception_thrown,
+                }
+            )
             self.db.stats.setdefault(cog_name, {}).setdefault(key, []).append(stats_profile)
         except Exception as e:
             log.exception(f"Failed to {func_type} stats for the {cog_name} cog", exc_info=e)
+
+    def add_sample(
+        self,
+        key: str,
+        cog_name: str,
+        func_type: str,
+        is_coro: bool,
+        delta: float,
+        exception_thrown: t.Optional[str] = None,
+    ):
+        """Record a runtime inline into the method's columnar buffer and its histogram"""
+        if key in self.db.tracked_methods and (delta * 1000) < self.db.tracked_threshold:
+            return
+        try:
+            self.store.add(cog_name, key, func_type, is_coro, delta, exception_thrown)
+        except Exception as e:
+            log.exception(f"Failed to record {func_type} sample for the {cog_name} cog", exc_info=e)
+        self.add_aggregate(key, cog_name, func_type, is_coro, delta, exception_thrown is not None)
+
+    def add_aggregate(
+        self,
+        key: str,
+        cog_name: str,
+        func_type: str,
+        is_coro: bool,
+        delta: float,
+        errored: bool,
+        ts: t.Optional[float] = None,
+    ):
+        """Record a runtime inline into the method's histogram, no thread hop or per-call objects"""
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            aggregate = MethodAggregate(cog_name, func_type, is_coro, self.db.delta)
+            self.aggregates[key] = aggregate
+        aggregate.record(delta, errored, ts)
+
+    def prune_aggregates(self) -> int:
+        """Drop aggregates for methods that are no longer tracked and apply the retention period"""
+        pruned = 0
+        for key in list(self.aggregates.keys()):
+            aggregate = self.aggregates[key]
+            if aggregate.cog_name not in self.db.tracked_cogs and key not in self.db.tracked_methods:
+                del self.aggregates[key]
+                pruned += 1
+                continue
+            aggregate.resize(self.db.delta)
+        return pruned
@@ -1,15 +1,22 @@
 import asyncio
 import logging
 import typing as t
+from datetime import datetime, timedelta
 
 from discord.ext import tasks
 from redbot.core import Config, commands
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 
 from .abc import CompositeMetaClass
 from .commands.owner import Owner
+from .common.aggregate import MethodAggregate
+from .common.columnar import SampleSink, StatsStore
+from .common.mem_tracker import MemoryTracker
 from .common.models import DB, Method
 from .common.profiling import Profiling
+from .common.sampler import StackSampler
+from .common.watchdog import LoopWatchdog
 from .common.wrapper import Wrapper
 
 log = logging.getLogger("red.vrt.profiler")
@@ -25,7 +32,7 @@ class Profiler(Owner, Profiling, Wrapper, commands.Cog, metaclass=CompositeMetaC
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "1.4.5"
+    __version__ = "1.9.0"
 
     def __init__(self, bot: Red):
         super().__init__()
@@ -50,6 +57,14 @@ class Profiler(Owner, Profiling, Wrapper, commands.Cog, metaclass=CompositeMetaC
         # {method_key: Method}
         self.methods: t.Dict[str, Method] = {}
         self.currently_tracked: t.Set[str] = set()
+        # {method_key: MethodAggregate}
+        self.aggregates: t.Dict[str, MethodAggregate] = {}
+        # Non-verbose runtimes, kept in columnar ring buffers per method
+        self.store = StatsStore()
+        self.sink: t.Optional[SampleSink] = None
+        self.watchdog = LoopWatchdog(lambda: self.methods, self.db.lag_threshold / 1000)
+        self.sampler = StackSampler()
+        self.mem_tracker = MemoryTracker()
         self.map_methods()
 
     def format_help_for_context(self, ctx: commands.Context):
@@ -65,25 +80,78 @@ class Profiler(Owner, Profiling, Wrapper, commands.Cog, metaclass=CompositeMetaC
 
     async def cog_unload(self) -> None:
         self.detach_profilers()
+        self.watchdog.stop()
+        self.sampler.stop()
+        self.mem_tracker.stop()
         self.save_loop.cancel()
+        if self.sink is not None:
+            if self.db.save_stats:
+                await asyncio.to_thread(self.sink.write, self.store.unflushed())
+            self.sink.close()
 
     async def _initialize(self) -> None:
         await self.bot.wait_until_red_ready()
         data = await self.config.db()
         self.db = await asyncio.to_thread(DB.model_validate, data)
         log.info("Config loaded")
+        self.sink = SampleSink(cog_data_path(self) / "samples.db")
+        await asyncio.to_thread(self.load_samples)
         self.build()
-        await asyncio.to_thread(self.db.cleanup)
+        self.watchdog.threshold = self.db.lag_threshold / 1000
+        if self.db.watchdog:
+            self.watchdog.start()
+        await self.cleanup()
         await asyncio.sleep(10)
         self.save_loop.start()
 
+    def load_samples(self) -> None:
+        """Load the sink and move profiles saved by older versions into the sample buffers"""
+        if self.db.save_stats:
+            since = (datetime.now() - timedelta(hours=self.db.delta)).timestamp()
+            rows = self.sink.load(since)
+            loaded = self.store.load(rows)
+            for cog_name, method_key, func_type, is_coro, ts, duration, exception in rows:
+                self.add_aggregate(method_key, cog_name, func_type, bool(is_coro), duration, exception is not None, ts)
+            log.info(f"Loaded {loaded} samples from disk")
+        legacy = 0
+        for cog_name, methods in self.db.stats.items():
+            for method_key in list(methods.keys()):
+                profiles = methods[method_key]
+                for profile in profiles:
+                    if profile.func_profiles:
+                        continue
+                    self.store.add(
+                        cog_name,
+                        method_key,
+                        profile.func_type,
+                        profile.is_coro,
+                        profile.total_tt,
+                        profile.exception_thrown,
+                        profile.timestamp.timestamp(),
+                    )
+                    self.add_aggregate(
+                        method_key,
+                        cog_name,
+                        profile.func_type,
+                        profile.is_coro,
+                        profile.total_tt,
+                        profile.exception_thrown is not None,
+                        profile.timestamp.timestamp(),
+                    )
+                    legacy += 1
+                methods[method_key] = [i for i in profiles if i.func_profiles]
+                if not methods[method_key]:
+                    methods.pop(method_key)
+        if legacy:
+            log.info(f"Migrated {legacy} saved profiles to the sample buffers")
+
     async def save(self) -> None:
         if self.saving:
             return
 
         def _dump():
             db = DB.model_validate(self.db.model_dump(exclude={"stats"}))
-            # Break stats down to avoid RuntimeErrors
+            # Break stats down to avoid RuntimeErrors, only verbose profiles live here
             if self.db.save_stats:
                 keys = list(self.db.stats.keys())
                 for cog_name in keys:
@@ -93,19 +161,32 @@ class Profiler(Owner, Profiling, Wrapper, commands.Cog, metaclass=CompositeMetaC
                         db.stats[cog_name][method_key] = self.db.stats[cog_name][method_key].copy()
             return db.model_dump(mode="json")
 
+        def _flush(rows: list):
+            self.sink.write(rows)
+            self.sink.prune((datetime.now() - timedelta(hours=self.db.delta)).timestamp())
+
         try:
             self.saving = True
             log.debug("Saving config")
             dump = await asyncio.to_thread(_dump)
             await self.config.db.set(dump)
+            if self.db.save_stats and self.sink is not None:
+                await asyncio.to_thread(_flush, self.store.unflushed())
         except Exception as e:
             log.exception("Failed to save config", exc_info=e)
         finally:
             self.saving = False
 
+    async def cleanup(self) -> int:
+        # Buffers are mutated on the loop so the wrappers never see them half updated
+        cleaned = self.store.cleanup(self.db)
+        cleaned += await asyncio.to_thread(self.db.cleanup)
+        return cleaned
+
     @tasks.loop(seconds=60)
     async def save_loop(self) -> None:
-        await asyncio.to_thread(self.db.cleanup)
+        await self.cleanup()
+        self.prune_aggregates()
         if not self.db.save_stats:
             return
         await self.save()
@@ -115,10 +196,12 @@ class Profiler(Owner, Profiling, Wrapper, commands.Cog, metaclass=CompositeMetaC
             self.detach_profilers()
             self.map_methods()
             cleaned = self.db.cleanup()
+            self.prune_aggregates()
             self.build()
             return cleaned
 
-        cleaned = await asyncio.to_thread(_run)
+        cleaned = self.store.cleanup(self.db)
+        cleaned += await asyncio.to_thread(_run)
         if cleaned:
             await self.save()
 
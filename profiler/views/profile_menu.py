@@ -10,11 +10,13 @@ from redbot.core.utils.chat_formatting import text_to_file
 
 from ..abc import MixinMeta
 from ..common.formatting import (
+    format_aggregate_page,
     format_method_pages,
     format_method_tables,
     format_runtime_pages,
 )
 from ..common.generator import generate_line_graph
+from ..common.models import StatsProfile
 
 
 class SearchModal(discord.ui.Modal):
@@ -54,6 +56,8 @@ class ProfileMenu(discord.ui.View):
         self.query: t.Union[str, None] = None
 
         self.inspecting: t.Union[str, None] = None
+        # False when the inspected method only has a histogram summary
+        self.pages_have_samples = True
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.ctx.author.id:
@@ -80,10 +84,24 @@ class ProfileMenu(discord.ui.View):
 
         self.stop()
 
+    async def get_runtime_pages(self) -> t.List[str]:
+        # Snapshot on the loop, the wrappers keep recording into the newest windows while the pages are built
+        snapshots = {key: (aggregate, aggregate.snapshot()) for key, aggregate in self.cog.aggregates.items()}
+        return await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query, snapshots)
+
+    def get_method_stats(self, method_key: str) -> t.Optional[t.List[StatsProfile]]:
+        """Verbose profiles if there are any, otherwise the most recent samples from the method's buffer"""
+        for methodlist in self.db.stats.values():
+            if method_stats := methodlist.get(method_key):
+                return method_stats
+        if buffer := self.cog.store.get(method_key):
+            return buffer.to_profiles()
+        return None
+
     async def start(self):
         self.remove_item(self.back)
 
-        self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by)
+        self.pages = await self.get_runtime_pages()
         if len(self.pages) < 15:
             self.remove_item(self.right10)
             self.remove_item(self.left10)
@@ -175,7 +193,11 @@ class ProfileMenu(discord.ui.View):
 
     @discord.ui.button(label="Filter", style=discord.ButtonStyle.success, row=1)
     async def filter_results(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.inspecting:
+        if self.inspecting and not self.pages_have_samples:
+            await interaction.response.send_message(
+                "Threshold filtering is not available for aggregated methods", ephemeral=True
+            )
+        elif self.inspecting:
             modal = SearchModal(self.query, "Filter Results", "Enter Minimum Execution Threshold (ms)")
             await interaction.response.send_modal(modal)
             await modal.wait()
@@ -192,10 +214,8 @@ class ProfileMenu(discord.ui.View):
                 except ValueError:
                     return await interaction.followup.send("Invalid threshold, must be a decimal", ephemeral=True)
 
-            for methodlist in self.db.stats.values():
-                if method_stats := methodlist.get(self.inspecting):
-                    break
-            else:
+            method_stats = await asyncio.to_thread(self.get_method_stats, self.inspecting)
+            if not method_stats:
                 return await interaction.followup.send("No method found with that key", ephemeral=True)
 
             await interaction.followup.send(
@@ -213,7 +233,7 @@ class ProfileMenu(discord.ui.View):
 
             self.query = modal.query
             await interaction.followup.send(f"Filtering results with query: `{self.query}`", ephemeral=True)
-            self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+            self.pages = await self.get_runtime_pages()
             await self.update()
 
     @discord.ui.button(label="Inspect", style=discord.ButtonStyle.success, row=1)
@@ -224,13 +244,19 @@ class ProfileMenu(discord.ui.View):
         if modal.query is None:
             return
 
-        for methodlist in self.db.stats.values():
-            if method_stats := methodlist.get(modal.query):
-                break
-        else:
+        method_stats = await asyncio.to_thread(self.get_method_stats, modal.query)
+        if not method_stats:
+            if aggregate := self.cog.aggregates.get(modal.query):
+                self.inspecting = modal.query
+                self.pages_have_samples = False
+                self.pages = [format_aggregate_page(modal.query, aggregate, self.db.delta)]
+                self.tables = []
+                await self.update()
+                return
             return await interaction.followup.send("No method found with that key", ephemeral=True)
 
         self.inspecting = modal.query
+        self.pages_have_samples = True
         self.pages = await asyncio.to_thread(format_method_pages, modal.query, method_stats)
         self.tables = await asyncio.to_thread(format_method_tables, method_stats)
         if len(method_stats) > 10:
@@ -267,7 +293,7 @@ class ProfileMenu(discord.ui.View):
             self.sorting_by = "Name"
             button.label = "Sort: Name"
 
-        self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+        self.pages = await self.get_runtime_pages()
         await self.update()
 
     def _match(self, data: t.List[str], name: str):
@@ -292,21 +318,21 @@ class ProfileMenu(discord.ui.View):
             self.db.tracked_cogs.append(query)
             await asyncio.to_thread(self.cog.attach_cog, query)
             await interaction.followup.send(f"Cog `{query}` is now being tracked", ephemeral=True)
-            self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+            self.pages = await self.get_runtime_pages()
             await self.update()
             await self.cog.save()
             return
 
-        if query in self.cog.methods or query in self.db.get_methods():
+        if query in self.cog.methods or query in self.db.get_methods() or query in self.cog.store.get_methods():
             self.db.tracked_methods.append(query)
             await interaction.followup.send(f"Method `{query}` is now being tracked", ephemeral=True)
             await asyncio.to_thread(self.cog.attach_method, query)
-            self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+            self.pages = await self.get_runtime_pages()
             await self.update()
             await self.cog.save()
             return
 
-        data = list(self.cog.methods.keys()) + list(self.cog.bot.cogs.keys()) + list(self.db.get_methods())
+        data = list(self.cog.methods.keys()) + list(self.cog.bot.cogs.keys()) + list(self.cog.store.get_methods())
         await interaction.followup.send(
             f"No cog or method found with that name, did you mean `{self._match(data, query)}`?", ephemeral=True
         )
@@ -328,7 +354,9 @@ class ProfileMenu(discord.ui.View):
                 )
 
             self.db.stats.pop(query, None)
-            cleaned = await asyncio.to_thread(self.db.cleanup)
+            self.cog.store.buffers.pop(query, None)
+            self.cog.prune_aggregates()
+            cleaned = await self.cog.cleanup()
             if cleaned:
                 await interaction.followup.send(
                     f"Cog `{query}` is no longer being tracked, cleaned `{cleaned}` objects.", ephemeral=True
@@ -336,7 +364,7 @@ class ProfileMenu(discord.ui.View):
             else:
                 await interaction.followup.send(f"Cog `{query}` is no longer being tracked", ephemeral=True)
 
-            self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+            self.pages = await self.get_runtime_pages()
             await self.update()
             await self.cog.save()
             return
@@ -349,7 +377,9 @@ class ProfileMenu(discord.ui.View):
                     f"Failed to detach `{query}`, is the cog it belongs to still loaded?", ephemeral=True
                 )
             self.db.discard_method(query)
-            cleaned = await asyncio.to_thread(self.db.cleanup)
+            self.cog.store.discard_method(query)
+            self.cog.aggregates.pop(query, None)
+            cleaned = await self.cog.cleanup()
             if cleaned:
                 await interaction.followup.send(
                     f"Method `{query}` is no longer being tracked, cleaned `{cleaned}` objects.", ephemeral=True
@@ -357,7 +387,7 @@ class ProfileMenu(discord.ui.View):
             else:
                 await interaction.followup.send(f"Method `{query}` is no longer being tracked", ephemeral=True)
 
-            self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+            self.pages = await self.get_runtime_pages()
             await self.update()
             await self.cog.save()
             return
@@ -372,7 +402,7 @@ class ProfileMenu(discord.ui.View):
         with suppress(discord.NotFound):
             await interaction.response.defer()
 
-        self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+        self.pages = await self.get_runtime_pages()
         await self.update()
 
     @discord.ui.button(label="Back", style=discord.ButtonStyle.secondary, row=1)
@@ -384,5 +414,5 @@ class ProfileMenu(discord.ui.View):
             return
         self.inspecting = None
         self.tables.clear()
-        self.pages = await asyncio.to_thread(format_runtime_pages, self.db, self.sorting_by, self.query)
+        self.pages = await self.get_runtime_pages()
         await self.update()
@@ -1,9 +1,14 @@
+import typing as t
 from abc import ABC, ABCMeta
 from pathlib import Path
 
 from discord.ext.commands.cog import CogMeta
 from redbot.core.bot import Red
 
+from .common.dirsize import DirSizeScanner
+from .common.guilds import MemberCounts
+from .common.metrics import MetricsSampler
+
 
 class CompositeMetaClass(CogMeta, ABCMeta):
     """Type detection"""
@@ -16,3 +21,6 @@ class MixinMeta(ABC):
         self.bot: Red
         self.path: Path
         self.core: Path
+        self.sampler: MetricsSampler
+        self.guild_counts: t.Dict[int, t.Tuple[float, MemberCounts]]
+        self.dir_scanner: DirSizeScanner
@@ -1,5 +1,6 @@
 import asyncio
 import datetime
+import heapq
 import json
 import os
 import platform
@@ -10,7 +11,6 @@ from pathlib import Path
 from time import perf_counter
 
 import aiohttp
-import cpuinfo
 import discord
 import psutil
 import speedtest
@@ -20,6 +20,7 @@ from redbot.core._cog_manager import CogManager
 from redbot.core.bot import Red
 from redbot.core.utils.chat_formatting import (
     box,
+    humanize_list,
     humanize_number,
     humanize_timedelta,
     pagify,
@@ -27,15 +28,11 @@ from redbot.core.utils.chat_formatting import (
 )
 
 from ..abc import MixinMeta
-from ..common.dpymenu import DEFAULT_CONTROLS, confirm, menu
+from ..common.dirsize import TOP_FILES
 from ..common.dynamic_menu import DynamicMenu
-from ..common.utils import (
-    calculate_directory_size,
-    do_shell_command,
-    get_bar,
-    get_bitsize,
-    get_size,
-)
+from ..common.guilds import SORT_OPTIONS, open_guild_menu
+from ..common.metrics import WINDOWS
+from ..common.utils import do_shell_command, get_bar, get_size
 
 
 class BotInfo(MixinMeta):
@@ -96,193 +93,20 @@ class BotInfo(MixinMeta):
     @commands.command()
     @commands.is_owner()
     @commands.guild_only()
-    async def guilds(self, ctx: commands.Context):
-        """View guilds your bot is in"""
+    async def guilds(self, ctx: commands.Context, sort_by: str = "default", elevated: bool = False):
+        """
+        View guilds your bot is in
+
+        **Arguments**
+        - `sort_by`: `default`, `members` (largest first), `joined` (newest first), `created` (oldest first) or `name`
+        - `elevated`: only show guilds where the bot has elevated permissions
+        """
         # Just wanted a stripped down version of getguild from Trusty's serverstats cog
         # https://github.com/TrustyJAID/Trusty-cogs
-        elevated_perms = [
-            "administrator",
-            "ban_members",
-            "kick_members",
-            "manage_channels",
-            "manage_guild",
-            "manage_emojis",
-            "manage_messages",
-            "manage_roles",
-            "manage_webhooks",
-            "manage_nicknames",
-            "mute_members",
-            "moderate_members",
-            "move_members",
-            "deafen_members",
-        ]
-        embeds = []
-        guilds = len(self.bot.guilds)
-        page = 0
-        for i, guild in enumerate(self.bot.guilds):
-            guild: discord.Guild = guild
-            if guild.id == ctx.guild.id:
-                page = i
-            guild_splash = guild.splash.url if guild.splash else None
-            guild_icon = guild.icon.url if guild.icon else None
-            created = f"<t:{int(guild.created_at.replace(tzinfo=datetime.timezone.utc).timestamp())}:D>"
-            time_elapsed = f"<t:{int(guild.created_at.replace(tzinfo=datetime.timezone.utc).timestamp())}:R>"
-            try:
-                joined_at = guild.me.joined_at
-            except AttributeError:
-                joined_at = discord.utils.utcnow()
-            bot_joined = f"<t:{int(joined_at.replace(tzinfo=datetime.timezone.utc).timestamp())}:D>"
-            since_joined = f"<t:{int(joined_at.replace(tzinfo=datetime.timezone.utc).timestamp())}:R>"
-
-            humans = sum(1 for x in guild.members if not x.bot)
-            bots = sum(1 for x in guild.members if x.bot)
-            idle = sum(1 for x in guild.members if x.status is discord.Status.idle)
-            online = sum(1 for x in guild.members if x.status is discord.Status.online)
-            dnd = sum(1 for x in guild.members if x.status is discord.Status.do_not_disturb)
-            offline = sum(1 for x in guild.members if x.status is discord.Status.offline)
-            streaming = sum(
-                1 for x in guild.members if x.activity is not None and x.activity.type is discord.ActivityType.streaming
-            )
-
-            desc = (
-                f"{guild.description}\n\n"
-                f"`GuildCreated: `{created} ({time_elapsed})\n"
-                f"`BotJoined:    `{bot_joined} ({since_joined})\n"
-                f"`Humans:    `{humans}\n"
-                f"`Bots:      `{bots}\n"
-                f"`Online:    `{online}\n"
-                f"`Idle:      `{idle}\n"
-                f"`DND:       `{dnd}\n"
-                f"`Offline:   `{offline}\n"
-                f"`Streaming: `{streaming}\n"
-            )
-
-            em = discord.Embed(
-                title=f"{guild.name} -- {guild.id}",
-                description=desc,
-                color=ctx.author.color,
-            )
-
-            if guild_icon:
-                em.set_thumbnail(url=guild_icon)
-
-            owner = guild.owner if guild.owner else await self.bot.get_or_fetch_user(guild.owner_id)
-            verlevel = guild.verification_level
-            nitro = guild.premium_tier
-            boosters = guild.premium_subscription_count
-            filelimit = get_size(guild.filesize_limit)
-            elimit = guild.emoji_limit
-            bits = get_bitsize(guild.bitrate_limit)
-            field = (
-                f"`Owner:        `{owner}\n"
-                f"`OwnerID:      `{owner.id}\n"
-                f"`Verification: `{verlevel}\n"
-                f"`Nitro Tier:   `{nitro}\n"
-                f"`Boosters:     `{boosters}\n"
-                f"`File Limit:   `{filelimit}\n"
-                f"`Emoji Limit:  `{elimit}\n"
-                f"`Bitrate:      `{bits}"
-            )
-            em.add_field(name="Details", value=field)
-
-            text_channels = len(guild.text_channels)
-            nsfw_channels = len([c for c in guild.text_channels if c.is_nsfw()])
-            voice_channels = len(guild.voice_channels)
-            field = f"`Text:  `{text_channels}\n" f"`Voice: `{voice_channels}\n" f"`NSFW:  `{nsfw_channels}"
-            em.add_field(name="Channels", value=field)
-
-            elevated_roles = [r for r in guild.roles if any([p[0] in elevated_perms for p in r.permissions if p[1]])]
-            normal_roles = [r for r in guild.roles if not any([p[0] in elevated_perms for p in r.permissions if p[1]])]
-            field = (
-                f"`Elevated: `{len(elevated_roles)}\n"
-                f"`Normal:   `{len(normal_roles)}\n"
-                f"`Total:    `{len(elevated_roles) + len(normal_roles)}"
-            )
-            em.add_field(name="Roles", value=field)
-
-            if guild_splash:
-                em.set_image(url=guild_splash)
-
-            em.set_footer(text=f"Page {i + 1}/{guilds}")
-            embeds.append(em)
-
-        controls = DEFAULT_CONTROLS.copy()
-        controls["\N{WASTEBASKET}\N{VARIATION SELECTOR-16}"] = self.leave_guild
-        controls["\N{CHAINS}\N{VARIATION SELECTOR-16}"] = self.get_invite
-        await menu(ctx, embeds, controls, page=page)
-
-    async def leave_guild(self, instance, interaction):
-        ctx = instance.ctx
-        data = instance.pages[instance.page].title.split("--")
-        guildname = data[0].strip()
-        guildid = data[1].strip()
-        msg = await ctx.send(f"Are you sure you want me to leave **{guildname}**?")
-        yes = await confirm(ctx, msg)
-        await msg.delete()
-        if yes is None:
-            return
-        if yes:
-            guild = self.bot.get_guild(int(guildid))
-            if not guild:
-                await instance.respond(interaction, "I could not find that guild")
-            else:
-                await guild.leave()
-                await instance.respond(interaction, f"I have left **{guildname}**")
-        else:
-            await instance.respond(interaction, f"Not leaving **{guildname}**")
-        await menu(
-            ctx,
-            instance.pages,
-            instance.controls,
-            instance.message,
-            instance.page,
-            instance.timeout,
-        )
-
-    async def get_invite(self, instance, interaction):
-        ctx = instance.ctx
-        data = instance.pages[instance.page].title.split("--")
-        guildid = data[1].strip()
-        guild = self.bot.get_guild(int(guildid))
-        invite = None
-        my_perms: discord.Permissions = guild.me.guild_permissions
-        if my_perms.manage_guild or my_perms.administrator:
-            if "VANITY_URL" in guild.features:
-                # guild has a vanity url so use it as the one to send
-                try:
-                    return await guild.vanity_invite()
-                except discord.errors.Forbidden:
-                    pass
-            invites = await guild.invites()
-        else:
-            invites = []
-        for inv in invites:  # Loop through the invites for the guild
-            if not (inv.max_uses or inv.max_age or inv.temporary):
-                invite = inv
-                break
-        else:  # No existing invite found that is valid
-            channel = None
-            for channel in guild.text_channels:
-                if channel.permissions_for(guild.me).create_instant_invite:
-                    break
-            try:
-                if channel is not None:
-                    # Create invite that expires after max_age
-                    invite = await channel.create_invite(max_age=3600)
-            except discord.HTTPException:
-                pass
-        if invite:
-            await instance.respond(interaction, str(invite))
-        else:
-            await instance.respond(interaction, "I could not get an invite for that server!")
-        await menu(
-            ctx,
-            instance.pages,
-            instance.controls,
-            instance.message,
-            instance.page,
-            instance.timeout,
-        )
+        sort_by = sort_by.lower()
+        if sort_by not in SORT_OPTIONS:
+            return await ctx.send(f"Sort by must be one of {humanize_list([f'`{i}`' for i in SORT_OPTIONS])}")
+        await open_guild_menu(ctx, self.guild_counts, sort_by, elevated)
 
     # Inspired by kennnyshiwa's imperialtoolkit botstat command
     # https://github.com/kennnyshiwa/kennnyshiwa-cogs
@@ -300,7 +124,9 @@ class BotInfo(MixinMeta):
             green = 255 - round(255 * latency_ratio) if latency_ratio > 0.5 else 255
             red = 255 if latency_ratio > 0.5 else round(255 * latency_ratio)
             color = discord.Color.from_rgb(red, green, 0)
-            embed = await asyncio.to_thread(self.get_bot_info_embed, color)
+            # The sampler appends to its ring buffer on the loop, read it here rather than in the worker thread
+            trends = self.get_trends()
+            embed = await asyncio.to_thread(self.get_bot_info_embed, color, trends)
             latency_txt = f"Websocket: {humanize_number(round(latency, 2))} ms"
             embed.add_field(
                 name="\N{HIGH VOLTAGE SIGN} Latency",
@@ -320,21 +146,22 @@ class BotInfo(MixinMeta):
             )
             await message.edit(embed=embed)
 
-    def get_bot_info_embed(self, color: discord.Color) -> discord.Embed:
+    def get_bot_info_embed(self, color: discord.Color, trends: t.List[str]) -> discord.Embed:
         process = psutil.Process(os.getpid())
-        bot_cpu_used = process.cpu_percent(interval=3)
+        # CPU usage comes from the background sampler, measuring it here would block for the interval
+        latest = self.sampler.latest
+        bot_cpu_used = round(latest.bot_cpu, 1) if latest else 0.0
 
         # -/-/-/CPU-/-/-/
         cpu_count = psutil.cpu_count()  # Int
-        cpu_perc: t.List[float] = psutil.cpu_percent(interval=1, percpu=True)
+        cpu_perc: t.List[float] = self.sampler.per_core or [0.0] * (cpu_count or 1)
         cpu_avg = round(sum(cpu_perc) / len(cpu_perc), 1)
         cpu_freq: list = psutil.cpu_freq(percpu=True)  # t.List of Objects
         if not cpu_freq:
             freq = psutil.cpu_freq(percpu=False)
             if freq:
                 cpu_freq = [freq]
-        cpu_info: dict = cpuinfo.get_cpu_info()  # Dict
-        cpu_type = cpu_info.get("brand_raw", "Unknown")
+        cpu_type = self.sampler.cpu_info.get("brand_raw", "Unknown")
 
         # -/-/-/MEM-/-/-/
         ram = psutil.virtual_memory()  # Obj
@@ -487,8 +314,46 @@ class BotInfo(MixinMeta):
             inline=False,
         )
 
+        # Split per metric so a field never cuts one in half
+        fields = [""]
+        for block in trends:
+            if len(fields[-1]) + len(block) > 1000:
+                fields.append("")
+            fields[-1] += block
+        for trends in filter(None, fields):
+            embed.add_field(
+                name="\N{CHART WITH UPWARDS TREND} Trends (min/avg/max)",
+                value=box(trends, lang="python"),
+                inline=False,
+            )
+
         return embed
 
+    def get_trends(self) -> t.List[str]:
+        metrics = [
+            ("CPU", "cpu", lambda x: f"{x:.0f}%"),
+            ("Bot CPU", "bot_cpu", lambda x: f"{x:.0f}%"),
+            ("RAM", "ram", lambda x: f"{x:.0f}%"),
+            ("Loop Lag", "lag", lambda x: f"{x:.0f}ms"),
+            ("Disk Read", "disk_read", lambda x: f"{get_size(x)}/s"),
+            ("Disk Write", "disk_write", lambda x: f"{get_size(x)}/s"),
+            ("Net Sent", "net_sent", lambda x: f"{get_size(x)}/s"),
+            ("Net Recv", "net_recv", lambda x: f"{get_size(x)}/s"),
+        ]
+        blocks = []
+        for label, field, fmt in metrics:
+            windows = []
+            for window, seconds in WINDOWS:
+                stats = self.sampler.stats(field, seconds)
+                if stats is None:
+                    continue
+                windows.append(f"{window} " + "/".join(fmt(i) for i in stats))
+            if not windows:
+                continue
+            lines = [f"{label:<10} {self.sampler.sparkline(field)}"] + [f"  {i}" for i in windows]
+            blocks.append("\n".join(lines) + "\n")
+        return blocks
+
     @commands.command()
     @commands.is_owner()
     async def botip(self, ctx: commands.Context):
@@ -655,17 +520,8 @@ class BotInfo(MixinMeta):
             cog_mgr = self.bot._cog_mgr
             install_path: Path = await cog_mgr.install_path()
             configs = install_path.parent.parent
-            sizes = {}
-            for cog_dir in configs.iterdir():
-                sizes[cog_dir.name] = await asyncio.to_thread(calculate_directory_size, cog_dir)
-
-            sorted_sizes = sorted(sizes.items(), key=lambda x: x[1], reverse=True)
-            tmp = StringIO()
-            for cog, size in sorted_sizes:
-                loaded = " (Loaded)" if self.bot.get_cog(cog) else ""
-                tmp.write(f"{cog}: {get_size(size)}{loaded}\n")
-            pages = [box(p, lang="py") for p in pagify(tmp.getvalue(), page_length=800)]
-            pages = [f"Saved Cog Data\n{i}\nPage {idx + 1}/{len(pages)}" for idx, i in enumerate(pages)]
+            cog_dirs = [i for i in configs.iterdir() if i.is_dir()]
+            pages = await self.get_size_pages("Saved Cog Data", cog_dirs)
             await DynamicMenu(ctx, pages).refresh()
 
     @commands.command(name="codesizes")
@@ -678,18 +534,28 @@ class BotInfo(MixinMeta):
             cog_paths: list[Path] = await cog_mgr.user_defined_paths()
             paths = [install_path] + cog_paths
 
-            sizes = {}
+            cog_dirs = []
             for path in paths:
                 for cog_dir in path.iterdir():
-                    if cog_dir.name.startswith((".", "_")):
+                    if cog_dir.name.startswith((".", "_")) or not cog_dir.is_dir():
                         continue
-                    sizes[cog_dir.name] = await asyncio.to_thread(calculate_directory_size, cog_dir)
-
-            sorted_sizes = sorted(sizes.items(), key=lambda x: x[1], reverse=True)
-            tmp = StringIO()
-            for cog, size in sorted_sizes:
-                loaded = " (Loaded)" if self.bot.get_cog(cog) else ""
-                tmp.write(f"{cog}: {get_size(size)}{loaded}\n")
-            pages = [box(p, lang="py") for p in pagify(tmp.getvalue(), page_length=800)]
-            pages = [f"Codebase Sizes\n{i}\nPage {idx + 1}/{len(pages)}" for idx, i in enumerate(pages)]
+                    cog_dirs.append(cog_dir)
+            pages = await self.get_size_pages("Codebase Sizes", cog_dirs)
             await DynamicMenu(ctx, pages).refresh()
+
+    async def get_size_pages(self, title: str, cog_dirs: t.List[Path]) -> t.List[str]:
+        stats = await asyncio.to_thread(self.dir_scanner.scan_many, cog_dirs)
+        names = {str(i): i.name for i in cog_dirs}
+        sorted_sizes = sorted(stats.items(), key=lambda x: x[1].size, reverse=True)
+        tmp = StringIO()
+        for path, stat in sorted_sizes:
+            cog = names[path]
+            loaded = " (Loaded)" if self.bot.get_cog(cog) else ""
+            tmp.write(f"{cog}: {get_size(stat.size)} ({humanize_number(stat.files)} files){loaded}\n")
+        largest = heapq.nlargest(TOP_FILES, (i for stat in stats.values() for i in stat.largest))
+        if largest:
+            tmp.write("\nLargest Files\n")
+            for size, path in largest:
+                tmp.write(f"{get_size(size)}: {path}\n")
+        pages = [box(p, lang="py") for p in pagify(tmp.getvalue(), page_length=800)]
+        return [f"{title}\n{i}\nPage {idx + 1}/{len(pages)}" for idx, i in enumerate(pages)]
@@ -1,131 +1,60 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import typing as t
 
 import discord
 from redbot.core import commands
 from redbot.core.utils.chat_formatting import box, humanize_number
 
 from ..abc import MixinMeta
-from ..common.diskspeed import get_disk_speed
+from ..common.diskspeed import BenchResult, MiB, StorageBenchmark
 
 
 class DiskBench(MixinMeta):
     @commands.command(aliases=["diskbench"])
     @commands.is_owner()
-    async def diskspeed(self, ctx: commands.Context):
+    async def diskspeed(self, ctx: commands.Context, size_mb: int = 256):
         """
         Get disk R/W performance for the server your bot is on
 
-        The results of this test may vary, Python isn't fast enough for this kind of byte-by-byte writing,
-        and the file buffering and similar adds too much overhead.
-        Still this can give a good idea of where the bot is at I/O wise.
-        """
+        Runs sequential 1M and random 4K read/write tests (at queue depth 1 and 8), fsync latency and mmap reads
+        against a scratch file in this cog's data folder, bypassing the page cache where the filesystem allows it.
 
-        def diskembed(data: dict) -> discord.Embed:
-            if data["write5"] != "Waiting..." and data["write5"] != "Running...":
-                embed = discord.Embed(title="Disk I/O", color=discord.Color.green())
-                embed.description = "Disk Speed Check COMPLETE"
-            else:
-                embed = discord.Embed(title="Disk I/O", color=ctx.author.color)
-                embed.description = "Running Disk Speed Check"
-            first = f"Write: {data['write1']}\n" f"Read:  {data['read1']}"
-            embed.add_field(
-                name="128 blocks of 1048576 bytes (128MB)",
-                value=box(first, lang="python"),
-                inline=False,
-            )
-            second = f"Write: {data['write2']}\n" f"Read:  {data['read2']}"
-            embed.add_field(
-                name="128 blocks of 2097152 bytes (256MB)",
-                value=box(second, lang="python"),
-                inline=False,
-            )
-            third = f"Write: {data['write3']}\n" f"Read:  {data['read3']}"
-            embed.add_field(
-                name="256 blocks of 1048576 bytes (256MB)",
-                value=box(third, lang="python"),
-                inline=False,
-            )
-            fourth = f"Write: {data['write4']}\n" f"Read:  {data['read4']}"
-            embed.add_field(
-                name="256 blocks of 2097152 bytes (512MB)",
-                value=box(fourth, lang="python"),
-                inline=False,
-            )
-            fifth = f"Write: {data['write5']}\n" f"Read:  {data['read5']}"
-            embed.add_field(
-                name="256 blocks of 4194304 bytes (1GB)",
-                value=box(fifth, lang="python"),
-                inline=False,
+        **Arguments**
+        - `size_mb`: size of the scratch file in MB (default 256)
+        """
+        size_mb = min(max(size_mb, 16), 4096)
+        bench = StorageBenchmark(self.path, size=size_mb * MiB)
+        # Probing O_DIRECT writes a file, keep it off the event loop
+        await asyncio.to_thread(bench.probe)
+        tests = bench.tests()
+        results: t.Dict[str, BenchResult] = {}
+
+        def diskembed(running: t.Optional[str]) -> discord.Embed:
+            done = running is None
+            embed = discord.Embed(
+                title="Disk I/O",
+                description=f"Disk Speed Check {'COMPLETE' if done else 'RUNNING'}",
+                color=discord.Color.green() if done else ctx.author.color,
             )
+            rows = [f"{'Test':<18}{'MB/s':>9}{'IOPS':>9}{'p50ms':>8}{'p99ms':>8}"]
+            for label, _ in tests:
+                res = results.get(label)
+                if res is None:
+                    status = "Running..." if label == running else "Waiting..."
+                    rows.append(f"{label:<18}{status:>9}")
+                    continue
+                p50 = f"{res.percentile(50):.2f}" if res.latencies else "-"
+                p99 = f"{res.percentile(99):.2f}" if res.latencies else "-"
+                rows.append(f"{label:<18}{res.mbps:>9.1f}{humanize_number(round(res.iops)):>9}{p50:>8}{p99:>8}")
+            embed.add_field(name="Results", value=box("\n".join(rows), lang="py"), inline=False)
+            embed.set_footer(text=f"{size_mb}MB scratch file | cache bypass: {bench.mode}")
             return embed
 
-        results = {
-            "write1": "Running...",
-            "read1": "Running...",
-            "write2": "Waiting...",
-            "read2": "Waiting...",
-            "write3": "Waiting...",
-            "read3": "Waiting...",
-            "write4": "Waiting...",
-            "read4": "Waiting...",
-            "write5": "Waiting...",
-            "read5": "Waiting...",
-        }
-        msg = None
-        for i in range(6):
-            stage = i + 1
-            em = diskembed(results)
-            if not msg:
-                msg = await ctx.send(embed=em)
-            else:
-                await msg.edit(embed=em)
-            count = 128
-            size = 1048576
-            if stage == 2:
-                count = 128
-                size = 2097152
-            elif stage == 3:
-                count = 256
-                size = 1048576
-            elif stage == 4:
-                count = 256
-                size = 2097152
-            elif stage == 6:
-                count = 256
-                size = 4194304
-            res = await self.run_disk_speed(block_count=count, block_size=size, passes=3)
-            write = f"{humanize_number(round(res['write'], 2))}MB/s"
-            read = f"{humanize_number(round(res['read'], 2))}MB/s"
-            results[f"write{stage}"] = write
-            results[f"read{stage}"] = read
-            if f"write{stage + 1}" in results:
-                results[f"write{stage + 1}"] = "Running..."
-                results[f"read{stage + 1}"] = "Running..."
-            await asyncio.sleep(1)
-
-    async def run_disk_speed(
-        self,
-        block_count: int = 128,
-        block_size: int = 1048576,
-        passes: int = 1,
-    ) -> dict:
-        reads = []
-        writes = []
-        with ThreadPoolExecutor(max_workers=1) as pool:
-            futures = [
-                self.bot.loop.run_in_executor(
-                    pool,
-                    lambda: get_disk_speed(self.path, block_count, block_size),
-                )
-                for _ in range(passes)
-            ]
-            results = await asyncio.gather(*futures)
-            for i in results:
-                reads.append(i["read"])
-                writes.append(i["write"])
-        results = {
-            "read": sum(reads) / len(reads),
-            "write": sum(writes) / len(writes),
-        }
-        return results
+        msg = await ctx.send(embed=diskembed(tests[0][0]))
+        try:
+            for idx, (label, func) in enumerate(tests):
+                results[label] = await asyncio.to_thread(func)
+                running = tests[idx + 1][0] if idx + 1 < len(tests) else None
+                await msg.edit(embed=diskembed(running))
+        finally:
+            await asyncio.to_thread(bench.cleanup)
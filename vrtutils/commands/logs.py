@@ -1,46 +1,85 @@
 import asyncio
-import re
-import typing as t
-from pathlib import Path
+from contextlib import suppress
+from time import monotonic
 
+import discord
 from redbot.core import commands
-from redbot.core.utils.chat_formatting import box, pagify
+from redbot.core.utils.chat_formatting import box
 
 from ..abc import MixinMeta
 from ..common.dynamic_menu import DynamicMenu
+from ..common.logreader import (
+    PAGE_LENGTH,
+    LogFilter,
+    LogPageSource,
+    LogTail,
+    ReverseLogReader,
+    get_log_files,
+)
 
-LATEST_LOG_RE = re.compile(r"latest(?:-part(?P<part>\d+))?\.log")
+# How often and for how long follow mode checks for new lines
+FOLLOW_INTERVAL = 5
+FOLLOW_DURATION = 900
 
 
 class Logs(MixinMeta):
     @commands.command(name="logs")
     @commands.is_owner()
-    async def scroll_logs(self, ctx: commands.Context, max_pages: int = 50):
-        """View the bot's logs."""
-
-        def _get_logs() -> t.List[str]:
-            logs: t.List[Path] = []
-            for file in (self.core / "logs").iterdir():
-                if LATEST_LOG_RE.match(file.name):
-                    logs.append(file)
-            logs.sort()
-            # Combine contents of all log files
-            combined = "\n".join(log.read_text(encoding="utf-8", errors="ignore") for log in logs)
-            combined = combined.strip() + "\n# END OF LOGS"
-            combined = combined.split("\n")
-            combined.reverse()
-            combined = "\n".join(combined)
-            split = [i for i in pagify(combined, page_length=1800)]
-            split = split[:max_pages]
-            pages = []
-            for idx, chunk in enumerate(split):
-                chunk = chunk.split("\n")
-                chunk.reverse()
-                chunk = "\n".join(chunk)
-                foot = f"Page {idx + 1}/{len(split)}"
-                txt = f"{box(chunk, lang='python')}\n{foot}"
-                pages.append(txt)
-            return pages
-
-        pages = await asyncio.to_thread(_get_logs)
-        await DynamicMenu(ctx, pages, timeout=7200).refresh()
+    async def scroll_logs(self, ctx: commands.Context, max_pages: int = 50, *, filters: str = ""):
+        """
+        View the bot's logs.
+
+        Pages are read from the end of the log files as you scroll back.
+
+        **Filters**
+        - `level:<name>`: only show records at or above this level, e.g. `level:warning`
+        - `logger:<name>`: only show records from loggers starting with this, e.g. `logger:red.vrt`
+        - `follow`: keep the message updated with new lines as they are logged
+        - Anything else is used as a case-insensitive regex, matched against the whole record including tracebacks
+
+        **Examples**
+        - `[p]logs 50 level:error`
+        - `[p]logs 10 logger:red.vrt.levelup follow`
+        - `[p]logs 50 timed out|ratelimited`
+        """
+        try:
+            flt = LogFilter.parse(filters)
+        except ValueError as e:
+            return await ctx.send(str(e))
+
+        if flt.follow:
+            return await self.follow_logs(ctx, flt)
+
+        files = await asyncio.to_thread(get_log_files, self.core / "logs")
+        source = LogPageSource(ReverseLogReader(files, flt), max_pages=max_pages)
+        await DynamicMenu(ctx, source, timeout=7200).refresh()
+
+    async def follow_logs(self, ctx: commands.Context, flt: LogFilter):
+        tail = await asyncio.to_thread(LogTail, self.core / "logs", flt)
+        lines = []
+        content = box("Waiting for new log lines...", lang="python")
+        msg = await ctx.send(content)
+        end = monotonic() + FOLLOW_DURATION
+        while monotonic() < end:
+            await asyncio.sleep(FOLLOW_INTERVAL)
+            new = await asyncio.to_thread(tail.poll)
+            if not new:
+                continue
+            lines.extend(new)
+            # Keep only what fits in the message
+            size = 0
+            for idx in range(len(lines) - 1, -1, -1):
+                size += len(lines[idx]) + 1
+                if size > PAGE_LENGTH:
+                    lines = lines[idx + 1 :]
+                    break
+            content = box("\n".join(lines)[-PAGE_LENGTH:], lang="python")
+            try:
+                await msg.edit(content=content)
+            except discord.NotFound:
+                # Deleting the message stops following
+                return
+            except discord.HTTPException:
+                continue
+        with suppress(discord.HTTPException):
+            await msg.edit(content=f"{content}\nStopped following")
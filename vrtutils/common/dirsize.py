@@ -0,0 +1,100 @@
+import heapq
+import os
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+# Largest files kept per directory and in the merged results
+TOP_FILES = 10
+# Cached directories are rescanned after this long even if their mtime didn't change,
+# since files rewritten in place don't touch the directory's mtime
+MAX_AGE = 600
+
+
+class DirStats(t.NamedTuple):
+    size: int
+    files: int
+    # [(size, path)] largest first
+    largest: t.List[t.Tuple[int, str]]
+
+
+class _Level(t.NamedTuple):
+    """Files directly inside one directory, plus its subdirectories to recurse into"""
+
+    mtime: int
+    scanned: float
+    size: int
+    files: int
+    largest: t.List[t.Tuple[int, str]]
+    subdirs: t.List[str]
+
+
+class DirSizeScanner:
+    """
+    Recursive directory sizes using os.scandir
+
+    Each directory level is cached by its mtime, so a rescan only lists directories that gained, lost or renamed
+    entries and just stats the rest. Top level paths are scanned in parallel.
+    """
+
+    def __init__(self, workers: int = 8):
+        self.workers = workers
+        # {dir_path: _Level}
+        self.cache: t.Dict[str, _Level] = {}
+
+    def scan(self, path: t.Union[str, os.PathLike]) -> DirStats:
+        size = files = 0
+        largest: t.List[t.Tuple[int, str]] = []
+        stack = [os.fspath(path)]
+        while stack:
+            level = self._level(stack.pop())
+            if level is None:
+                continue
+            size += level.size
+            files += level.files
+            largest = heapq.nlargest(TOP_FILES, largest + level.largest)
+            stack.extend(level.subdirs)
+        return DirStats(size, files, largest)
+
+    def scan_many(self, paths: t.Iterable[t.Union[str, os.PathLike]]) -> t.Dict[str, DirStats]:
+        paths = [os.fspath(i) for i in paths]
+        # scandir and stat release the GIL so threads overlap the filesystem calls
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(paths, pool.map(self.scan, paths)))
+
+    def _level(self, path: str) -> t.Optional[_Level]:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.cache.pop(path, None)
+            return None
+        cached = self.cache.get(path)
+        if cached and cached.mtime == mtime and monotonic() - cached.scanned < MAX_AGE:
+            return cached
+
+        size = files = 0
+        largest: t.List[t.Tuple[int, str]] = []
+        subdirs: t.List[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            file_size = entry.stat(follow_symlinks=False).st_size
+                            size += file_size
+                            files += 1
+                            if len(largest) < TOP_FILES:
+                                heapq.heappush(largest, (file_size, entry.path))
+                            elif file_size > largest[0][0]:
+                                heapq.heapreplace(largest, (file_size, entry.path))
+                    except OSError:
+                        # Deleted mid-scan or no permission
+                        continue
+        except OSError:
+            return None
+
+        level = _Level(mtime, monotonic(), size, files, sorted(largest, reverse=True), subdirs)
+        self.cache[path] = level
+        return level
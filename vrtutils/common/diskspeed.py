@@ -1,70 +1,264 @@
 """
-Tests write/read speed by writing/reading random blocks.
-Default Writes 128 Blocks of 1048576 bytes each i.e. 128MB
-Arguments:
-    path = Path of Drive to Test Speed
-    blocks_count = Total quantity of blocks
-    block_size = Side of each block (in bytes)
-
-Found source code online and modified to use with VrtUtils
-Original author is thodnev
-https://github.com/thodnev/MonkeyTest
+Storage benchmark engine for [p]diskspeed
+
+Each test bypasses the page cache where the platform allows it, either by opening the test file with O_DIRECT
+(page aligned buffers, block aligned offsets) or, when the filesystem refuses O_DIRECT (tmpfs, some overlay mounts),
+by dropping the file's cached pages with posix_fadvise(DONTNEED) before reading it back.
+
+Tests:
+    seq_write: sequential 1MiB writes, timed through the final fsync
+    seq_read: sequential 1MiB reads of a cold file
+    rand_read: random 4KiB reads at queue depth 1 and at a higher depth using one thread per in-flight request
+    rand_write: random 4KiB writes at queue depth 1 and at a higher depth, timed through the final fsync
+    fsync: 4KiB append + fsync round trips, reported as latency percentiles
+    mmap_read: sequential reads of a cold file through a read-only memory map
+
+Originally based on MonkeyTest by thodnev (https://github.com/thodnev/MonkeyTest)
 """
+
+import mmap
 import os
-from random import shuffle
-from time import perf_counter as time
-
-
-def get_write_speed(path, blocks_count=128, block_size=1048576):
-    f = os.open(path, os.O_CREAT | os.O_WRONLY, 0o777)  # Low Level I/O
-    w_times = []
-    for _ in range(blocks_count):
-        buff = os.urandom(block_size)
-        start = time()
-        os.write(f, buff)
-        os.fsync(f)
-        w_times.append(time() - start)
-    os.close(f)
-    one_mb = 1048576
-    ratio = (block_size / one_mb) if block_size >= one_mb else (one_mb / block_size)
-    write_speed = blocks_count / (sum(w_times) * ratio)
-    return write_speed  # MB/s
-
-
-def get_read_speed(path, blocks_count=128, block_size=1048576):
-    f = os.open(path, os.O_RDONLY, 0o777)
-    # Generate Random Read Positions
-    offsets = list(range(0, blocks_count * block_size, block_size))
-    shuffle(offsets)
-
-    r_times = []
-    for offset in offsets:
-        start = time()
-        os.lseek(f, offset, os.SEEK_SET)  # Set Position
-        buff = os.read(f, block_size)  # Read From Position
-        t = time() - start
-        if not buff:
-            break  # If EOF Reached
-        r_times.append(t)
-    os.close(f)
-    one_mb = 1048576
-    ratio = (block_size / one_mb) if block_size >= one_mb else (one_mb / block_size)
-    read_speed = blocks_count / (sum(r_times) * ratio)
-    return read_speed  # MB/s
-
-
-def get_disk_speed(path, blocks_count, block_size):
-    path = os.path.join(path, "IOTest")
-    write = get_write_speed(path, blocks_count, block_size)
-    read = get_read_speed(path, blocks_count, block_size)
-    data = {"write": write, "read": read}
-    os.remove(path)
-    return data
-
-
-if __name__ == "__main__":
-    maindir = os.getcwd()
-    pathname = os.path.join(maindir, "IOTest")
-    print(get_write_speed(pathname))
-    print(get_read_speed(pathname))
-    os.remove(pathname)
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from random import Random
+from time import perf_counter
+
+KiB = 1024
+MiB = 1024 * KiB
+SEQ_BLOCK = MiB
+RAND_BLOCK = 4 * KiB
+O_DIRECT = getattr(os, "O_DIRECT", 0)
+O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+@dataclass
+class BenchResult:
+    name: str
+    mbps: float = 0.0
+    iops: float = 0.0
+    # Per-op latencies in milliseconds, empty for tests that don't time individual calls
+    latencies: t.List[float] = field(default_factory=list, repr=False)
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def drop_cache(fd: int) -> None:
+    """
+    Evict a file's pages so the next read has to go to the device
+
+    Only clean pages can be dropped, the write tests fsync before closing so the file is clean by the time a read
+    test opens it. No fsync here since Windows refuses it (EBADF) on read-only descriptors.
+    """
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def pread(fd: int, buf: mmap.mmap, offset: int) -> int:
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [buf], offset)
+    # Windows has no positional vectored IO
+    os.lseek(fd, offset, os.SEEK_SET)
+    return len(os.read(fd, len(buf)))
+
+
+def pwrite(fd: int, buf: mmap.mmap, offset: int) -> int:
+    if hasattr(os, "pwritev"):
+        return os.pwritev(fd, [buf], offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, buf)
+
+
+class StorageBenchmark:
+    """
+    Run storage tests against a scratch file in `path`
+
+    All methods block and are meant to be run in a worker thread, one test at a time so the caller can report progress.
+    Call `probe` first to settle whether O_DIRECT can be used, `mode` reports the requested mode until then.
+
+    Args:
+        path: directory to benchmark, the scratch file is created here and removed by `cleanup`
+        size: size of the scratch file in bytes
+        duration: how long each random/fsync test runs for in seconds
+        depth: number of concurrent requests for the queue depth variants
+        direct: try O_DIRECT before falling back to fadvise cache drops
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        size: int = 256 * MiB,
+        duration: float = 3.0,
+        depth: int = 8,
+        direct: bool = True,
+    ):
+        self.file = Path(path) / "IOTest"
+        self.size = size - size % SEQ_BLOCK
+        self.duration = duration
+        self.depth = depth
+        self.direct = bool(direct and O_DIRECT)
+        self.probed = False
+        self.rng = Random()
+
+    @property
+    def mode(self) -> str:
+        return "O_DIRECT" if self.direct else ("fadvise" if hasattr(os, "posix_fadvise") else "buffered")
+
+    def probe(self) -> None:
+        """Fall back to fadvise cache drops if the filesystem refuses O_DIRECT"""
+        if self.probed:
+            return
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.direct = self.direct and self._supports_direct()
+        self.probed = True
+
+    def _supports_direct(self) -> bool:
+        try:
+            fd = os.open(self.file, os.O_CREAT | os.O_WRONLY | O_DIRECT, 0o644)
+        except OSError:
+            return False
+        os.close(fd)
+        return True
+
+    def _open(self, flags: int) -> int:
+        if self.direct:
+            flags |= O_DIRECT
+        return os.open(self.file, flags | O_BINARY, 0o644)
+
+    @staticmethod
+    def _buffer(size: int, fill: bool = False) -> mmap.mmap:
+        # Anonymous maps are page aligned which is what O_DIRECT needs
+        buf = mmap.mmap(-1, size)
+        if fill:
+            buf.write(os.urandom(size))
+        return buf
+
+    def tests(self) -> t.List[t.Tuple[str, t.Callable[[], BenchResult]]]:
+        """Ordered (label, callable) pairs, seq_write has to run first since it lays out the scratch file"""
+        return [
+            ("Seq Write 1M", self.seq_write),
+            ("Seq Read 1M", self.seq_read),
+            ("Rand Read 4K Q1", lambda: self.rand_read(1)),
+            (f"Rand Read 4K Q{self.depth}", lambda: self.rand_read(self.depth)),
+            ("Rand Write 4K Q1", lambda: self.rand_write(1)),
+            (f"Rand Write 4K Q{self.depth}", lambda: self.rand_write(self.depth)),
+            ("Fsync 4K", self.fsync_latency),
+            ("Mmap Read", self.mmap_read),
+        ]
+
+    def seq_write(self) -> BenchResult:
+        self.probe()
+        buf = self._buffer(SEQ_BLOCK, fill=True)
+        fd = self._open(os.O_CREAT | os.O_WRONLY | os.O_TRUNC)
+        try:
+            start = perf_counter()
+            for offset in range(0, self.size, SEQ_BLOCK):
+                pwrite(fd, buf, offset)
+            os.fsync(fd)
+            elapsed = perf_counter() - start
+        finally:
+            os.close(fd)
+            buf.close()
+        return BenchResult("seq_write", mbps=self.size / MiB / elapsed, iops=self.size / SEQ_BLOCK / elapsed)
+
+    def seq_read(self) -> BenchResult:
+        buf = self._buffer(SEQ_BLOCK)
+        fd = self._open(os.O_RDONLY)
+        try:
+            drop_cache(fd)
+            start = perf_counter()
+            for offset in range(0, self.size, SEQ_BLOCK):
+                pread(fd, buf, offset)
+            elapsed = perf_counter() - start
+        finally:
+            os.close(fd)
+            buf.close()
+        return BenchResult("seq_read", mbps=self.size / MiB / elapsed, iops=self.size / SEQ_BLOCK / elapsed)
+
+    def _random_io(self, write: bool, depth: int) -> BenchResult:
+        blocks = self.size // RAND_BLOCK
+        flags = os.O_WRONLY if write else os.O_RDONLY
+
+        def worker(seed: int) -> t.Tuple[int, t.List[float]]:
+            rng = Random(seed)
+            buf = self._buffer(RAND_BLOCK, fill=write)
+            io = pwrite if write else pread
+            fd = self._open(flags)
+            latencies = []
+            try:
+                deadline = perf_counter() + self.duration
+                while (now := perf_counter()) < deadline:
+                    io(fd, buf, rng.randrange(blocks) * RAND_BLOCK)
+                    latencies.append((perf_counter() - now) * 1000)
+                if write:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+                buf.close()
+            return len(latencies), latencies
+
+        fd = os.open(self.file, os.O_RDONLY | O_BINARY)
+        drop_cache(fd)
+        os.close(fd)
+
+        start = perf_counter()
+        if depth == 1:
+            results = [worker(self.rng.getrandbits(32))]
+        else:
+            # pread/pwrite release the GIL so each thread keeps one request in flight
+            with ThreadPoolExecutor(max_workers=depth) as pool:
+                results = list(pool.map(worker, [self.rng.getrandbits(32) for _ in range(depth)]))
+        elapsed = perf_counter() - start
+
+        ops = sum(i[0] for i in results)
+        latencies = [lat for i in results for lat in i[1]]
+        name = f"rand_{'write' if write else 'read'}_q{depth}"
+        return BenchResult(name, mbps=ops * RAND_BLOCK / MiB / elapsed, iops=ops / elapsed, latencies=latencies)
+
+    def rand_read(self, depth: int = 1) -> BenchResult:
+        return self._random_io(False, depth)
+
+    def rand_write(self, depth: int = 1) -> BenchResult:
+        return self._random_io(True, depth)
+
+    def fsync_latency(self) -> BenchResult:
+        """Small appends each followed by fsync, the pattern a JSON Config save boils down to"""
+        target = self.file.with_name("IOTestSync")
+        buf = os.urandom(RAND_BLOCK)
+        fd = os.open(target, os.O_CREAT | os.O_WRONLY | os.O_TRUNC | O_BINARY, 0o644)
+        latencies = []
+        try:
+            deadline = perf_counter() + self.duration
+            while (now := perf_counter()) < deadline:
+                os.write(fd, buf)
+                os.fsync(fd)
+                latencies.append((perf_counter() - now) * 1000)
+        finally:
+            os.close(fd)
+            target.unlink(missing_ok=True)
+        elapsed = sum(latencies) / 1000
+        ops = len(latencies)
+        return BenchResult("fsync", mbps=ops * RAND_BLOCK / MiB / elapsed, iops=ops / elapsed, latencies=latencies)
+
+    def mmap_read(self) -> BenchResult:
+        fd = os.open(self.file, os.O_RDONLY | O_BINARY)
+        try:
+            drop_cache(fd)
+            with mmap.mmap(fd, self.size, access=mmap.ACCESS_READ) as mm:
+                start = perf_counter()
+                for offset in range(0, self.size, SEQ_BLOCK):
+                    # Slicing copies out of the map, faulting every page in
+                    _ = mm[offset : offset + SEQ_BLOCK]
+                elapsed = perf_counter() - start
+        finally:
+            os.close(fd)
+        return BenchResult("mmap_read", mbps=self.size / MiB / elapsed, iops=self.size / SEQ_BLOCK / elapsed)
+
+    def cleanup(self) -> None:
+        self.file.unlink(missing_ok=True)
+        self.file.with_name("IOTestSync").unlink(missing_ok=True)
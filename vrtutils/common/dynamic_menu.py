@@ -24,18 +24,44 @@ class SearchModal(discord.ui.Modal):
         self.stop()
 
 
+class PageSource:
+    """
+    Pages that are only built when the menu is about to show them
+
+    `__len__` is the number of pages known so far, sources that stream their data can grow it as they are consumed
+    by reporting one more page than they have built until they run out.
+    """
+
+    # Growing sources can be asked for a page past `__len__`, they build up to it and clamp the index themselves
+    grows: bool = False
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    async def get_page(self, index: int) -> t.Union[discord.Embed, str]:
+        raise NotImplementedError
+
+    async def search(self, query: str) -> t.Optional[int]:
+        """Index of the first page matching the query, or None"""
+        return None
+
+
 class DynamicMenu(discord.ui.View):
     def __init__(
         self,
         ctx: commands.Context,
-        pages: t.Union[t.List[discord.Embed], t.List[str]],
+        pages: t.Union[t.List[discord.Embed], t.List[str], PageSource],
         message: t.Optional[t.Union[discord.Message, discord.InteractionMessage, None]] = None,
         page: int = 0,
         timeout: t.Union[int, float, None] = 300,
         image_bytes: t.Optional[bytes] = None,
     ):
         super().__init__(timeout=timeout)
-        self.check_pages(pages)  # Modifies pages in place
+        self.source: t.Optional[PageSource] = None
+        if isinstance(pages, PageSource):
+            self.source = pages
+        else:
+            self.check_pages(pages)  # Modifies pages in place
 
         self.ctx = ctx
         self.author = ctx.author
@@ -46,6 +72,7 @@ class DynamicMenu(discord.ui.View):
         self.page = page
         self.image_bytes = image_bytes
         self.page_count = len(pages)
+        self.current: t.Union[discord.Embed, str, None] = None
 
     def check_pages(self, pages: t.List[t.Union[discord.Embed, str]]):
         # Ensure pages are either all embeds or all strings
@@ -79,7 +106,7 @@ class DynamicMenu(discord.ui.View):
         try:
             await self._refresh(interaction)
         except Exception as e:
-            current_page = self.pages[self.page]
+            current_page = self.current
             if isinstance(current_page, discord.Embed):
                 content = current_page.description or current_page.title
                 if not content:
@@ -90,17 +117,30 @@ class DynamicMenu(discord.ui.View):
                 content = current_page
             log.error(f"Error refreshing menu, current page: {content}", exc_info=e)
 
+    def extra_buttons(self) -> t.List[discord.ui.Item]:
+        """Override to show more buttons under the navigation ones"""
+        return []
+
+    async def get_current(self) -> t.Union[discord.Embed, str]:
+        if self.source is None:
+            return self.pages[self.page]
+        page = await self.source.get_page(self.page)
+        self.page_count = len(self.source)
+        self.page = min(self.page, self.page_count - 1)
+        return page
+
     async def _refresh(self, interaction: discord.Interaction = None):
+        self.current = await self.get_current()
         self.clear_items()
         single = [self.close]
         small = [self.left] + single + [self.right]
         large = small + [self.left10, self.search, self.right10]
 
         buttons = large if self.page_count > 10 else small if self.page_count > 1 else single
-        for button in buttons:
+        for button in buttons + self.extra_buttons():
             self.add_item(button)
 
-        if len(buttons) == 1 and isinstance(self.pages[self.page], discord.Embed):
+        if len(buttons) == 1 and self.source is None and isinstance(self.current, discord.Embed):
             for embed in self.pages:
                 embed.set_footer(text=None)
 
@@ -111,11 +151,11 @@ class DynamicMenu(discord.ui.View):
             attachments.append(file)
 
         kwargs = {"view": self}
-        if isinstance(self.pages[self.page], discord.Embed):
-            kwargs["embed"] = self.pages[self.page]
+        if isinstance(self.current, discord.Embed):
+            kwargs["embed"] = self.current
             kwargs["content"] = None
         else:
-            kwargs["content"] = self.pages[self.page]
+            kwargs["content"] = self.current
 
         if (self.message or interaction) and attachments:
             kwargs["attachments"] = attachments
@@ -226,8 +266,20 @@ class DynamicMenu(discord.ui.View):
             return
 
         if modal.query.isnumeric():
-            self.page = int(modal.query) - 1
-            self.page %= self.page_count
+            self.page = max(int(modal.query) - 1, 0)
+            if self.source is None:
+                self.page %= self.page_count
+            elif not self.source.grows:
+                self.page = min(self.page, len(self.source) - 1)
+            return await self.refresh(interaction)
+
+        if self.source is not None:
+            index = await self.source.search(modal.query)
+            if index is None:
+                with suppress(discord.HTTPException):
+                    await interaction.followup.send("No page found matching that query.", ephemeral=True)
+                return
+            self.page = index
             return await self.refresh(interaction)
 
         if isinstance(self.pages[self.page], str):
@@ -0,0 +1,300 @@
+import typing as t
+from contextlib import suppress
+from time import monotonic
+
+import discord
+from redbot.core import commands
+from redbot.core.bot import Red
+
+from .dpymenu import confirm
+from .dynamic_menu import DynamicMenu, PageSource
+from .utils import get_bitsize, get_size
+
+ELEVATED_PERMS = (
+    "administrator",
+    "ban_members",
+    "kick_members",
+    "manage_channels",
+    "manage_guild",
+    "manage_emojis",
+    "manage_messages",
+    "manage_roles",
+    "manage_webhooks",
+    "manage_nicknames",
+    "mute_members",
+    "moderate_members",
+    "move_members",
+    "deafen_members",
+)
+ELEVATED_MASK = discord.Permissions(**{perm: True for perm in ELEVATED_PERMS}).value
+SORT_OPTIONS = ("default", "members", "joined", "created", "name")
+# Seconds member counts are reused before the member list is walked again
+COUNT_TTL = 300
+
+
+class GuildSummary(t.NamedTuple):
+    id: int
+    name: str
+    members: int
+    joined: float
+    created: float
+    elevated: bool
+
+
+class MemberCounts(t.NamedTuple):
+    humans: int
+    bots: int
+    online: int
+    idle: int
+    dnd: int
+    offline: int
+    streaming: int
+
+
+def summarize(guild: discord.Guild) -> GuildSummary:
+    """Cheap per-guild fields used for sorting and filtering, no member iteration"""
+    me = guild.me
+    joined = me.joined_at if me and me.joined_at else discord.utils.utcnow()
+    elevated = bool(me and me.guild_permissions.value & ELEVATED_MASK)
+    return GuildSummary(
+        guild.id,
+        guild.name,
+        guild.member_count or 0,
+        joined.timestamp(),
+        guild.created_at.timestamp(),
+        elevated,
+    )
+
+
+def build_index(guilds: t.Iterable[discord.Guild], sort_by: str, elevated: bool) -> t.List[GuildSummary]:
+    index = [summarize(guild) for guild in guilds]
+    if elevated:
+        index = [i for i in index if i.elevated]
+    if sort_by == "members":
+        index.sort(key=lambda x: x.members, reverse=True)
+    elif sort_by == "joined":
+        index.sort(key=lambda x: x.joined, reverse=True)
+    elif sort_by == "created":
+        index.sort(key=lambda x: x.created)
+    elif sort_by == "name":
+        index.sort(key=lambda x: x.name.casefold())
+    return index
+
+
+def count_members(guild: discord.Guild) -> MemberCounts:
+    humans = bots = online = idle = dnd = offline = streaming = 0
+    for member in guild.members:
+        if member.bot:
+            bots += 1
+        else:
+            humans += 1
+        status = member.status
+        if status is discord.Status.online:
+            online += 1
+        elif status is discord.Status.idle:
+            idle += 1
+        elif status is discord.Status.do_not_disturb:
+            dnd += 1
+        elif status is discord.Status.offline:
+            offline += 1
+        if member.activity is not None and member.activity.type is discord.ActivityType.streaming:
+            streaming += 1
+    return MemberCounts(humans, bots, online, idle, dnd, offline, streaming)
+
+
+class GuildPageSource(PageSource):
+    """One embed per guild in the index, built when the page is shown"""
+
+    def __init__(
+        self,
+        bot: Red,
+        index: t.List[GuildSummary],
+        color: discord.Color,
+        counts: t.Dict[int, t.Tuple[float, MemberCounts]],
+    ):
+        self.bot = bot
+        self.index = index
+        self.color = color
+        # Shared across invocations, {guild_id: (counted_at, counts)}
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get_counts(self, guild: discord.Guild) -> MemberCounts:
+        cached = self.counts.get(guild.id)
+        if cached and monotonic() - cached[0] < COUNT_TTL:
+            return cached[1]
+        counts = count_members(guild)
+        self.counts[guild.id] = (monotonic(), counts)
+        return counts
+
+    async def search(self, query: str) -> t.Optional[int]:
+        query = query.casefold()
+        for idx, summary in enumerate(self.index):
+            if query == str(summary.id) or query in summary.name.casefold():
+                return idx
+        return None
+
+    async def get_page(self, index: int) -> discord.Embed:
+        summary = self.index[index]
+        guild = self.bot.get_guild(summary.id)
+        if guild is None:
+            em = discord.Embed(
+                title=f"{summary.name} -- {summary.id}",
+                description="I am no longer in this guild",
+                color=self.color,
+            )
+            em.set_footer(text=f"Page {index + 1}/{len(self)}")
+            return em
+
+        created = f"<t:{int(summary.created)}:D>"
+        time_elapsed = f"<t:{int(summary.created)}:R>"
+        bot_joined = f"<t:{int(summary.joined)}:D>"
+        since_joined = f"<t:{int(summary.joined)}:R>"
+        counts = self.get_counts(guild)
+
+        desc = (
+            f"{guild.description}\n\n"
+            f"`GuildCreated: `{created} ({time_elapsed})\n"
+            f"`BotJoined:    `{bot_joined} ({since_joined})\n"
+            f"`Humans:    `{counts.humans}\n"
+            f"`Bots:      `{counts.bots}\n"
+            f"`Online:    `{counts.online}\n"
+            f"`Idle:      `{counts.idle}\n"
+            f"`DND:       `{counts.dnd}\n"
+            f"`Offline:   `{counts.offline}\n"
+            f"`Streaming: `{counts.streaming}\n"
+        )
+
+        em = discord.Embed(
+            title=f"{guild.name} -- {guild.id}",
+            description=desc,
+            color=self.color,
+        )
+
+        if guild.icon:
+            em.set_thumbnail(url=guild.icon.url)
+
+        owner = guild.owner if guild.owner else await self.bot.get_or_fetch_user(guild.owner_id)
+        field = (
+            f"`Owner:        `{owner}\n"
+            f"`OwnerID:      `{owner.id}\n"
+            f"`Verification: `{guild.verification_level}\n"
+            f"`Nitro Tier:   `{guild.premium_tier}\n"
+            f"`Boosters:     `{guild.premium_subscription_count}\n"
+            f"`File Limit:   `{get_size(guild.filesize_limit)}\n"
+            f"`Emoji Limit:  `{guild.emoji_limit}\n"
+            f"`Bitrate:      `{get_bitsize(guild.bitrate_limit)}"
+        )
+        em.add_field(name="Details", value=field)
+
+        text_channels = len(guild.text_channels)
+        nsfw_channels = len([c for c in guild.text_channels if c.is_nsfw()])
+        voice_channels = len(guild.voice_channels)
+        field = f"`Text:  `{text_channels}\n" f"`Voice: `{voice_channels}\n" f"`NSFW:  `{nsfw_channels}"
+        em.add_field(name="Channels", value=field)
+
+        elevated_roles = sum(1 for r in guild.roles if r.permissions.value & ELEVATED_MASK)
+        field = (
+            f"`Elevated: `{elevated_roles}\n"
+            f"`Normal:   `{len(guild.roles) - elevated_roles}\n"
+            f"`Total:    `{len(guild.roles)}"
+        )
+        em.add_field(name="Roles", value=field)
+
+        if guild.splash:
+            em.set_image(url=guild.splash.url)
+
+        em.set_footer(text=f"Page {index + 1}/{len(self)}")
+        return em
+
+
+class GuildMenu(DynamicMenu):
+    """DynamicMenu over a GuildPageSource with buttons to leave or get an invite for the shown guild"""
+
+    source: GuildPageSource
+
+    def extra_buttons(self) -> t.List[discord.ui.Item]:
+        return [self.leave, self.invite]
+
+    def current_guild(self) -> t.Tuple[GuildSummary, t.Optional[discord.Guild]]:
+        summary = self.source.index[self.page]
+        return summary, self.ctx.bot.get_guild(summary.id)
+
+    @discord.ui.button(
+        emoji="\N{WASTEBASKET}\N{VARIATION SELECTOR-16}",
+        style=discord.ButtonStyle.danger,
+        row=2,
+    )
+    async def leave(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+        summary, guild = self.current_guild()
+        msg = await self.ctx.send(f"Are you sure you want me to leave **{summary.name}**?")
+        yes = await confirm(self.ctx, msg)
+        with suppress(discord.HTTPException):
+            await msg.delete()
+        if yes is None:
+            return
+        if not yes:
+            txt = f"Not leaving **{summary.name}**"
+        elif not guild:
+            txt = "I could not find that guild"
+        else:
+            await guild.leave()
+            txt = f"I have left **{summary.name}**"
+        with suppress(discord.HTTPException):
+            await interaction.followup.send(txt, ephemeral=True)
+        await self.refresh()
+
+    @discord.ui.button(
+        emoji="\N{CHAINS}\N{VARIATION SELECTOR-16}",
+        style=discord.ButtonStyle.success,
+        row=2,
+    )
+    async def invite(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        _, guild = self.current_guild()
+        invite = await get_guild_invite(guild) if guild else None
+        if invite:
+            await interaction.followup.send(str(invite), ephemeral=True)
+        else:
+            await interaction.followup.send("I could not get an invite for that server!", ephemeral=True)
+
+
+async def get_guild_invite(guild: discord.Guild) -> t.Optional[discord.Invite]:
+    my_perms: discord.Permissions = guild.me.guild_permissions
+    if my_perms.manage_guild or my_perms.administrator:
+        if "VANITY_URL" in guild.features:
+            # guild has a vanity url so use it as the one to send
+            with suppress(discord.HTTPException):
+                return await guild.vanity_invite()
+        invites = await guild.invites()
+    else:
+        invites = []
+    for inv in invites:  # Loop through the invites for the guild
+        if not (inv.max_uses or inv.max_age or inv.temporary):
+            return inv
+    # No existing invite found that is valid
+    for channel in guild.text_channels:
+        if channel.permissions_for(guild.me).create_instant_invite:
+            with suppress(discord.HTTPException):
+                # Create invite that expires after max_age
+                return await channel.create_invite(max_age=3600)
+            break
+    return None
+
+
+async def open_guild_menu(
+    ctx: commands.Context,
+    counts: t.Dict[int, t.Tuple[float, MemberCounts]],
+    sort_by: str = "default",
+    elevated: bool = False,
+) -> None:
+    index = build_index(ctx.bot.guilds, sort_by, elevated)
+    if not index:
+        await ctx.send("No guilds match that filter")
+        return
+    page = next((i for i, summary in enumerate(index) if summary.id == ctx.guild.id), 0)
+    source = GuildPageSource(ctx.bot, index, ctx.author.color, counts)
+    await GuildMenu(ctx, source, page=page, timeout=300).refresh()
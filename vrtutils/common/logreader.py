@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import mmap
+import os
+import re
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+
+from redbot.core.utils.chat_formatting import box
+
+from .dynamic_menu import PageSource
+
+LATEST_LOG_RE = re.compile(r"latest(?:-part(?P<part>\d+))?\.log")
+# Red's file handler format: [2024-01-01 12:00:00] INFO [red.cog] message
+RECORD_RE = re.compile(r"^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] (?P<level>[A-Z]+) \[(?P<logger>[^\]]+)\]")
+PAGE_LENGTH = 1800
+
+
+def get_log_files(folder: Path) -> t.List[Path]:
+    """Current log parts, newest first"""
+    parts = []
+    for file in folder.iterdir():
+        if match := LATEST_LOG_RE.fullmatch(file.name):
+            parts.append((int(match.group("part") or 1), file))
+    parts.sort(reverse=True)
+    return [file for _, file in parts]
+
+
+@dataclass
+class LogFilter:
+    level: int = 0
+    logger: t.Optional[str] = None
+    pattern: t.Optional[t.Pattern] = None
+    follow: bool = False
+
+    @classmethod
+    def parse(cls, text: str) -> "LogFilter":
+        """
+        Parse `level:<name> logger:<prefix> follow <regex...>`
+
+        Anything that isn't a `key:value` option or the `follow` keyword is joined back up into the regex
+        """
+        flt = cls()
+        leftover = []
+        for word in text.split():
+            key, _, value = word.partition(":")
+            if key.lower() == "level" and value:
+                level = logging.getLevelName(value.upper())
+                if not isinstance(level, int):
+                    raise ValueError(f"Unknown log level `{value}`")
+                flt.level = level
+            elif key.lower() == "logger" and value:
+                flt.logger = value
+            elif word.lower() == "follow":
+                flt.follow = True
+            else:
+                leftover.append(word)
+        if leftover:
+            try:
+                flt.pattern = re.compile(" ".join(leftover), re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid regex: {e}")
+        return flt
+
+    @property
+    def active(self) -> bool:
+        return bool(self.level or self.logger or self.pattern)
+
+    def match(self, lines: t.List[str]) -> bool:
+        """Check a record, the header line followed by any continuation lines like a traceback"""
+        if not self.active:
+            return True
+        header = RECORD_RE.match(lines[0])
+        if self.level or self.logger:
+            if not header:
+                return False
+            level = logging.getLevelName(header.group("level"))
+            if self.level and (not isinstance(level, int) or level < self.level):
+                return False
+            if self.logger and not header.group("logger").startswith(self.logger):
+                return False
+        if self.pattern:
+            return any(self.pattern.search(line) for line in lines)
+        return True
+
+
+class ReverseLogReader:
+    """
+    Read log records newest first without loading the files
+
+    Each call maps the current file, scans backwards from where the last call stopped and unmaps it again,
+    so nothing is held open while a menu sits idle. Only data that existed when the reader was created is read.
+    """
+
+    def __init__(self, files: t.List[Path], flt: LogFilter):
+        self.flt = flt
+        self.files: t.List[t.Tuple[Path, int]] = []
+        for file in files:
+            try:
+                self.files.append((file, file.stat().st_size))
+            except FileNotFoundError:
+                continue
+        self.file_idx = 0
+        self.offset = self.files[0][1] if self.files else 0
+        # Continuation lines waiting for their header, newest first
+        self.pending: t.List[str] = []
+
+    @property
+    def exhausted(self) -> bool:
+        return self.file_idx >= len(self.files)
+
+    def read(self, budget: int = PAGE_LENGTH) -> t.List[str]:
+        """Lines of whole matching records, newest first, stopping once `budget` characters are collected"""
+        lines: t.List[str] = []
+        size = 0
+        while not self.exhausted and size < budget:
+            path = self.files[self.file_idx][0]
+            try:
+                size += self._scan(path, lines, budget - size)
+            except (FileNotFoundError, ValueError):
+                # Rotated away or emptied since the reader was made
+                self.offset = 0
+            if self.offset == 0:
+                size += self._flush(lines)
+                self.file_idx += 1
+                if not self.exhausted:
+                    self.offset = self.files[self.file_idx][1]
+        return lines
+
+    def _scan(self, path: Path, lines: t.List[str], budget: int) -> int:
+        size = 0
+        with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = min(self.offset, len(mm))
+            while end > 0 and size < budget:
+                start = mm.rfind(b"\n", 0, end) + 1
+                line = mm[start:end].decode("utf-8", errors="ignore").rstrip("\r")
+                end = max(start - 1, 0)
+                if not line:
+                    continue
+                if not RECORD_RE.match(line):
+                    self.pending.append(line)
+                    continue
+                record = [line] + self.pending[::-1]
+                self.pending = []
+                if self.flt.match(record):
+                    lines.extend(reversed(record))
+                    size += sum(len(i) + 1 for i in record)
+            self.offset = end
+        return size
+
+    def _flush(self, lines: t.List[str]) -> int:
+        # Lines at the top of a file with no header, only shown when not filtering by level or logger
+        if not self.pending:
+            return 0
+        record = self.pending[::-1]
+        self.pending = []
+        if self.flt.level or self.flt.logger or not self.flt.match(record):
+            return 0
+        lines.extend(reversed(record))
+        return sum(len(i) + 1 for i in record)
+
+
+class LogPageSource(PageSource):
+    """Pages of log lines built as the menu is scrolled back in time"""
+
+    grows = True
+
+    def __init__(self, reader: ReverseLogReader, max_pages: int = 50):
+        self.reader = reader
+        self.max_pages = max_pages
+        self.pages: t.List[str] = []
+        # Lines read past the end of the last built page, newest first
+        self.carry: t.List[str] = []
+        self.done = False
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return max(len(self.pages) + (0 if self.done else 1), 1)
+
+    def _build(self) -> None:
+        lines = self.carry
+        size = sum(len(i) + 1 for i in lines)
+        while size < PAGE_LENGTH and not self.reader.exhausted:
+            new = self.reader.read(PAGE_LENGTH - size)
+            lines.extend(new)
+            size += sum(len(i) + 1 for i in new)
+
+        page: t.List[str] = []
+        size = 0
+        for idx, line in enumerate(lines):
+            line = line[:PAGE_LENGTH]
+            if size + len(line) + 1 > PAGE_LENGTH and page:
+                self.carry = lines[idx:]
+                break
+            page.append(line)
+            size += len(line) + 1
+        else:
+            self.carry = []
+
+        if page and not self.pages:
+            page.insert(0, "# END OF LOGS")
+        if page:
+            self.pages.append("\n".join(reversed(page)))
+        if (self.reader.exhausted and not self.carry) or len(self.pages) >= self.max_pages:
+            self.done = True
+
+    async def fill(self, index: int) -> None:
+        async with self.lock:
+            while len(self.pages) <= index and not self.done:
+                await asyncio.to_thread(self._build)
+
+    async def get_page(self, index: int) -> str:
+        await self.fill(index)
+        if not self.pages:
+            return box("No logs match those filters", lang="python")
+        index = min(index, len(self.pages) - 1)
+        foot = f"Page {index + 1}/{len(self.pages) if self.done else '?'}"
+        return f"{box(self.pages[index], lang='python')}\n{foot}"
+
+    async def search(self, query: str) -> t.Optional[int]:
+        query = query.casefold()
+        index = 0
+        while True:
+            await self.fill(index)
+            if index >= len(self.pages):
+                return None
+            if query in self.pages[index].casefold():
+                return index
+            index += 1
+
+
+class LogTail:
+    """Follow lines appended to the logs after the tail was started"""
+
+    def __init__(self, folder: Path, flt: LogFilter):
+        self.folder = folder
+        self.flt = flt
+        files = get_log_files(folder)
+        self.file = files[0] if files else None
+        self.pos = self.file.stat().st_size if self.file else 0
+        # Whether the last record seen matched, for continuation lines arriving in a later poll
+        self.keep = not flt.active
+
+    def poll(self) -> t.List[str]:
+        """New matching lines, oldest first"""
+        lines: t.List[str] = []
+        while True:
+            if self.file is not None:
+                lines.extend(self._read_new())
+            files = get_log_files(self.folder)
+            if not files or files[0] == self.file:
+                break
+            # Handler moved on to a new part, the old one was finished above so start the new one from the top
+            self.file = files[0]
+            self.pos = 0
+        return self._filter(lines)
+
+    def _read_new(self) -> t.List[str]:
+        try:
+            with self.file.open("rb") as f:
+                if os.fstat(f.fileno()).st_size < self.pos:
+                    # Truncated, start over
+                    self.pos = 0
+                f.seek(self.pos)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # Leave a partially written line for the next poll
+        cut = data.rfind(b"\n") + 1
+        self.pos += cut
+        return [i for i in data[:cut].decode("utf-8", errors="ignore").splitlines() if i]
+
+    def _filter(self, lines: t.List[str]) -> t.List[str]:
+        if not self.flt.active:
+            return lines
+        kept: t.List[str] = []
+        record: t.List[str] = []
+        for line in lines + [None]:
+            if line is not None and not RECORD_RE.match(line):
+                if record:
+                    record.append(line)
+                elif self.keep:
+                    kept.append(line)
+                continue
+            if record:
+                self.keep = self.flt.match(record)
+                if self.keep:
+                    kept.extend(record)
+            record = [line] if line is not None else []
+        return kept
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import typing as t
+from collections import deque
+from time import monotonic
+
+import cpuinfo
+import psutil
+
+log = logging.getLogger("red.vrt.vrtutils.metrics")
+
+SPARKS = "▁▂▃▄▅▆▇█"
+# (label, seconds)
+WINDOWS = (("1m", 60), ("5m", 300), ("1h", 3600))
+
+
+class Sample(t.NamedTuple):
+    ts: float
+    cpu: float  # System wide %
+    bot_cpu: float  # Bot process %, can go over 100 on multiple cores
+    ram: float  # System wide %
+    bot_ram: int  # Bot process RSS bytes
+    disk_read: float  # bytes/s
+    disk_write: float  # bytes/s
+    net_sent: float  # bytes/s
+    net_recv: float  # bytes/s
+    lag: float  # Event loop lag ms
+
+
+class MetricsSampler:
+    """
+    Samples host and process metrics in the background into a fixed size ring buffer
+
+    Args:
+        interval: seconds between samples
+        history: seconds of samples to keep
+    """
+
+    def __init__(self, interval: int = 5, history: int = 3600):
+        self.interval = interval
+        self.samples: t.Deque[Sample] = deque(maxlen=history // interval)
+        self.process = psutil.Process()
+        # Latest per-core usage, the ring buffer only keeps the average
+        self.per_core: t.List[float] = []
+        # Cached once, cpuinfo can take seconds to run
+        self.cpu_info: dict = {}
+        self.task: t.Optional[asyncio.Task] = None
+        self.last_io: t.Optional[t.Tuple[float, t.Any, t.Any]] = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+
+    async def run(self) -> None:
+        try:
+            self.cpu_info = await asyncio.to_thread(cpuinfo.get_cpu_info)
+        except Exception as e:
+            log.warning("Failed to get cpu info", exc_info=e)
+        # cpu_percent(None) measures since the previous call, the first call only sets the baseline
+        await asyncio.to_thread(self.sample, 0.0)
+        self.samples.clear()
+        while True:
+            start = monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, monotonic() - start - self.interval) * 1000
+            try:
+                self.samples.append(await asyncio.to_thread(self.sample, lag))
+            except Exception as e:
+                log.error("Failed to sample metrics", exc_info=e)
+
+    def sample(self, lag: float) -> Sample:
+        now = monotonic()
+        self.per_core = psutil.cpu_percent(interval=None, percpu=True)
+        cpu = sum(self.per_core) / len(self.per_core) if self.per_core else 0.0
+        bot_cpu = self.process.cpu_percent(interval=None)
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+
+        rates = [0.0, 0.0, 0.0, 0.0]
+        if self.last_io is not None:
+            last_ts, last_disk, last_net = self.last_io
+            elapsed = max(now - last_ts, 1e-6)
+            if disk and last_disk:
+                rates[0] = max(0, disk.read_bytes - last_disk.read_bytes) / elapsed
+                rates[1] = max(0, disk.write_bytes - last_disk.write_bytes) / elapsed
+            if net and last_net:
+                rates[2] = max(0, net.bytes_sent - last_net.bytes_sent) / elapsed
+                rates[3] = max(0, net.bytes_recv - last_net.bytes_recv) / elapsed
+        self.last_io = (now, disk, net)
+
+        return Sample(
+            now,
+            cpu,
+            bot_cpu,
+            psutil.virtual_memory().percent,
+            self.process.memory_info().rss,
+            *rates,
+            lag,
+        )
+
+    @property
+    def latest(self) -> t.Optional[Sample]:
+        return self.samples[-1] if self.samples else None
+
+    def window(self, seconds: float) -> t.List[Sample]:
+        """Samples from the last `seconds`, oldest first"""
+        cutoff = monotonic() - seconds
+        picked = []
+        for sample in reversed(self.samples):
+            if sample.ts < cutoff:
+                break
+            picked.append(sample)
+        picked.reverse()
+        return picked
+
+    def stats(self, field: str, seconds: float) -> t.Optional[t.Tuple[float, float, float]]:
+        """(min, avg, max) of a field over the window, None until there is data"""
+        values = [getattr(i, field) for i in self.window(seconds)]
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def sparkline(self, field: str, seconds: float = 3600, width: int = 24) -> str:
+        """Bucket averages of a field over the window scaled to block characters"""
+        values = [getattr(i, field) for i in self.window(seconds)]
+        if not values:
+            return ""
+        size = max(1, -(-len(values) // width))
+        buckets = [values[i : i + size] for i in range(0, len(values), size)]
+        points = [sum(b) / len(b) for b in buckets]
+        low, high = min(points), max(points)
+        if high - low < 1e-9:
+            return SPARKS[0] * len(points)
+        scale = (len(SPARKS) - 1) / (high - low)
+        return "".join(SPARKS[round((p - low) * scale)] for p in points)
@@ -1,7 +1,6 @@
 import asyncio
 import subprocess
 import typing as t
-from pathlib import Path
 from sys import executable
 
 import discord
@@ -81,16 +80,6 @@ def get_bitsize(num: float) -> str:
     return "{0:.1f}{1}".format(num, "YB")
 
 
-def calculate_directory_size(path: Path) -> int:
-    total_size = 0
-
-    for file in path.rglob("*"):
-        if file.is_file():
-            total_size += file.stat().st_size
-
-    return total_size
-
-
 def chunk(obj_list: list, chunk_size: int):
     for i in range(0, len(obj_list), chunk_size):
         yield obj_list[i : i + chunk_size]
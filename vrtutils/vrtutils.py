@@ -6,6 +6,8 @@ from redbot.core.data_manager import cog_data_path, core_data_path
 
 from .abc import CompositeMetaClass
 from .commands import Utils
+from .common.dirsize import DirSizeScanner
+from .common.metrics import MetricsSampler
 
 log = logging.getLogger("red.vrt.vrtutils")
 
@@ -16,7 +18,7 @@ class VrtUtils(Utils, commands.Cog, metaclass=CompositeMetaClass):
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "2.12.5"
+    __version__ = "2.17.0"
 
     def format_help_for_context(self, ctx: commands.Context):
         helpcmd = super().format_help_for_context(ctx)
@@ -30,3 +32,14 @@ class VrtUtils(Utils, commands.Cog, metaclass=CompositeMetaClass):
         self.bot: Red = bot
         self.path = cog_data_path(self)
         self.core = core_data_path()
+        self.sampler = MetricsSampler()
+        # Member counts for the guilds menu, {guild_id: (counted_at, counts)}
+        self.guild_counts = {}
+        # Directory sizes for cogsizes/codesizes, cached per directory by mtime
+        self.dir_scanner = DirSizeScanner()
+
+    async def cog_load(self) -> None:
+        self.sampler.start()
+
+    async def cog_unload(self) -> None:
+        self.sampler.stop()
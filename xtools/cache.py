@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+log = logging.getLogger("red.vrt.xtools.cache")
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a time-to-live and stale-while-revalidate
+
+    Entries younger than `ttl` are served as is. Entries younger than `ttl + stale` are served immediately
+    while a background task refreshes them. Concurrent misses for the same key share a single request.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600, stale: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale = stale
+        # {key: (fetched_at, value)}
+        self.data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # {key: in-flight fetch}
+        self.pending: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value without fetching, stale values included"""
+        entry = self.data.get(key)
+        if entry is None or monotonic() - entry[0] > self.ttl + self.stale:
+            return None
+        self.data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.data[key] = (monotonic(), value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.data.pop(key, None)
+
+    def clear(self) -> None:
+        self.data.clear()
+
+    async def fetch(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Get a value, calling the factory on a miss and refreshing in the background once it goes stale"""
+        entry = self.data.get(key)
+        if entry is not None:
+            age = monotonic() - entry[0]
+            if age < self.ttl:
+                self.data.move_to_end(key)
+                return entry[1]
+            if age < self.ttl + self.stale:
+                self.data.move_to_end(key)
+                self._start(key, factory)
+                return entry[1]
+        return await asyncio.shield(self._start(key, factory))
+
+    def _start(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        if task := self.pending.get(key):
+            return task
+
+        def _done(task: asyncio.Task):
+            self.pending.pop(key, None)
+            if task.cancelled():
+                return
+            if exc := task.exception():
+                log.debug(f"Failed to fetch {key}", exc_info=exc)
+                return
+            self.set(key, task.result())
+
+        task = asyncio.create_task(factory())
+        task.add_done_callback(_done)
+        self.pending[key] = task
+        return task
@@ -3,8 +3,9 @@ import contextlib
 import json
 import logging
 import traceback
+from datetime import datetime, timedelta, timezone
 from io import BytesIO, StringIO
-from typing import Optional
+from typing import Dict, Optional
 
 import aiohttp
 import discord
@@ -19,6 +20,7 @@ from xbox.webapi.authentication.manager import AuthenticationManager
 from xbox.webapi.authentication.models import OAuth2TokenResponse
 from xbox.webapi.common.signed_session import SignedSession
 
+from .cache import TTLCache
 from .dpymenu import DEFAULT_CONTROLS, menu
 from .formatter import (
     friend_embeds,
@@ -34,18 +36,37 @@ from .formatter import (
 )
 
 REDIRECT_URI = "http://localhost/auth/callback"
+# Tokens are refreshed when they have less than this left
+TOKEN_MARGIN = timedelta(minutes=5)
+# Concurrent playtime stat requests when building the most played list
+STATS_CONCURRENCY = 8
+# Concurrent channel sends when fanning out a status alert
+ALERT_CONCURRENCY = 10
 LOADING = "https://i.imgur.com/l3p6EMX.gif"
 log = logging.getLogger("red.vrt.xtools")
 V2 = VERSION >= "2.0.0"
 
 
+def oauth_expiring(oauth: OAuth2TokenResponse) -> bool:
+    return oauth.issued + timedelta(seconds=oauth.expires_in) - datetime.now(timezone.utc) < TOKEN_MARGIN
+
+
+def tokens_expiring(auth_mgr: AuthenticationManager) -> bool:
+    if auth_mgr.user_token is None or auth_mgr.xsts_token is None:
+        return True
+    if oauth_expiring(auth_mgr.oauth):
+        return True
+    now = datetime.now(timezone.utc)
+    return min(auth_mgr.user_token.not_after, auth_mgr.xsts_token.not_after) - now < TOKEN_MARGIN
+
+
 class XTools(commands.Cog):
     """
     Provides various features and functionalities related to Xbox, including profile retrieval, game clips and screenshot viewing, Microsoft services status checking, and more.
     """
 
     __author__ = "[vertyco](https://github.com/vertyco/vrt-cogs)"
-    __version__ = "3.11.6"
+    __version__ = "3.14.0"
 
     def format_help_for_context(self, ctx: commands.Context):
         helpcmd = super().format_help_for_context(ctx)
@@ -73,14 +94,30 @@ class XTools(commands.Cog):
         self.config.register_global(**default_global)
         self.config.register_guild(**default_guild)
 
-        # Caching friend list for searching
-        self.cache = {}
+        # Caching friend list for searching, {author_id: friend_data}
+        self.cache = TTLCache(maxsize=256, ttl=900, stale=0)
+        # Xbox Live responses keyed by endpoint and gamertag/xuid
+        self.profiles = TTLCache(maxsize=1024, ttl=600, stale=3600)
+        self.titles = TTLCache(maxsize=256, ttl=600, stale=1800)
+        self.friends = TTLCache(maxsize=256, ttl=300, stale=900)
+        # Shared Xbox Live client, built on first use and refreshed near token expiry
+        self.xbl_session: Optional[SignedSession] = None
+        self.xbl_client: Optional[XboxLiveClient] = None
+        self.auth_lock = asyncio.Lock()
+        # Pending DM prompt asking the owner to authorize tokens
+        self.auth_task: Optional[asyncio.Task] = None
         self.alert = None
+        # Guilds with a status channel set, {guild_id: channel_id}
+        self.status_channels: Dict[int, int] = {}
         self.status.start()
 
     def cog_unload(self):
         self.status.cancel()
+        if self.auth_task is not None:
+            self.auth_task.cancel()
         self.bot.loop.create_task(self.session.close())
+        if self.xbl_session is not None:
+            self.bot.loop.create_task(self.xbl_session.aclose())
 
     # Get Microsoft services status
     @staticmethod
@@ -92,7 +129,38 @@ class XTools(commands.Cog):
                 return data
 
     # General authentication manager
-    async def auth_manager(self, session, ctx: commands.Context = None):
+    async def auth_manager(self, ctx: commands.Context = None) -> Optional[XboxLiveClient]:
+        """Get the shared client, tokens are only refreshed when they are close to expiring"""
+        async with self.auth_lock:
+            if self.xbl_client is None:
+                self.xbl_client = await self.build_client(ctx)
+                if self.xbl_client is None:
+                    return None
+            auth_mgr = self.xbl_client._auth_mgr
+            if not tokens_expiring(auth_mgr):
+                return self.xbl_client
+            try:
+                if oauth_expiring(auth_mgr.oauth):
+                    auth_mgr.oauth = await auth_mgr.refresh_oauth_token()
+                    dump = auth_mgr.oauth.model_dump(mode="json") if V2 else json.loads(auth_mgr.oauth.json())
+                    await self.config.tokens.set(dump)
+                auth_mgr.user_token = await auth_mgr.request_user_token()
+                auth_mgr.xsts_token = await auth_mgr.request_xsts_token()
+            except Exception as e:
+                self.xbl_client = None
+                if "Bad Request" in str(e):
+                    if ctx:
+                        await ctx.send(
+                            "Tokens have failed to refresh.\n"
+                            "Microsoft API may be having issues.\n"
+                            f"Bot owner will need to re-authorize their tokens with `{ctx.clean_prefix}apiset auth`"
+                        )
+                    return None
+                log.error("Failed to refresh tokens", exc_info=e)
+                return None
+            return self.xbl_client
+
+    async def build_client(self, ctx: commands.Context = None) -> Optional[XboxLiveClient]:
         tokens = await self.config.tokens()
         client_id = await self.config.clientid()
         client_secret = await self.config.clientsecret()
@@ -103,23 +171,29 @@ class XTools(commands.Cog):
                     f"Bot owner needs to run `{ctx.clean_prefix}apiset tokens`"
                 )
             return None
-        auth_mgr = AuthenticationManager(session, client_id, client_secret, REDIRECT_URI)
         if tokens == {}:
-            if ctx.author.id in self.bot.owner_ids:
+            if ctx and ctx.author.id in self.bot.owner_ids:
                 url = "https://login.live.com/oauth20_authorize.srf?"
                 cid = f"client_id={client_id}"
                 types = "&response_type=code&approval_prompt=auto"
                 scopes = "&scope=Xboxlive.signin+Xboxlive.offline_access&"
                 redirect_uri = "&redirect_uri=http://localhost/auth/callback"
                 auth_url = f"{url}{cid}{types}{scopes}{redirect_uri}"
-                if ctx:
-                    await ctx.send("Sending you a DM to authorize your tokens.")
-                await self.ask_auth(ctx, ctx.author, auth_url)
+                if self.auth_task is not None and not self.auth_task.done():
+                    await ctx.send("Check your DMs, I'm still waiting on you to authorize your tokens.")
+                    return None
+                await ctx.send("Sending you a DM to authorize your tokens.")
+                # Don't hold the auth lock while waiting on the owner's reply
+                self.auth_task = asyncio.create_task(self.ask_auth(ctx, ctx.author, auth_url))
+                self.auth_task.add_done_callback(self.auth_done)
                 return None
             else:
                 if ctx:
                     await ctx.send("Tokens have not been authorized by bot owner yet!")
                 return None
+        if self.xbl_session is None:
+            self.xbl_session = SignedSession()
+        auth_mgr = AuthenticationManager(self.xbl_session, client_id, client_secret, REDIRECT_URI)
         try:
             auth_mgr.oauth = OAuth2TokenResponse.parse_raw(json.dumps(tokens))
         except Exception as e:
@@ -127,23 +201,20 @@ class XTools(commands.Cog):
                 if ctx:
                     await ctx.send("Tokens have not been authorized by bot owner yet!")
                 return None
-        try:
-            await auth_mgr.refresh_tokens()
-        except Exception as e:
-            if "Bad Request" in str(e):
-                if ctx:
-                    await ctx.send(
-                        "Tokens have failed to refresh.\n"
-                        "Microsoft API may be having issues.\n"
-                        f"Bot owner will need to re-authorize their tokens with `{ctx.clean_prefix}apiset auth`"
-                    )
-                return None
-        dump = auth_mgr.oauth.model_dump(mode="json") if V2 else json.loads(auth_mgr.oauth.json())
-        await self.config.tokens.set(dump)
-        xbl_client = XboxLiveClient(auth_mgr)
-        return xbl_client
+        return XboxLiveClient(auth_mgr)
+
+    def reset_client(self):
+        """Drop the cached client so the next command picks up new credentials"""
+        self.xbl_client = None
 
     # Send user DM asking for authentication
+    @staticmethod
+    def auth_done(task: asyncio.Task):
+        if task.cancelled():
+            return
+        if exc := task.exception():
+            log.error("Token authorization failed", exc_info=exc)
+
     async def ask_auth(self, ctx, author: discord.User, auth_url):
         plz_auth = (
             f"Please follow this link to authorize your tokens with Microsoft.\n"
@@ -179,6 +250,7 @@ class XTools(commands.Cog):
                 await auth_mgr.request_tokens(code)
                 dump = auth_mgr.oauth.model_dump(mode="json") if V2 else json.loads(auth_mgr.oauth.json())
                 await self.config.tokens.set(dump)
+                self.reset_client()
             except Exception as e:
                 if "Bad Request" in str(e):
                     return await author.send(
@@ -193,17 +265,63 @@ class XTools(commands.Cog):
             await author.send("Tokens have been Authorized✅")
 
     # Get XSTS token
-    async def get_token(self, session):
-        tokens = await self.config.tokens()
-        client_id = await self.config.clientid()
-        client_secret = await self.config.clientsecret()
-        auth_mgr = AuthenticationManager(session, client_id, client_secret, REDIRECT_URI)
-        auth_mgr.oauth = OAuth2TokenResponse.parse_raw(json.dumps(tokens))
-        await auth_mgr.refresh_tokens()
-        dump = auth_mgr.oauth.model_dump(mode="json") if V2 else json.loads(auth_mgr.oauth.json())
-        await self.config.tokens.set(dump)
-        token = auth_mgr.xsts_token.authorization_header_value
-        return token
+    async def get_token(self) -> Optional[str]:
+        xbl_client = await self.auth_manager()
+        if not xbl_client:
+            return None
+        return xbl_client._auth_mgr.xsts_token.authorization_header_value
+
+    async def get_profile_data(
+        self, xbl_client: XboxLiveClient, gamertag: Optional[str] = None, xuid: Optional[str] = None
+    ) -> dict:
+        """Profile by gamertag or xuid, cached under both so either lookup can be served later"""
+        key = ("xuid", str(xuid)) if xuid else ("gamertag", gamertag.lower())
+
+        async def _fetch():
+            if xuid:
+                pdata = await xbl_client.profile.get_profile_by_xuid(xuid)
+            else:
+                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
+            data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
+            gt, found_xuid, _, _, _, _, _, _, _ = profile(data)
+            other = ("gamertag", gt.lower()) if xuid else ("xuid", str(found_xuid))
+            self.profiles.set(other, data)
+            return data
+
+        # Callers add their own keys to the profile
+        return dict(await self.profiles.fetch(key, _fetch))
+
+    async def get_friends_data(self, xbl_client: XboxLiveClient, xuid: str) -> dict:
+        async def _fetch():
+            friends = await xbl_client.people.get_friends_by_xuid(xuid)
+            return friends.model_dump(mode="json") if V2 else json.loads(friends.json())
+
+        return await self.friends.fetch(str(xuid), _fetch)
+
+    async def get_title_history(self, xuid: str) -> list:
+        """Achievement title history, pages are requested at the largest size the endpoint allows"""
+
+        async def _fetch():
+            token = await self.get_token()
+            header = {
+                "x-xbl-contract-version": "2",
+                "Authorization": token,
+                "Accept-Language": "en-US",
+            }
+            url = f"https://achievements.xboxlive.com/users/xuid({xuid})/history/titles"
+            # Keep pulling continuation token till all data is obtained
+            titles = []
+            params = {"maxItems": 1000}
+            while True:
+                async with self.session.get(url=url, headers=header, params=params) as res:
+                    data = await res.json(content_type=None)
+                titles.extend(data["titles"])
+                c_token = data["pagingInfo"]["continuationToken"]
+                if not c_token:
+                    return titles
+                params = {"maxItems": 1000, "continuationToken": c_token}
+
+        return await self.titles.fetch(str(xuid), _fetch)
 
     # Pulls user info if they've set a Gamertag
     async def pull_user(self, ctx: commands.Context):
@@ -292,6 +410,7 @@ class XTools(commands.Cog):
         """Set Client ID and Secret"""
         await self.config.clientid.set(client_id)
         await self.config.clientsecret.set(client_secret)
+        self.reset_client()
         await ctx.send(
             "Tokens have been set! "
             "Try any command and the bot will DM you the link with instructions to authorize your tokens"
@@ -309,6 +428,7 @@ class XTools(commands.Cog):
         await self.config.tokens.clear()
         await self.config.clientid.set(None)
         await self.config.clientsecret.set(None)
+        self.reset_client()
         await ctx.send("Tokens have been wiped!")
 
     @commands.command(name="xstatuschannel")
@@ -324,31 +444,31 @@ class XTools(commands.Cog):
                 await ctx.send_help()
             elif conf["statuschannel"] and not channel:
                 conf["statuschannel"] = 0
+                self.status_channels.pop(ctx.guild.id, None)
                 await ctx.send("Status channel reset")
             else:
                 conf["statuschannel"] = channel.id
+                self.status_channels[ctx.guild.id] = channel.id
                 await ctx.send(f"Status channel set to {channel.mention}")
 
     @commands.command(name="setgt")
     async def set_gamertag(self, ctx, *, gamertag):
         """Set your Gamertag to use commands without entering it"""
         async with ctx.typing():
-            async with SignedSession() as session:
-                xbl_client = await self.auth_manager(session, ctx)
-                if not xbl_client:
-                    return
-                try:
-                    pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                    profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-                except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                    return await ctx.send("Invalid Gamertag. Try again.")
-                except httpx.ConnectTimeout:
-                    return await ctx.send("Connection timed out. Try again.")
-                # Format json data
-                gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-                async with self.config.users() as users:
-                    users[ctx.author.id] = {"gamertag": gt, "xuid": xuid}
-                    await ctx.tick()
+            xbl_client = await self.auth_manager(ctx)
+            if not xbl_client:
+                return
+            try:
+                profile_data = await self.get_profile_data(xbl_client, gamertag)
+            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+                return await ctx.send("Invalid Gamertag. Try again.")
+            except httpx.ConnectTimeout:
+                return await ctx.send("Connection timed out. Try again.")
+            # Format json data
+            gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+            async with self.config.users() as users:
+                users[ctx.author.id] = {"gamertag": gt, "xuid": xuid}
+                await ctx.tick()
 
     @commands.command(name="xuid")
     async def get_xuid(self, ctx, *, gamertag=None):
@@ -358,36 +478,32 @@ class XTools(commands.Cog):
             gamertag = await self.pull_user(ctx)
             if not gamertag:
                 return
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                return await ctx.send("Invalid Gamertag. Try again.")
-            except httpx.ConnectTimeout:
-                return await ctx.send("Connection timed out. Try again.")
-            _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-            return await ctx.send(f"`{xuid}`")
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            return await ctx.send("Invalid Gamertag. Try again.")
+        except httpx.ConnectTimeout:
+            return await ctx.send("Connection timed out. Try again.")
+        _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        return await ctx.send(f"`{xuid}`")
 
     @commands.command(name="gamertag")
     async def get_gamertag(self, ctx, *, xuid):
         """Get the Gamertag associated with an XUID"""
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            try:
-                pdata = await xbl_client.profile.get_profile_by_xuid(xuid)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                return await ctx.send("Invalid XUID. Try again.")
-            except httpx.ConnectTimeout:
-                return await ctx.send("Connection timed out. Try again.")
-            gt, _, _, _, _, _, _, _, _ = profile(profile_data)
-            return await ctx.send(f"`{gt}`")
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        try:
+            profile_data = await self.get_profile_data(xbl_client, xuid=xuid)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            return await ctx.send("Invalid XUID. Try again.")
+        except httpx.ConnectTimeout:
+            return await ctx.send("Connection timed out. Try again.")
+        gt, _, _, _, _, _, _, _, _ = profile(profile_data)
+        return await ctx.send(f"`{gt}`")
 
     @commands.command(name="xprofile")
     @commands.bot_has_permissions(embed_links=True)
@@ -398,51 +514,49 @@ class XTools(commands.Cog):
             gamertag = await self.pull_user(ctx)
             if not gamertag:
                 return
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
-            embed.set_thumbnail(url=LOADING)
-            msg = await ctx.send(embed=embed)
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                embed = discord.Embed(description="Invalid Gamertag. Try again.")
-                return await msg.edit(embed=embed)
-            except httpx.ConnectTimeout:
-                return await msg.edit(content="Connection timed out. Try again.", embed=None)
-            _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-            friends = await xbl_client.people.get_friends_summary_by_gamertag(gamertag)
-            friends_data = friends.model_dump(mode="json") if V2 else json.loads(friends.json())
-
-            # Manually get presence and activity info since xbox webapi method is outdated
-            token = await self.get_token(session)
-            header = {
-                "x-xbl-contract-version": "3",
-                "Authorization": token,
-                "Accept": "application/json",
-                "Accept-Language": "en-US",
-                "Host": "presencebeta.xboxlive.com",
-            }
-            url = f"https://userpresence.xboxlive.com/users/xuid({xuid})"
-            async with self.session.get(url=url, headers=header) as res:
-                presence_data = await res.json(content_type=None)
-            url = f"https://avty.xboxlive.com/users/xuid({xuid})/Activity/History?numItems=5&excludeTypes=TextPost"
-            async with self.session.get(url=url, headers=header) as res:
-                activity_data = await res.json(content_type=None)
-            profile_data["friends"] = friends_data
-            profile_data["presence"] = presence_data
-            profile_data["activity"] = activity_data["activityItems"]
-            embed = profile_embed(profile_data)
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
+        embed.set_thumbnail(url=LOADING)
+        msg = await ctx.send(embed=embed)
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            embed = discord.Embed(description="Invalid Gamertag. Try again.")
+            return await msg.edit(embed=embed)
+        except httpx.ConnectTimeout:
+            return await msg.edit(content="Connection timed out. Try again.", embed=None)
+        _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        friends = await xbl_client.people.get_friends_summary_by_gamertag(gamertag)
+        friends_data = friends.model_dump(mode="json") if V2 else json.loads(friends.json())
+
+        # Manually get presence and activity info since xbox webapi method is outdated
+        token = await self.get_token()
+        header = {
+            "x-xbl-contract-version": "3",
+            "Authorization": token,
+            "Accept": "application/json",
+            "Accept-Language": "en-US",
+            "Host": "presencebeta.xboxlive.com",
+        }
+        url = f"https://userpresence.xboxlive.com/users/xuid({xuid})"
+        async with self.session.get(url=url, headers=header) as res:
+            presence_data = await res.json(content_type=None)
+        url = f"https://avty.xboxlive.com/users/xuid({xuid})/Activity/History?numItems=5&excludeTypes=TextPost"
+        async with self.session.get(url=url, headers=header) as res:
+            activity_data = await res.json(content_type=None)
+        profile_data["friends"] = friends_data
+        profile_data["presence"] = presence_data
+        profile_data["activity"] = activity_data["activityItems"]
+        embed = profile_embed(profile_data)
+        try:
+            return await msg.edit(embed=embed)
+        except discord.HTTPException:
             try:
-                return await msg.edit(embed=embed)
+                return await ctx.send(embed=embed)
             except discord.HTTPException:
-                try:
-                    return await ctx.send(embed=embed)
-                except discord.HTTPException:
-                    return await ctx.send("Something broke")  # Fuck it
+                return await ctx.send("Something broke")  # Fuck it
 
     @commands.command(name="xscreenshots")
     @commands.bot_has_permissions(embed_links=True)
@@ -452,46 +566,44 @@ class XTools(commands.Cog):
             gamertag = await self.pull_user(ctx)
             if not gamertag:
                 return
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
-            embed.set_thumbnail(url=LOADING)
-            msg = await ctx.send(embed=embed)
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                embed = discord.Embed(description="Invalid Gamertag. Try again.")
-                return await msg.edit(embed=embed)
-            except httpx.ConnectTimeout:
-                return await msg.edit(content="Connection timed out. Try again.", embed=None)
-            _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-            try:
-                ss = await xbl_client.screenshots.get_saved_screenshots_by_xuid(xuid=xuid, max_items=10000)
-                data = ss.model_dump(mode="json") if V2 else json.loads(ss.json())
-            except aiohttp.ClientResponseError as e:
-                if e.message == "Forbidden":
-                    embed = discord.Embed(
-                        description="Forbidden: Cannot get screenshots for user, "
-                        "they may have their settings on private",
-                        color=discord.Color.red(),
-                    )
-                else:
-                    embed = discord.Embed(
-                        description=f"Error: {box(e.message)}",
-                        color=discord.Color.red(),
-                    )
-                await msg.edit(embed=embed)
-                return
-            pages = screenshot_embeds(data, gamertag)
-            if len(pages) == 0:
-                color = discord.Color.red()
-                embed = discord.Embed(description="No screenshots found", color=color)
-                return await msg.edit(embed=embed)
-            await msg.delete()
-            await menu(ctx, pages, DEFAULT_CONTROLS)
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
+        embed.set_thumbnail(url=LOADING)
+        msg = await ctx.send(embed=embed)
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            embed = discord.Embed(description="Invalid Gamertag. Try again.")
+            return await msg.edit(embed=embed)
+        except httpx.ConnectTimeout:
+            return await msg.edit(content="Connection timed out. Try again.", embed=None)
+        _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        try:
+            ss = await xbl_client.screenshots.get_saved_screenshots_by_xuid(xuid=xuid, max_items=10000)
+            data = ss.model_dump(mode="json") if V2 else json.loads(ss.json())
+        except aiohttp.ClientResponseError as e:
+            if e.message == "Forbidden":
+                embed = discord.Embed(
+                    description="Forbidden: Cannot get screenshots for user, "
+                    "they may have their settings on private",
+                    color=discord.Color.red(),
+                )
+            else:
+                embed = discord.Embed(
+                    description=f"Error: {box(e.message)}",
+                    color=discord.Color.red(),
+                )
+            await msg.edit(embed=embed)
+            return
+        pages = screenshot_embeds(data, gamertag)
+        if len(pages) == 0:
+            color = discord.Color.red()
+            embed = discord.Embed(description="No screenshots found", color=color)
+            return await msg.edit(embed=embed)
+        await msg.delete()
+        await menu(ctx, pages, DEFAULT_CONTROLS)
 
     @commands.command(name="xgames")
     @commands.bot_has_permissions(embed_links=True)
@@ -501,127 +613,105 @@ class XTools(commands.Cog):
             gamertag = await self.pull_user(ctx)
             if not gamertag:
                 return
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
-            embed.set_thumbnail(url=LOADING)
-            msg = await ctx.send(embed=embed)
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                embed = discord.Embed(description="Invalid Gamertag. Try again.")
-                return await msg.edit(embed=embed)
-            except httpx.ConnectTimeout:
-                return await msg.edit(content="Connection timed out. Try again.", embed=None)
-            gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
+        embed.set_thumbnail(url=LOADING)
+        msg = await ctx.send(embed=embed)
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            embed = discord.Embed(description="Invalid Gamertag. Try again.")
+            return await msg.edit(embed=embed)
+        except httpx.ConnectTimeout:
+            return await msg.edit(content="Connection timed out. Try again.", embed=None)
+        gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+
+        token = await self.get_token()
+        game_data = {"titles": await self.get_title_history(xuid)}
+        if len(game_data["titles"]) == 0:
+            embed = discord.Embed(
+                color=discord.Color.red(),
+                description="Your privacy settings are blocking your gameplay history.\n"
+                "**[Click Here](https://account.xbox.com/en-gb/Settings)** to change your settings.",
+            )
+            return await msg.edit(embed=embed)
 
-            token = await self.get_token(session)
-            header = {
-                "x-xbl-contract-version": "2",
-                "Authorization": token,
-                "Accept-Language": "en-US",
-            }
-            url = f"https://achievements.xboxlive.com/users/xuid({xuid})/history/titles"
+        embed = discord.Embed(
+            description="What game would you like to search for?",
+            color=discord.Color.random(),
+        )
+        embed.set_footer(text='Reply "cancel" to end the search')
+        await msg.edit(embed=embed)
 
-            # Keep pulling continuation token till all data is obtained
-            running = True
-            params = None
-            game_data = {"titles": []}
-            while running:
-                async with self.session.get(url=url, headers=header, params=params) as res:
-                    data = await res.json(content_type=None)
-                    c_token = data["pagingInfo"]["continuationToken"]
-                    titles = data["titles"]
-                    game_data["titles"].extend(titles)
-                    if not c_token:
-                        running = False
-                    else:
-                        params = {"continuationToken": c_token}
-            if len(game_data["titles"]) == 0:
-                embed = discord.Embed(
-                    color=discord.Color.red(),
-                    description="Your privacy settings are blocking your gameplay history.\n"
-                    "**[Click Here](https://account.xbox.com/en-gb/Settings)** to change your settings.",
-                )
-                return await msg.edit(embed=embed)
+        # Check if reply is from author
+        def mcheck(message: discord.Message):
+            return message.author == ctx.author and message.channel == ctx.channel
+
+        try:
+            reply = await self.bot.wait_for("message", timeout=60, check=mcheck)
+        except asyncio.TimeoutError:
+            return await msg.edit(embed=discord.Embed(description="You took too long :yawning_face:"))
+        if reply.content.lower() == "cancel":
+            return await msg.edit(embed=discord.Embed(description="Game search canceled."))
+        titles = game_data["titles"]
+        gamelist = []
+        for title in titles:
+            name = title["name"]
+            if reply.content.lower() in name.lower():
+                gs = f'{title["currentGamerscore"]}/{title["maxGamerscore"]}'
+                gamelist.append((name, title["titleId"], gs))
+        if len(gamelist) == 0:
+            return await msg.edit(
+                embed=discord.Embed(description=f"Couldn't find {reply.content} in your game history.")
+            )
+        elif len(gamelist) > 1:
+            txt = StringIO()
+            for idx, item in enumerate(gamelist):
+                txt.write(f"**{idx + 1}.** {item[0]}\n")
 
             embed = discord.Embed(
-                description="What game would you like to search for?",
+                title="Type the number of the game you want to select",
+                description=txt.getvalue(),
                 color=discord.Color.random(),
             )
-            embed.set_footer(text='Reply "cancel" to end the search')
+            embed.set_footer(text='Reply "cancel" to close the menu')
             await msg.edit(embed=embed)
-
-            # Check if reply is from author
-            def mcheck(message: discord.Message):
-                return message.author == ctx.author and message.channel == ctx.channel
-
             try:
                 reply = await self.bot.wait_for("message", timeout=60, check=mcheck)
             except asyncio.TimeoutError:
                 return await msg.edit(embed=discord.Embed(description="You took too long :yawning_face:"))
             if reply.content.lower() == "cancel":
-                return await msg.edit(embed=discord.Embed(description="Game search canceled."))
-            titles = game_data["titles"]
-            gamelist = []
-            for title in titles:
-                name = title["name"]
-                if reply.content.lower() in name.lower():
-                    gs = f'{title["currentGamerscore"]}/{title["maxGamerscore"]}'
-                    gamelist.append((name, title["titleId"], gs))
-            if len(gamelist) == 0:
-                return await msg.edit(
-                    embed=discord.Embed(description=f"Couldn't find {reply.content} in your game history.")
-                )
-            elif len(gamelist) > 1:
-                txt = StringIO()
-                for idx, item in enumerate(gamelist):
-                    txt.write(f"**{idx + 1}.** {item[0]}\n")
-
-                embed = discord.Embed(
-                    title="Type the number of the game you want to select",
-                    description=txt.getvalue(),
-                    color=discord.Color.random(),
-                )
-                embed.set_footer(text='Reply "cancel" to close the menu')
-                await msg.edit(embed=embed)
-                try:
-                    reply = await self.bot.wait_for("message", timeout=60, check=mcheck)
-                except asyncio.TimeoutError:
-                    return await msg.edit(embed=discord.Embed(description="You took too long :yawning_face:"))
-                if reply.content.lower() == "cancel":
-                    return await msg.edit(embed=discord.Embed(description="Game select canceled."))
-                elif not reply.content.isdigit():
-                    return await msg.edit(embed=discord.Embed(description="That's not a number"))
-                elif int(reply.content) > len(gamelist):
-                    return await msg.edit(embed=discord.Embed(description="That's not a valid number"))
-                i = int(reply.content) - 1
-                gamename = gamelist[i][0]
-                title_id = gamelist[i][1]
-                gs = gamelist[i][2]
-            else:
-                gamename = gamelist[0][0]
-                title_id = gamelist[0][1]
-                gs = gamelist[0][2]
-
-            url, header, payload = stats_api_format(token, title_id, xuid)
-            async with self.session.post(url=url, headers=header, data=payload) as res:
-                game_stats = await res.json(content_type=None)
-            title = await xbl_client.titlehub.get_title_info(title_id)
-            title_info = title.model_dump(mode="json") if V2 else json.loads(title.json())
-            achievements = await xbl_client.achievements.get_achievements_xboxone_gameprogress(xuid, title_id)
-            achievement_data = achievements.model_dump(mode="json") if V2 else json.loads(achievements.json())
-            data = {
-                "stats": game_stats,
-                "info": title_info,
-                "achievements": achievement_data,
-            }
-            pages = game_embeds(gt, gamename, gs, data)
-            await msg.delete()
-            await menu(ctx, pages, DEFAULT_CONTROLS)
+                return await msg.edit(embed=discord.Embed(description="Game select canceled."))
+            elif not reply.content.isdigit():
+                return await msg.edit(embed=discord.Embed(description="That's not a number"))
+            elif int(reply.content) > len(gamelist):
+                return await msg.edit(embed=discord.Embed(description="That's not a valid number"))
+            i = int(reply.content) - 1
+            gamename = gamelist[i][0]
+            title_id = gamelist[i][1]
+            gs = gamelist[i][2]
+        else:
+            gamename = gamelist[0][0]
+            title_id = gamelist[0][1]
+            gs = gamelist[0][2]
+
+        url, header, payload = stats_api_format(token, title_id, xuid)
+        async with self.session.post(url=url, headers=header, data=payload) as res:
+            game_stats = await res.json(content_type=None)
+        title = await xbl_client.titlehub.get_title_info(title_id)
+        title_info = title.model_dump(mode="json") if V2 else json.loads(title.json())
+        achievements = await xbl_client.achievements.get_achievements_xboxone_gameprogress(xuid, title_id)
+        achievement_data = achievements.model_dump(mode="json") if V2 else json.loads(achievements.json())
+        data = {
+            "stats": game_stats,
+            "info": title_info,
+            "achievements": achievement_data,
+        }
+        pages = game_embeds(gt, gamename, gs, data)
+        await msg.delete()
+        await menu(ctx, pages, DEFAULT_CONTROLS)
 
     @commands.command(name="xfriends")
     @commands.bot_has_permissions(embed_links=True)
@@ -632,58 +722,57 @@ class XTools(commands.Cog):
                 gamertag = await self.pull_user(ctx)
                 if not gamertag:
                     return
-            async with SignedSession() as session:
-                xbl_client = await self.auth_manager(session, ctx)
-                if not xbl_client:
-                    return
-                embed = discord.Embed(
-                    description="Gathering data...",
-                    color=discord.Color.random(),
-                )
-                embed.set_thumbnail(url=LOADING)
-                msg = await ctx.send(embed=embed)
-                try:
-                    pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                    profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-                except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                    embed = discord.Embed(description="Invalid Gamertag. Try again.")
-                    return await msg.edit(embed=embed)
-                except httpx.ConnectTimeout:
-                    return await msg.edit(content="Connection timed out. Try again.", embed=None)
-                except Exception as e:
-                    if "Forbidden" in str(e):
-                        embed = discord.Embed(description="Failed to gather data, Gamertag may be set to private.")
-                        return await msg.edit(embed=embed)
-                    embed = discord.Embed(description=f"Failed to gather data!\nError: {box(str(e), 'py')}")
-                    return await msg.edit(embed=embed)
-                gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-                try:
-                    friends = await xbl_client.people.get_friends_by_xuid(xuid)
-                    friend_data = friends.model_dump(mode="json") if V2 else json.loads(friends.json())
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code == 403:
-                        return await msg.edit(embed=None, content="This persons friends list is private!")
-                    log.error("Failed to get friends list", exc_info=e)
-                    return await msg.edit(embed=None, content="Failed to fetch this person's friends list!")
-                except aiohttp.ClientResponseError as e:
-                    if e.status == 403:
-                        return await msg.edit(embed=None, content="This persons friends list is private!")
-                    log.error("Failed to get friends list", exc_info=e)
-                    return await msg.edit(embed=None, content="Failed to fetch this person's friends list!")
-                self.cache[str(ctx.author.id)] = friend_data
-                pages = friend_embeds(friend_data, gt)
-                if len(pages) == 0:
-                    embed = discord.Embed(description=f"No friends found for {gamertag}.")
+            xbl_client = await self.auth_manager(ctx)
+            if not xbl_client:
+                return
+            embed = discord.Embed(
+                description="Gathering data...",
+                color=discord.Color.random(),
+            )
+            embed.set_thumbnail(url=LOADING)
+            msg = await ctx.send(embed=embed)
+            try:
+                profile_data = await self.get_profile_data(xbl_client, gamertag)
+            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+                embed = discord.Embed(description="Invalid Gamertag. Try again.")
+                return await msg.edit(embed=embed)
+            except httpx.ConnectTimeout:
+                return await msg.edit(content="Connection timed out. Try again.", embed=None)
+            except Exception as e:
+                if "Forbidden" in str(e):
+                    embed = discord.Embed(description="Failed to gather data, Gamertag may be set to private.")
                     return await msg.edit(embed=embed)
-                await msg.delete()
+                embed = discord.Embed(description=f"Failed to gather data!\nError: {box(str(e), 'py')}")
+                return await msg.edit(embed=embed)
+            gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+            try:
+                friend_data = await self.get_friends_data(xbl_client, xuid)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 403:
+                    return await msg.edit(embed=None, content="This persons friends list is private!")
+                log.error("Failed to get friends list", exc_info=e)
+                return await msg.edit(embed=None, content="Failed to fetch this person's friends list!")
+            except aiohttp.ClientResponseError as e:
+                if e.status == 403:
+                    return await msg.edit(embed=None, content="This persons friends list is private!")
+                log.error("Failed to get friends list", exc_info=e)
+                return await msg.edit(embed=None, content="Failed to fetch this person's friends list!")
+            self.cache.set(str(ctx.author.id), friend_data)
+            pages = friend_embeds(friend_data, gt)
+            if len(pages) == 0:
+                embed = discord.Embed(description=f"No friends found for {gamertag}.")
+                return await msg.edit(embed=embed)
+            await msg.delete()
 
-                search_con = DEFAULT_CONTROLS.copy()
-                search_con["\N{LEFT-POINTING MAGNIFYING GLASS}"] = self.searching
-                await menu(ctx, pages, search_con)
+            search_con = DEFAULT_CONTROLS.copy()
+            search_con["\N{LEFT-POINTING MAGNIFYING GLASS}"] = self.searching
+            await menu(ctx, pages, search_con)
 
     async def searching(self, instance, interaction):
         ctx = instance.ctx
-        data = self.cache[str(ctx.author.id)]
+        data = self.cache.get(str(ctx.author.id))
+        if data is None:
+            return await instance.respond(interaction, "This friends list has expired, run the command again")
         embed = discord.Embed(
             description="Type in a Gamertag to search",
             color=discord.Color.random(),
@@ -749,46 +838,44 @@ class XTools(commands.Cog):
             gamertag = await self.pull_user(ctx)
             if not gamertag:
                 return
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
-            embed.set_thumbnail(url=LOADING)
-            msg = await ctx.send(embed=embed)
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                embed = discord.Embed(description="Invalid Gamertag. Try again.")
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
+        embed.set_thumbnail(url=LOADING)
+        msg = await ctx.send(embed=embed)
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            embed = discord.Embed(description="Invalid Gamertag. Try again.")
+            return await msg.edit(embed=embed)
+        except httpx.ConnectTimeout:
+            return await msg.edit(content="Connection timed out. Try again.", embed=None)
+        gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        try:
+            clips = await xbl_client.gameclips.get_saved_clips_by_xuid(xuid)
+            data = clips.model_dump(mode="json") if V2 else json.loads(clips.json())
+        except Exception as e:
+            if "Forbidden" in str(e):
+                embed = discord.Embed(
+                    color=discord.Color.red(),
+                    description="Your privacy settings might be blocking your game clips.\n"
+                    "**[Click Here](https://account.xbox.com/en-gb/Settings)** to change your settings.",
+                )
                 return await msg.edit(embed=embed)
-            except httpx.ConnectTimeout:
-                return await msg.edit(content="Connection timed out. Try again.", embed=None)
-            gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-            try:
-                clips = await xbl_client.gameclips.get_saved_clips_by_xuid(xuid)
-                data = clips.model_dump(mode="json") if V2 else json.loads(clips.json())
-            except Exception as e:
-                if "Forbidden" in str(e):
-                    embed = discord.Embed(
-                        color=discord.Color.red(),
-                        description="Your privacy settings might be blocking your game clips.\n"
-                        "**[Click Here](https://account.xbox.com/en-gb/Settings)** to change your settings.",
-                    )
-                    return await msg.edit(embed=embed)
-                else:
-                    embed = discord.Embed(
-                        color=discord.Color.red(),
-                        description=f"Unknown error while fetching xclip data: {e}",
-                    )
-                    return await msg.edit(embed=embed)
-            pages = gameclip_embeds(data, gamertag)
-            if len(pages) == 0:
-                color = discord.Color.red()
-                embed = discord.Embed(description="No game clips found", color=color)
+            else:
+                embed = discord.Embed(
+                    color=discord.Color.red(),
+                    description=f"Unknown error while fetching xclip data: {e}",
+                )
                 return await msg.edit(embed=embed)
-            await msg.delete()
-            await menu(ctx, pages, DEFAULT_CONTROLS)
+        pages = gameclip_embeds(data, gamertag)
+        if len(pages) == 0:
+            color = discord.Color.red()
+            embed = discord.Embed(description="No game clips found", color=color)
+            return await msg.edit(embed=embed)
+        await msg.delete()
+        await menu(ctx, pages, DEFAULT_CONTROLS)
 
     @commands.command(name="xstatus")
     async def get_microsoft_status(self, ctx: commands.Context):
@@ -816,15 +903,14 @@ class XTools(commands.Cog):
                     game_ids.append(game["Id"])
                 if len(game_ids) == 0:
                     return await ctx.send("No games found!")
-                async with SignedSession() as session:
-                    xbl_client = await self.auth_manager(session, ctx)
-                    if not xbl_client:
-                        return
-                    game = await xbl_client.catalog.get_products(game_ids)
-                    game_data = game.model_dump(mode="json") if V2 else json.loads(game.json())
-                    products = game_data["products"]
-                    pages = gwg_embeds(products)
-                    return await menu(ctx, pages, DEFAULT_CONTROLS)
+                xbl_client = await self.auth_manager(ctx)
+                if not xbl_client:
+                    return
+                game = await xbl_client.catalog.get_products(game_ids)
+                game_data = game.model_dump(mode="json") if V2 else json.loads(game.json())
+                products = game_data["products"]
+                pages = gwg_embeds(products)
+                return await menu(ctx, pages, DEFAULT_CONTROLS)
 
     @commands.command(name="xmostplayed")
     @commands.bot_has_permissions(embed_links=True)
@@ -834,86 +920,68 @@ class XTools(commands.Cog):
             gamertag = await self.pull_user(ctx)
             if not gamertag:
                 return
-        async with SignedSession() as session:
-            xbl_client = await self.auth_manager(session, ctx)
-            if not xbl_client:
-                return
-            embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
-            embed.set_thumbnail(url=LOADING)
-            msg = await ctx.send(embed=embed)
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                embed = discord.Embed(description="Invalid Gamertag. Try again.")
-                return await msg.edit(embed=embed)
-            except httpx.ConnectTimeout:
-                return await msg.edit(content="Connection timed out. Try again.", embed=None)
-            gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        xbl_client = await self.auth_manager(ctx)
+        if not xbl_client:
+            return
+        embed = discord.Embed(description="Gathering data...", color=discord.Color.random())
+        embed.set_thumbnail(url=LOADING)
+        msg = await ctx.send(embed=embed)
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            embed = discord.Embed(description="Invalid Gamertag. Try again.")
+            return await msg.edit(embed=embed)
+        except httpx.ConnectTimeout:
+            return await msg.edit(content="Connection timed out. Try again.", embed=None)
+        gt, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+
+        token = await self.get_token()
+        game_data = {"titles": await self.get_title_history(xuid)}
+        if len(game_data["titles"]) == 0:
+            embed = discord.Embed(
+                color=discord.Color.red(),
+                description="Your privacy settings are blocking your gameplay history.\n"
+                "**[Click Here](https://account.xbox.com/en-gb/Settings)** to change your settings.",
+            )
+            return await msg.edit(embed=embed)
 
-            token = await self.get_token(session)
-            header = {
-                "x-xbl-contract-version": "2",
-                "Authorization": token,
-                "Accept-Language": "en-US",
-            }
-            url = f"https://achievements.xboxlive.com/users/xuid({xuid})/history/titles"
+        titles = game_data["titles"]
+        embed = discord.Embed(
+            description=f"Found `{len(titles)}` titles..",
+            color=discord.Color.random(),
+        )
+        embed.set_thumbnail(url=LOADING)
+        await msg.edit(embed=embed)
+        most_played = {}
+        sem = asyncio.Semaphore(STATS_CONCURRENCY)
 
-            # Keep pulling continuation token till all data is obtained
-            running = True
-            params = None
-            game_data = {"titles": []}
-            while running:
-                async with self.session.get(url=url, headers=header, params=params) as res:
-                    data = await res.json(content_type=None)
-                    c_token = data["pagingInfo"]["continuationToken"]
-                    titles = data["titles"]
-                    game_data["titles"].extend(titles)
-                    if not c_token:
-                        running = False
-                    else:
-                        params = {"continuationToken": c_token}
-            if len(game_data["titles"]) == 0:
-                embed = discord.Embed(
-                    color=discord.Color.red(),
-                    description="Your privacy settings are blocking your gameplay history.\n"
-                    "**[Click Here](https://account.xbox.com/en-gb/Settings)** to change your settings.",
-                )
-                return await msg.edit(embed=embed)
+        async def _get_stats(title_id: str):
+            url, header, payload = stats_api_format(token, title_id, xuid)
+            async with sem:
+                async with self.session.post(url=url, headers=header, data=payload) as res:
+                    return await res.json(content_type=None)
 
-            titles = game_data["titles"]
-            embed = discord.Embed(
-                description=f"Found `{len(titles)}` titles..",
-                color=discord.Color.random(),
-            )
-            embed.set_thumbnail(url=LOADING)
+        async with ctx.typing():
+            cant_find = ""
+            not_found = False
+            titles = [title for title in titles if title["titleType"] != "LiveApp"]
+            results = await asyncio.gather(*[_get_stats(title["titleId"]) for title in titles])
+            for title, data in zip(titles, results):
+                most_played[title["name"]] = 0
+                if len(data["statlistscollection"][0]["stats"]) > 0:
+                    if "value" in data["statlistscollection"][0]["stats"][0]:
+                        most_played[title["name"]] = int(data["statlistscollection"][0]["stats"][0]["value"])
+                    else:
+                        not_found = True
+                        cant_find += f"{title['name']}\n"
+        pages = mostplayed(most_played, gt)
+        if not_found:
+            embed = discord.Embed(description=f"Couldn't find playtime data for:\n" f"{box(cant_find)}")
             await msg.edit(embed=embed)
-            most_played = {}
-            async with ctx.typing():
-                cant_find = ""
-                not_found = False
-                for title in titles:
-                    title_id = title["titleId"]
-                    apptype = title["titleType"]
-                    if apptype != "LiveApp":
-                        url, header, payload = stats_api_format(token, title_id, xuid)
-                        async with self.session.post(url=url, headers=header, data=payload) as res:
-                            data = await res.json(content_type=None)
-                        most_played[title["name"]] = 0
-                        if len(data["statlistscollection"][0]["stats"]) > 0:
-                            if "value" in data["statlistscollection"][0]["stats"][0]:
-                                most_played[title["name"]] = int(data["statlistscollection"][0]["stats"][0]["value"])
-                            else:
-                                not_found = True
-                                cant_find += f"{title['name']}\n"
-            pages = mostplayed(most_played, gt)
-            if not_found:
-                embed = discord.Embed(description=f"Couldn't find playtime data for:\n" f"{box(cant_find)}")
-                await msg.edit(embed=embed)
-            else:
-                await msg.delete()
+        else:
+            await msg.delete()
 
-            return await menu(ctx, pages, DEFAULT_CONTROLS)
+        return await menu(ctx, pages, DEFAULT_CONTROLS)
 
     @tasks.loop(seconds=60)
     async def status(self):
@@ -933,22 +1001,41 @@ class XTools(commands.Cog):
             return
 
         # Key doesn't match cached key, send updated status and cache new key
-        for guild in self.bot.guilds:
-            cid = await self.config.guild(guild).statuschannel()
-            if not cid:
+        self.alert = key
+        channels = []
+        for guild_id, cid in self.status_channels.items():
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
                 continue
             channel = guild.get_channel(cid)
             if not channel:
                 continue
-            with contextlib.suppress(discord.Forbidden, discord.HTTPException):
-                for e in embeds:
-                    await channel.send(embed=e)
+            channels.append(channel)
+        if not channels:
+            return
 
-        self.alert = key
+        sem = asyncio.Semaphore(ALERT_CONCURRENCY)
+        # Discord allows up to 10 embeds per message
+        chunks = [embeds[i : i + 10] for i in range(0, len(embeds), 10)]
+
+        async def _send(channel: discord.TextChannel):
+            async with sem:
+                with contextlib.suppress(discord.Forbidden, discord.HTTPException):
+                    for chunk in chunks:
+                        await channel.send(embeds=chunk)
+
+        await asyncio.gather(*[_send(channel) for channel in channels])
 
     @status.before_loop
     async def before_status_loop(self):
         await self.bot.wait_until_red_ready()
+        await self.load_status_channels()
+
+    async def load_status_channels(self):
+        guilds: Dict[int, dict] = await self.config.all_guilds()
+        channels = {guild_id: conf["statuschannel"] for guild_id, conf in guilds.items() if conf["statuschannel"]}
+        # Keep anything set through the command while the index was loading
+        self.status_channels = {**channels, **self.status_channels}
 
     @commands.Cog.listener()
     async def on_assistant_cog_add(self, cog: commands.Cog):
@@ -968,48 +1055,46 @@ class XTools(commands.Cog):
         await cog.register_function("XTools", schema)
 
     async def get_gamertag_profile(self, user: discord.Member, gamertag: str = None, *args, **kwargs):
-        async with SignedSession() as session:
-            if not gamertag:
-                users = await self.config.users()
-                if str(user.id) not in users:
-                    return "No gamertag has been set for this user, please specify a gamertag"
-                gamertag = users[str(user.id)]["gamertag"]
-            xbl_client = await self.auth_manager(session)
-            if not xbl_client:
-                return "Could not communicate with XSAPI"
-
-            try:
-                pdata = await xbl_client.profile.get_profile_by_gamertag(gamertag)
-                profile_data = pdata.model_dump(mode="json") if V2 else json.loads(pdata.json())
-            except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
-                return "Invalid Gamertag. Try again."
-            except httpx.ConnectTimeout:
-                return "Connection timed out. Try again."
-
-            _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
-            friends = await xbl_client.people.get_friends_summary_by_gamertag(gamertag)
-            friends_data = friends.model_dump(mode="json") if V2 else json.loads(friends.json())
+        if not gamertag:
+            users = await self.config.users()
+            if str(user.id) not in users:
+                return "No gamertag has been set for this user, please specify a gamertag"
+            gamertag = users[str(user.id)]["gamertag"]
+        xbl_client = await self.auth_manager()
+        if not xbl_client:
+            return "Could not communicate with XSAPI"
 
-            # Manually get presence and activity info since xbox webapi method is outdated
-            token = await self.get_token(session)
-            header = {
-                "x-xbl-contract-version": "3",
-                "Authorization": token,
-                "Accept": "application/json",
-                "Accept-Language": "en-US",
-                "Host": "presencebeta.xboxlive.com",
-            }
-            url = f"https://userpresence.xboxlive.com/users/xuid({xuid})"
-            async with self.session.get(url=url, headers=header) as res:
-                presence_data = await res.json(content_type=None)
-            url = f"https://avty.xboxlive.com/users/xuid({xuid})/Activity/History?numItems=5&excludeTypes=TextPost"
-            async with self.session.get(url=url, headers=header) as res:
-                activity_data = await res.json(content_type=None)
-            profile_data["friends"] = friends_data
-            profile_data["presence"] = presence_data
-            profile_data["activity"] = activity_data["activityItems"]
-            embed = profile_embed(profile_data)
-            reply = f"{embed.title}\n"
-            for field in embed.fields:
-                reply += f"{field.name}\n{field.value}\n\n"
-            return reply
+        try:
+            profile_data = await self.get_profile_data(xbl_client, gamertag)
+        except (aiohttp.ClientResponseError, httpx.HTTPStatusError):
+            return "Invalid Gamertag. Try again."
+        except httpx.ConnectTimeout:
+            return "Connection timed out. Try again."
+
+        _, xuid, _, _, _, _, _, _, _ = profile(profile_data)
+        friends = await xbl_client.people.get_friends_summary_by_gamertag(gamertag)
+        friends_data = friends.model_dump(mode="json") if V2 else json.loads(friends.json())
+
+        # Manually get presence and activity info since xbox webapi method is outdated
+        token = await self.get_token()
+        header = {
+            "x-xbl-contract-version": "3",
+            "Authorization": token,
+            "Accept": "application/json",
+            "Accept-Language": "en-US",
+            "Host": "presencebeta.xboxlive.com",
+        }
+        url = f"https://userpresence.xboxlive.com/users/xuid({xuid})"
+        async with self.session.get(url=url, headers=header) as res:
+            presence_data = await res.json(content_type=None)
+        url = f"https://avty.xboxlive.com/users/xuid({xuid})/Activity/History?numItems=5&excludeTypes=TextPost"
+        async with self.session.get(url=url, headers=header) as res:
+            activity_data = await res.json(content_type=None)
+        profile_data["friends"] = friends_data
+        profile_data["presence"] = presence_data
+        profile_data["activity"] = activity_data["activityItems"]
+        embed = profile_embed(profile_data)
+        reply = f"{embed.title}\n"
+        for field in embed.fields:
+            reply += f"{field.name}\n{field.value}\n\n"
+        return reply